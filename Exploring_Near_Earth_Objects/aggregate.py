@@ -0,0 +1,313 @@
+"""Summarize the close approaches that match a collection of filters.
+
+The `summarize` function counts the close approaches that match a collection of
+filters from `create_filters` - altogether, or grouped by the year or month of
+approach, or by NEO - and, within each group, computes the minimum, mean and
+maximum of some columns and a histogram of one column. Unknown diameters are
+left out of the aggregates of the diameter column.
+
+If NumPy is installed, the summary is computed with vectorized operations over
+the columns of a `VectorizedEngine`, so that no `CloseApproach` is built for the
+matches. Otherwise, the matches are summarized in one streaming pass, which only
+keeps running totals per group - and, for a histogram, the values of its column.
+
+The `stats` subcommand of the main module prints a `Summary` with `format_summary`.
+"""
+import array
+import datetime
+import functools
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# The ways in which close approaches can be grouped, and the columns that can be aggregated.
+GROUPINGS = ('year', 'month', 'neo')
+COLUMNS = ('distance', 'velocity', 'diameter')
+
+_EPOCH = datetime.date(1970, 1, 1)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _year_and_month(day):
+    """Return the `(year, month)` of a day, given as whole days since the Unix epoch."""
+    date = _EPOCH + datetime.timedelta(days=day)
+    return date.year, date.month
+
+
+def _month_key(year, month):
+    """Return the group key of a month, in YYYY-MM format."""
+    return f"{year:04d}-{month:02d}"
+
+
+# Functions that fetch the group key and the aggregated columns of a close approach.
+_GROUP_KEYS = {
+    None: lambda approach: None,
+    'year': lambda approach: _year_and_month(approach.epoch_minutes // 1440)[0],
+    'month': lambda approach: _month_key(*_year_and_month(approach.epoch_minutes // 1440)),
+    'neo': lambda approach: approach.neo.designation,
+}
+_COLUMN_GETTERS = {
+    'distance': lambda approach: approach.distance,
+    'velocity': lambda approach: approach.velocity,
+    'diameter': lambda approach: approach.neo.diameter,
+}
+
+
+class ColumnSummary:
+    """The minimum, maximum and mean of the known values of one column in a group."""
+
+    __slots__ = ('count', 'minimum', 'maximum', 'total')
+
+    def __init__(self, count=0, minimum=math.nan, maximum=math.nan, total=0.0):
+        """Create a new `ColumnSummary`.
+
+        :param count: The number of known (not NaN) values.
+        :param minimum: The smallest known value, or NaN if there are none.
+        :param maximum: The largest known value, or NaN if there are none.
+        :param total: The sum of the known values.
+        """
+        self.count = count
+        self.minimum = minimum
+        self.maximum = maximum
+        self.total = total
+
+    def add(self, value):
+        """Add a value to this summary, unless it's unknown (NaN).
+
+        :param value: A float.
+        """
+        if value != value:
+            return
+        if not self.count:
+            self.minimum = self.maximum = value
+        elif value < self.minimum:
+            self.minimum = value
+        elif value > self.maximum:
+            self.maximum = value
+        self.count += 1
+        self.total += value
+
+    @property
+    def mean(self):
+        """Return the mean of the known values, or NaN if there are none."""
+        return self.total / self.count if self.count else math.nan
+
+
+class GroupSummary:
+    """The number of matching close approaches in one group, and their aggregates."""
+
+    def __init__(self, key, columns=()):
+        """Create a new, empty `GroupSummary`.
+
+        :param key: The key of this group - a year, a YYYY-MM month, an NEO's designation, or `None`.
+        :param columns: The names of the columns to aggregate.
+        """
+        self.key = key
+        self.count = 0
+        self.columns = {column: ColumnSummary() for column in columns}
+        self.histogram = None
+
+
+class Summary:
+    """A summary of the close approaches that match a collection of filters."""
+
+    def __init__(self, group_by, groups, histogram=None, edges=None):
+        """Create a new `Summary`.
+
+        :param group_by: One of the `GROUPINGS`, or `None` if the matches aren't grouped.
+        :param groups: A list of `GroupSummary`s, ordered by key.
+        :param histogram: The name of the column of each group's histogram, or `None`.
+        :param edges: The `bins + 1` edges of the histogram bins, or `None`.
+        """
+        self.group_by = group_by
+        self.groups = groups
+        self.histogram = histogram
+        self.edges = edges
+
+    @property
+    def count(self):
+        """Return the total number of matching close approaches."""
+        return sum(group.count for group in self.groups)
+
+    def top(self, n):
+        """Return the `n` groups with the most close approaches, ties ordered by key.
+
+        :param n: The number of groups to return.
+        :return: A list of `GroupSummary`s.
+        """
+        return sorted(self.groups, key=lambda group: group.count, reverse=True)[:n]
+
+
+def summarize(database, filters=(), group_by=None, columns=(), histogram=None, bins=10):
+    """Summarize the close approaches of a database that match a collection of filters.
+
+    :param database: An `NEODatabase`.
+    :param filters: A collection of filters capturing user-specified criteria.
+    :param group_by: One of the `GROUPINGS`, or `None` to summarize the matches altogether.
+    :param columns: Names of `COLUMNS` whose minimum, mean and maximum to compute.
+    :param histogram: The name of one of the `COLUMNS` to bin, or `None`.
+    :param bins: The number of equal-width histogram bins, between the smallest and largest match.
+    :return: A `Summary`.
+    """
+    if group_by not in _GROUP_KEYS:
+        raise ValueError(f"Cannot group close approaches by {group_by!r}.")
+    for column in (*columns, *([histogram] if histogram else [])):
+        if column not in COLUMNS:
+            raise ValueError(f"Cannot aggregate close approaches by {column!r}.")
+    engine = database.column_engine()
+    if engine is not None:
+        summary = _summarize_columns(database, engine, filters, group_by, columns,
+                                     histogram, bins)
+    else:
+        summary = _summarize_stream(database, filters, group_by, columns, histogram, bins)
+    summary.groups.sort(key=lambda group: (group.key is None, group.key))
+    return summary
+
+
+def _summarize_stream(database, filters, group_by, columns, histogram, bins):
+    """Summarize matching close approaches in one pass over `NEODatabase.query`."""
+    key_of = _GROUP_KEYS[group_by]
+    getters = [(column, _COLUMN_GETTERS[column]) for column in columns]
+    binned = _COLUMN_GETTERS[histogram] if histogram else None
+    groups = {}
+    values = {}
+    for approach in database.query(filters):
+        key = key_of(approach)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = GroupSummary(key, columns)
+            values[key] = array.array('d')
+        group.count += 1
+        for column, get in getters:
+            group.columns[column].add(get(approach))
+        if binned is not None:
+            values[key].append(binned(approach))
+
+    edges = None
+    if histogram:
+        known = [value for group_values in values.values()
+                 for value in group_values if value == value]
+        edges = _edges(min(known), max(known), bins) if known else None
+        for key, group in groups.items():
+            group.histogram = [0] * bins
+            if edges is None:
+                continue
+            for value in values[key]:
+                if value == value:
+                    group.histogram[_bin(value, edges[0], edges[-1], bins)] += 1
+    return Summary(group_by, list(groups.values()), histogram, edges)
+
+
+def _summarize_columns(database, engine, filters, group_by, columns, histogram, bins):
+    """Summarize matching close approaches with vectorized operations over NumPy columns."""
+    rows = engine.rows(filters)
+    if group_by is None:
+        codes = np.zeros(len(rows), dtype=np.intp)
+        keys = [None] if len(rows) else []
+    elif group_by == 'neo':
+        neos, codes = np.unique(engine.neo_index[rows], return_inverse=True)
+        keys = [database._neos[neo].designation for neo in neos.tolist()]
+    else:
+        months = engine.time[rows].astype('datetime64[m]').astype('datetime64[M]')
+        months = months.astype(np.int64)
+        if group_by == 'year':
+            values, codes = np.unique(months // 12 + 1970, return_inverse=True)
+            keys = values.tolist()
+        else:
+            values, codes = np.unique(months, return_inverse=True)
+            keys = [_month_key(month // 12 + 1970, month % 12 + 1) for month in values.tolist()]
+    codes = codes.ravel()
+
+    groups = [GroupSummary(key, columns) for key in keys]
+    for group, count in zip(groups, np.bincount(codes, minlength=len(keys)).tolist()):
+        group.count = count
+    # Group the rows, so that the extremes of each group can be reduced at once.
+    order = np.argsort(codes, kind='stable')
+    starts = np.searchsorted(codes[order], np.arange(len(keys)))
+
+    for column in columns:
+        values = _gather(engine, column, rows)
+        known = ~np.isnan(values)
+        counts = np.bincount(codes, weights=known, minlength=len(keys))
+        totals = np.bincount(codes, weights=np.where(known, values, 0.0), minlength=len(keys))
+        if len(rows):
+            minima = np.fmin.reduceat(values[order], starts)
+            maxima = np.fmax.reduceat(values[order], starts)
+        else:
+            minima = maxima = totals
+        for group, count, minimum, maximum, total in zip(groups, counts.tolist(), minima.tolist(),
+                                                         maxima.tolist(), totals.tolist()):
+            group.columns[column] = ColumnSummary(int(count), minimum, maximum, total)
+
+    edges = None
+    if histogram:
+        values = _gather(engine, histogram, rows)
+        known = ~np.isnan(values)
+        if known.any():
+            lo, hi = float(values[known].min()), float(values[known].max())
+            edges = _edges(lo, hi, bins)
+            width = (hi - lo) / bins
+            if width:
+                binned = np.minimum(((values[known] - lo) / width).astype(np.int64), bins - 1)
+            else:
+                binned = np.zeros(int(known.sum()), dtype=np.int64)
+            counts = np.bincount(codes[known] * bins + binned, minlength=len(keys) * bins)
+            counts = counts.reshape(len(keys), bins).tolist()
+        else:
+            counts = [[0] * bins for _ in keys]
+        for group, histogram_counts in zip(groups, counts):
+            group.histogram = histogram_counts
+    return Summary(group_by, groups, histogram, edges)
+
+
+def _gather(engine, column, rows):
+    """Return the values of a column for some rows, as a float NumPy array."""
+    if column == 'diameter':
+        return engine.diameter[engine.neo_index[rows]]
+    return getattr(engine, column)[rows].astype(np.float64)
+
+
+def _edges(lo, hi, bins):
+    """Return the edges of `bins` equal-width bins between `lo` and `hi`."""
+    width = (hi - lo) / bins
+    return [lo + i * width for i in range(bins)] + [hi]
+
+
+def _bin(value, lo, hi, bins):
+    """Return the bin of a value between `lo` and `hi`, the largest value in the last bin."""
+    width = (hi - lo) / bins
+    if not width:
+        return 0
+    return min(int((value - lo) / width), bins - 1)
+
+
+def format_summary(summary, top=None):
+    """Describe a summary in human-readable text.
+
+    :param summary: A `Summary`.
+    :param top: The number of groups with the most close approaches to describe, or `None` for all.
+    :return: A multi-line string, with one line per group, and one more per histogram bin.
+    """
+    groups = summary.groups if top is None else summary.top(top)
+    if not groups:
+        return "No matching close approaches."
+    lines = []
+    for group in groups:
+        line = f"{'All' if group.key is None else group.key}: {group.count} close approaches"
+        for column, aggregate in group.columns.items():
+            if aggregate.count:
+                line += (f"; {column} {aggregate.minimum:.4f} / {aggregate.mean:.4f} / "
+                         f"{aggregate.maximum:.4f} (min / mean / max)")
+            else:
+                line += f"; {column} unknown"
+        lines.append(line + ".")
+        if group.histogram is not None and summary.edges is not None:
+            for number, count in enumerate(group.histogram):
+                lo, hi = summary.edges[number], summary.edges[number + 1]
+                closing = ']' if number == len(group.histogram) - 1 else ')'
+                lines.append(f"    {summary.histogram} [{lo:.4f}, {hi:.4f}{closing}: {count}")
+    return '\n'.join(lines)
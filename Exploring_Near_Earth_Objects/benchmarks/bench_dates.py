@@ -0,0 +1,39 @@
+"""Compare `cd_to_datetime` against a plain `strptime` on NASA calendar dates.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_dates
+
+The calendar dates are taken from the test close approach data file.
+"""
+import datetime
+import pathlib
+import timeit
+
+from extract import iter_cad_rows
+from helpers import cd_to_datetime
+
+
+TEST_CAD_FILE = pathlib.Path(__file__).parent.parent.resolve() / 'tests' / 'test-cad-2020.json'
+
+
+def strptime(calendar_date):
+    """Convert a NASA-formatted calendar date the way `cd_to_datetime` originally did."""
+    return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+
+
+def main(repeat=5):
+    """Time both parsers over every calendar date in the test data, and print a summary."""
+    dates = [calendar_date for calendar_date, in iter_cad_rows(TEST_CAD_FILE, ('cd',))]
+    assert list(map(strptime, dates)) == list(map(cd_to_datetime, dates))
+
+    timings = {}
+    for parse in (strptime, cd_to_datetime):
+        timings[parse.__name__] = min(timeit.repeat(lambda: list(map(parse, dates)),
+                                                    number=1, repeat=repeat))
+        print(f"{parse.__name__:>15}: {timings[parse.__name__] / len(dates) * 1e6:.2f} us/date")
+    print(f"Speedup: {timings['strptime'] / timings['cd_to_datetime']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
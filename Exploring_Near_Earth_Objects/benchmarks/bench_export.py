@@ -0,0 +1,52 @@
+"""Measure the time taken and the space used to export query results in each output format.
+
+The close approaches of the test data files are replicated `N` times (see
+`benchmarks.bench_limit`), and every one of them is written in each format that
+can be written here. Times and sizes are also given relative to plain CSV.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_export [--scale N]
+"""
+import argparse
+import pathlib
+import tempfile
+import time
+
+import write
+from benchmarks.bench_limit import build
+
+
+SUFFIXES = ('.csv', '.csv.gz', '.csv.zst', '.json', '.json.gz', '.json.zst',
+            '.jsonl', '.jsonl.gz', '.npz')
+
+
+def main():
+    """Export every close approach in each format, and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=20,
+                        help="How many times to replicate the test close approaches.")
+    args = parser.parse_args()
+
+    database = build(args.scale)
+    print(f"Exporting {len(database)} close approaches")
+    baseline = None
+    with tempfile.TemporaryDirectory() as directory:
+        for suffix in SUFFIXES:
+            path = pathlib.Path(directory) / f'results{suffix}'
+            start = time.perf_counter()
+            try:
+                write.writer_for(path)(database.query(), path)
+            except ImportError as err:
+                print(f"{suffix:>10}: skipped - {err}")
+                continue
+            elapsed = time.perf_counter() - start
+            size = path.stat().st_size
+            if baseline is None:
+                baseline = elapsed, size
+            print(f"{suffix:>10}: {elapsed:6.2f} s ({elapsed / baseline[0]:4.2f}x), "
+                  f"{size / 2 ** 20:7.2f} MiB ({size / baseline[1]:5.1%})")
+
+
+if __name__ == '__main__':
+    main()
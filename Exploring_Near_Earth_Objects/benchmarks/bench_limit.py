@@ -0,0 +1,81 @@
+"""Measure how the cost of a query with `--limit 10` grows with the size of the data set.
+
+Databases are built from the test data files, with the close approaches
+replicated 1, 10 and 100 times - each copy shifted later in time, so that the
+close approaches stay sorted by time, as in the real data set. A few
+representative queries are then timed with a cap of 10 matches, and, for
+comparison, as they were originally evaluated: every match produced, then all
+but the first 10 discarded.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_limit [--scales 1,10,100]
+"""
+import argparse
+import datetime
+import pathlib
+import time
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, limit
+from models import CloseApproach
+
+
+TESTS_ROOT = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+QUERIES = {
+    'all': {},
+    'max-distance 0.4': {'distance_max': 0.4},
+    'min-velocity 20, not hazardous': {'velocity_min': 20, 'hazardous': False},
+    'start-date 2020-06-01': {'start_date': datetime.date(2020, 6, 1)},
+    'max-diameter 0.05': {'diameter_max': 0.05},
+}
+
+
+def build(scale):
+    """Build a database of the test close approaches, replicated `scale` times."""
+    approaches = load_approaches(TEST_CAD_FILE)
+    first = min(approach.epoch_minutes for approach in approaches)
+    span = max(approach.epoch_minutes for approach in approaches) - first + 1
+    replicated = [CloseApproach.from_minutes(approach._designation,
+                                             approach.epoch_minutes + copy * span,
+                                             approach.distance, approach.velocity)
+                  for copy in range(scale) for approach in approaches]
+    return NEODatabase(load_neos(TEST_NEO_FILE), replicated)
+
+
+def best_of(repeat, function):
+    """Return the fastest of `repeat` timings of a function, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    """Time each query at each scale, and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='1,10,100',
+                        help="Comma-separated multiples of the test close approaches.")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="How many times to time each query.")
+    args = parser.parse_args()
+
+    for scale in map(int, args.scales.split(',')):
+        database = build(scale)
+        print(f"{len(database)} close approaches")
+        for name, criteria in QUERIES.items():
+            filters = create_filters(**criteria)
+            capped = best_of(args.repeat,
+                             lambda: list(limit(database.query(filters, 10), 10)))
+            uncapped = best_of(args.repeat, lambda: list(database.query(filters))[:10])
+            print(f"  {name:>32}: {capped:8.2f} ms capped, {uncapped:8.2f} ms uncapped")
+
+
+if __name__ == '__main__':
+    main()
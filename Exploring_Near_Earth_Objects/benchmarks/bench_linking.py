@@ -0,0 +1,87 @@
+"""Measure the time and memory taken to link close approaches to their NEOs.
+
+Bulk linking, as done by the `NEODatabase` constructor, is compared against the
+original approach of looking up each close approach's NEO by designation and
+appending the close approach to a list on the NEO.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_linking [--copies N]
+
+The close approaches of the test data file are replicated `N` times.
+"""
+import argparse
+import gc
+import pathlib
+import time
+import tracemalloc
+
+import database
+from extract import load_neos, load_approaches
+from models import CloseApproach
+
+
+TESTS_ROOT = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def link_by_lookup(neos, approaches):
+    """Link close approaches one at a time, as originally done."""
+    neo_by_pdes = {neo.designation: neo for neo in neos}
+    for approach in approaches:
+        neo = neo_by_pdes[approach._designation]
+        approach.link(neo)
+        neo.approaches.append(approach)
+
+
+def link_in_bulk(neos, approaches):
+    """Link close approaches in bulk, as `NEODatabase` does."""
+    database._link(neos, approaches)
+
+
+def fresh(copies):
+    """Load unlinked NEOs, and the test close approaches replicated `copies` times."""
+    neos = load_neos(TEST_NEO_FILE)
+    approaches = [CloseApproach.from_minutes(approach._designation, approach.epoch_minutes,
+                                             approach.distance, approach.velocity)
+                  for approach in load_approaches(TEST_CAD_FILE) for _ in range(copies)]
+    return neos, approaches
+
+
+def measure(link, copies):
+    """Return the seconds taken to link fresh objects, and the bytes retained by linking them."""
+    neos, approaches = fresh(copies)
+    gc.collect()
+    start = time.perf_counter()
+    link(neos, approaches)
+    elapsed = time.perf_counter() - start
+
+    # Trace memory on a second run, since tracing slows allocation down.
+    neos, approaches = fresh(copies)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    link(neos, approaches)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return elapsed, retained
+
+
+def main():
+    """Measure both ways of linking, and print a summary."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--copies', type=int, default=20,
+                        help="How many times to replicate the test close approaches.")
+    args = parser.parse_args()
+
+    count = args.copies * len(load_approaches(TEST_CAD_FILE))
+    print(f"Linking {count} close approaches")
+    for name, link in (('lookup', link_by_lookup), ('bulk', link_in_bulk)):
+        elapsed, retained = measure(link, args.copies)
+        print(f"{name:>8}: {elapsed:.3f} s, {retained / 2 ** 20:5.1f} MiB retained")
+
+
+if __name__ == '__main__':
+    main()
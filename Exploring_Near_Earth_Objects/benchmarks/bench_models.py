@@ -0,0 +1,107 @@
+"""Measure the memory used by linked `NearEarthObject`s and `CloseApproach`es.
+
+The compact, slotted models are compared against the original dict-backed
+representation, in which each close approach held a `datetime` and kept its
+own copy of its NEO's designation after linking.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_models [--copies N]
+
+The close approaches of the test data file are replicated `N` times.
+"""
+import argparse
+import gc
+import pathlib
+import tracemalloc
+
+from extract import iter_cad_rows, load_neos
+from helpers import cd_to_datetime
+from models import NearEarthObject, CloseApproach
+
+
+TESTS_ROOT = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class DictNearEarthObject:
+    """A near-Earth object, as originally represented."""
+
+    def __init__(self, designation, name, diameter, hazardous):
+        self.designation = designation
+        self.name = name
+        self.diameter = diameter
+        self.hazardous = hazardous
+        self.approaches = []
+
+
+class DictCloseApproach:
+    """A close approach, as originally represented."""
+
+    def __init__(self, designation, time, distance, velocity):
+        self._designation = designation
+        self.time = time
+        self.distance = distance
+        self.velocity = velocity
+        self.neo = None
+
+
+def rows(copies):
+    """Parse the test close approaches `copies` times, as the loader would."""
+    for _ in range(copies):
+        yield from iter_cad_rows(TEST_CAD_FILE, ('des', 'cd', 'dist', 'v_rel'))
+
+
+def build(neo_class, approach_class, rows, neo_rows):
+    """Build and link NEOs and close approaches of the given classes."""
+    neos = {designation: neo_class(designation, name, diameter, hazardous)
+            for designation, name, diameter, hazardous in neo_rows}
+    approaches = []
+    for designation, calendar_date, distance, velocity in rows:
+        approach = approach_class(designation, cd_to_datetime(calendar_date),
+                                  float(distance), float(velocity))
+        neo = neos[approach._designation]
+        if hasattr(approach, 'link'):
+            approach.link(neo)
+        else:
+            approach.neo = neo
+        neo.approaches.append(approach)
+        approaches.append(approach)
+    return neos, approaches
+
+
+def measure(neo_class, approach_class, rows, neo_rows):
+    """Return the number of bytes retained by the linked objects."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(neo_class, approach_class, rows, neo_rows)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return retained
+
+
+def main():
+    """Measure both representations, and print a summary."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--copies', type=int, default=20,
+                        help="How many times to replicate the test close approaches.")
+    args = parser.parse_args()
+
+    neo_rows = [(neo.designation, neo.name, neo.diameter, neo.hazardous)
+                for neo in load_neos(TEST_NEO_FILE)]
+
+    original = measure(DictNearEarthObject, DictCloseApproach, rows(args.copies), neo_rows)
+    compact = measure(NearEarthObject, CloseApproach, rows(args.copies), neo_rows)
+    count = sum(1 for _ in rows(args.copies))
+    print(f"{count} close approaches of {len(neo_rows)} NEOs")
+    print(f"  original: {original / 2 ** 20:7.1f} MiB ({original / count:.0f} B/approach)")
+    print(f"   compact: {compact / 2 ** 20:7.1f} MiB ({compact / count:.0f} B/approach)")
+    print(f"     saved: {1 - compact / original:.0%}")
+
+
+if __name__ == '__main__':
+    main()
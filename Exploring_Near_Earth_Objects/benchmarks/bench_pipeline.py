@@ -0,0 +1,229 @@
+"""Measure the time and memory of each stage of the load, link, query and write pipeline.
+
+For each scale, a pair of synthetic data files is generated (see
+`benchmarks.generate`), relative to the size of the real data set, and each
+stage is timed - as the best of `--repeat` runs - and then run once more under
+`tracemalloc` to measure its peak memory:
+
+- `load_neos` and `load_approaches`, parsing the data files;
+- `NEODatabase.__init__`, linking and indexing them;
+- a mix of representative queries, each with and without a `--limit`;
+- `write_to_csv` and `write_to_json`, writing the matches of a decade.
+
+The results are printed as a table, and can be saved as JSON with `--output`,
+along with the commit, Python version and platform they were measured on. With
+`--compare`, each timing is compared with the same stage at the same scale in
+an earlier results file, and the exit status is 1 if any stage is slower by more
+than `--tolerance` (and by more than a millisecond), so that regressions can be
+caught across commits:
+
+    $ python3 -m benchmarks.bench_pipeline --scales 1 --output before.json
+    $ git checkout my-branch
+    $ python3 -m benchmarks.bench_pipeline --scales 1 --compare before.json
+
+Generated data files are kept in `--data` (a temporary directory by default),
+and reused by later runs. The scales default to 1x, 10x and 100x the real data
+set - the largest needs tens of gigabytes of disk and memory.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_pipeline [--scales 1,10,100] [--output results.json]
+"""
+import argparse
+import datetime
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generate import generate
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, limit
+from write import write_to_csv, write_to_json
+
+
+QUERIES = {
+    'all': {},
+    'date 2020-03-14': {'date': datetime.date(2020, 3, 14)},
+    'start-date 2050-01-01, min-distance 0.2, min-velocity 50': {
+        'start_date': datetime.date(2050, 1, 1), 'distance_min': 0.2, 'velocity_min': 50},
+    'max-distance 0.05, hazardous': {'distance_max': 0.05, 'hazardous': True},
+    'max-diameter 0.1, not hazardous': {'diameter_max': 0.1, 'hazardous': False},
+}
+# The cap of the capped variant of each query.
+LIMIT = 10
+# The filters of the query whose matches are written by each writer.
+WRITTEN = {'start_date': datetime.date(2020, 1, 1), 'end_date': datetime.date(2029, 12, 31)}
+# The slowdown, in seconds, below which a difference in timings is treated as noise.
+NOISE = 0.001
+
+
+def measure(function, repeat, memory=True):
+    """Time a function, and measure its peak memory.
+
+    :param function: A callable with no arguments.
+    :param repeat: The number of timed runs.
+    :param memory: Whether to run the function once more, to measure its peak memory.
+    :return: A tuple of the fastest time in seconds, the peak memory in bytes (or `None`),
+             and the return value of the last timed run.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak, value
+
+
+def run(scale, directory, repeat, memory=True):
+    """Measure every stage of the pipeline at one scale.
+
+    :param scale: The size of the data files, relative to the real ones.
+    :param directory: The directory of the generated data files of every scale.
+    :param repeat: The number of timed runs of each stage.
+    :param memory: Whether to measure the peak memory of each stage.
+    :return: A list of result dictionaries, one per stage.
+    """
+    data = pathlib.Path(directory) / f'scale-{scale:g}'
+    neo_path, cad_path = data / 'neos.csv', data / 'cad.json'
+    if not (neo_path.exists() and cad_path.exists()):
+        generate(data, scale)
+
+    results = []
+
+    def record(stage, measured, rows):
+        seconds, peak, _ = measured
+        results.append({'scale': scale, 'stage': stage, 'seconds': seconds,
+                        'peak_bytes': peak, 'rows': rows})
+        peak_text = f"{peak / 2 ** 20:9.1f} MiB" if peak is not None else ""
+        print(f"  {stage:>72}: {seconds * 1000:10.1f} ms {peak_text} ({rows} rows)")
+
+    measured = measure(lambda: load_neos(neo_path), repeat, memory)
+    record('load_neos', measured, len(measured[2]))
+    measured = measure(lambda: load_approaches(cad_path), repeat, memory)
+    record('load_approaches', measured, len(measured[2]))
+
+    # Linking modifies the NEOs and close approaches, so each run links fresh ones.
+    def link():
+        neos, approaches = load_neos(neo_path), load_approaches(cad_path)
+        start = time.perf_counter()
+        database = NEODatabase(neos, approaches)
+        link.seconds.append(time.perf_counter() - start)
+        return database
+    link.seconds = []
+    _, peak, database = measure(link, repeat, False)
+    if memory:
+        neos, approaches = load_neos(neo_path), load_approaches(cad_path)
+        tracemalloc.start()
+        NEODatabase(neos, approaches)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del neos, approaches
+    record('NEODatabase.__init__', (min(link.seconds), peak, None), len(database))
+
+    for name, criteria in QUERIES.items():
+        filters = create_filters(**criteria)
+        measured = measure(lambda: list(database.query(filters)), repeat, memory)
+        record(f'query {name}', measured, len(measured[2]))
+        measured = measure(lambda: list(limit(database.query(filters, LIMIT), LIMIT)),
+                           repeat, memory)
+        record(f'query {name}, limit {LIMIT}', measured, len(measured[2]))
+
+    written = list(database.query(create_filters(**WRITTEN)))
+    with tempfile.TemporaryDirectory() as output:
+        for writer, suffix in ((write_to_csv, '.csv'), (write_to_json, '.json')):
+            path = pathlib.Path(output) / f'results{suffix}'
+            measured = measure(lambda: writer(written, path), repeat, memory)
+            record(writer.__name__, measured, len(written))
+    return results
+
+
+def environment():
+    """Describe the commit, Python version and platform that results are measured on."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=pathlib.Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(),
+            'platform': platform.platform(), 'date': datetime.datetime.now().isoformat()}
+
+
+def compare(results, baseline, tolerance):
+    """Print the ratio of each timing to the same stage at the same scale in a baseline.
+
+    :param results: A list of result dictionaries.
+    :param baseline: A results document, as written with `--output`.
+    :param tolerance: The fraction by which a stage may be slower than in the baseline.
+                      Slowdowns of less than `NOISE` seconds are ignored.
+    :return: The number of stages that are slower by more than the tolerance.
+    """
+    before = {(result['scale'], result['stage']): result for result in baseline['results']}
+    print(f"Compared with {baseline['environment'].get('commit') or 'an unknown commit'}:")
+    regressions = 0
+    for result in results:
+        previous = before.get((result['scale'], result['stage']))
+        if previous is None or not previous['seconds']:
+            continue
+        ratio = result['seconds'] / previous['seconds']
+        slower = (ratio > 1 + tolerance
+                  and result['seconds'] - previous['seconds'] > NOISE)
+        regressions += slower
+        print(f"  {result['scale']:g}x {result['stage']:>72}: {ratio:6.2f}x"
+              f"{'  <- slower' if slower else ''}")
+    return regressions
+
+
+def main():
+    """Measure each stage at each scale, print a table, and optionally save or compare results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='1,10,100',
+                        help="Comma-separated sizes of the data, relative to the real data set.")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="How many times to time each stage.")
+    parser.add_argument('--data', type=pathlib.Path,
+                        help="A directory in which to keep the generated data files.")
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help="Don't measure the peak memory of each stage, which is slower.")
+    parser.add_argument('--output', type=pathlib.Path,
+                        help="A JSON file to which to save the results.")
+    parser.add_argument('--compare', type=pathlib.Path,
+                        help="A JSON file of earlier results to compare these with.")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="The fraction by which a stage may be slower than in the compared "
+                             "results before it counts as a regression. Defaults to 0.1.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = args.data or temporary
+        results = []
+        for scale in map(float, args.scales.split(',')):
+            print(f"Scale {scale:g}x:")
+            results += run(scale, directory, args.repeat, args.memory)
+
+    document = {'environment': environment(), 'results': results}
+    if args.output:
+        args.output.write_text(json.dumps(document, indent=2))
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print(f"{regressions} stages are slower than before.")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Measure the time saved by compiling the predicates of a query into one function.
+
+Databases are built from the test data files, with the close approaches
+replicated `N` times (see `benchmarks.bench_limit`). Each query is evaluated
+with its plan's predicates compiled, and by calling each predicate in turn.
+For comparison, the filters of `create_filters` are also evaluated on every
+close approach directly, both called in turn and compiled.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_predicates [--scale N] [--repeat R]
+"""
+import argparse
+import datetime
+
+from benchmarks.bench_limit import build, best_of
+from filters import create_filters
+from planner import compile_predicate
+
+
+QUERIES = {
+    'not hazardous': {'hazardous': False},
+    'max-diameter 0.05': {'diameter_max': 0.05},
+    'min-velocity 20, not hazardous': {'velocity_min': 20, 'hazardous': False},
+    'diameter 0.1-1, velocity 5-30, hazardous': {
+        'diameter_min': 0.1, 'diameter_max': 1, 'velocity_min': 5, 'velocity_max': 30,
+        'hazardous': True,
+    },
+    'start-date 2020-03-01, distances 0.01-0.3, velocities 2-40, diameters 0.01-5': {
+        'start_date': datetime.date(2020, 3, 1), 'distance_min': 0.01, 'distance_max': 0.3,
+        'velocity_min': 2, 'velocity_max': 40, 'diameter_min': 0.01, 'diameter_max': 5,
+        'hazardous': False,
+    },
+}
+
+
+def main():
+    """Time each query both ways, and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=20,
+                        help="How many times to replicate the test close approaches.")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="How many times to time each query.")
+    args = parser.parse_args()
+
+    database = build(args.scale)
+    approaches = database._approaches
+    print(f"{len(approaches)} close approaches")
+    for name, criteria in QUERIES.items():
+        filters = create_filters(**criteria)
+        database.compile_predicates = True
+        compiled = best_of(args.repeat, lambda: list(database.query(filters)))
+        database.compile_predicates = False
+        called = best_of(args.repeat, lambda: list(database.query(filters)))
+        predicate = compile_predicate(filters)
+        scan_called = best_of(args.repeat, lambda: [a for a in approaches
+                                                    if all(f(a) for f in filters)])
+        scan_compiled = best_of(args.repeat, lambda: list(filter(predicate, approaches)))
+        print(f"  {name}:\n"
+              f"    query: {compiled:8.1f} ms compiled, {called:8.1f} ms called "
+              f"({called / compiled:4.1f}x)\n"
+              f"    scan:  {scan_compiled:8.1f} ms compiled, {scan_called:8.1f} ms called "
+              f"({scan_called / scan_compiled:4.1f}x)")
+    del database.compile_predicates
+
+
+if __name__ == '__main__':
+    main()
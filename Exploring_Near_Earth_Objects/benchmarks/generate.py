@@ -0,0 +1,130 @@
+"""Generate synthetic NEO and close approach data files, scaled relative to the real data set.
+
+The real `neos.csv` has about 24 thousand NEOs and the real `cad.json` about 407
+thousand close approaches. A synthetic pair of data files at scale `S` has `S`
+times as many of each, in the same formats:
+
+- NEOs are copies of the rows of the test NEO file, with a suffix added to the
+  designation and name of each copy after the first, so that they stay unique.
+  Diameters, hazard flags and the share of named NEOs follow the test data.
+- Close approaches take their distances and velocities from the rows of the
+  test close approach file, and are spread evenly over the 20th and 21st
+  centuries, in chronological order, as in the real data set. Each belongs to
+  an NEO picked at random, with a fixed seed, so the files are reproducible.
+
+The close approach file is written a row at a time, so that large scales don't
+need the whole data set in memory.
+
+To generate a pair of data files from the project root, run:
+
+    $ python3 -m benchmarks.generate --scale 10 data/synthetic
+"""
+import argparse
+import csv
+import datetime
+import json
+import pathlib
+import random
+
+from extract import iter_cad_rows
+
+
+TESTS_ROOT = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+# The sizes of the real data files.
+REAL_NEOS = 23967
+REAL_APPROACHES = 406785
+
+# The time span of the real close approach data.
+FIRST = datetime.datetime(1900, 1, 1)
+LAST = datetime.datetime(2099, 12, 31, 23, 59)
+
+CAD_FIELDS = ['des', 'orbit_id', 'jd', 'cd', 'dist', 'dist_min', 'dist_max',
+              'v_rel', 'v_inf', 't_sigma_f', 'h']
+
+
+def generate_neos(path, count):
+    """Write a CSV file of `count` synthetic NEOs, and return their designations.
+
+    :param path: The path of the CSV file to write.
+    :param count: The number of NEOs.
+    :return: A list of the designations of the NEOs, in order.
+    """
+    with open(TEST_NEO_FILE, newline='') as infile:
+        reader = csv.reader(infile)
+        header = next(reader)
+        templates = list(reader)
+    pdes, name = header.index('pdes'), header.index('name')
+    designations = []
+    with open(path, 'w', newline='') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(header)
+        for number in range(count):
+            copy, template = divmod(number, len(templates))
+            row = list(templates[template])
+            if copy:
+                row[pdes] = f"{row[pdes]} S{copy}"
+                if row[name]:
+                    row[name] = f"{row[name]} {copy}"
+            designations.append(row[pdes])
+            writer.writerow(row)
+    return designations
+
+
+def generate_approaches(path, count, designations, seed=0):
+    """Write a JSON file of `count` synthetic close approaches, in chronological order.
+
+    :param path: The path of the JSON file to write.
+    :param count: The number of close approaches.
+    :param designations: The designations of the NEOs that the close approaches may belong to.
+    :param seed: The seed of the random choice of NEOs.
+    """
+    templates = list(iter_cad_rows(TEST_CAD_FILE, CAD_FIELDS))
+    rng = random.Random(seed)
+    step = (LAST - FIRST) / max(count, 1)
+    with open(path, 'w') as outfile:
+        outfile.write('{"signature": {"source": "synthetic", "version": "1.1"}, '
+                      f'"count": "{count}", "fields": {json.dumps(CAD_FIELDS)}, "data": [')
+        for number in range(count):
+            row = list(templates[number % len(templates)])
+            row[0] = rng.choice(designations)
+            row[3] = (FIRST + number * step).strftime('%Y-%b-%d %H:%M')
+            outfile.write((',\n' if number else '\n') + json.dumps(row))
+        outfile.write('\n]}\n')
+
+
+def generate(directory, scale, seed=0):
+    """Write a pair of synthetic data files, `neos.csv` and `cad.json`, to a directory.
+
+    :param directory: The directory in which to write the files, which is created if needed.
+    :param scale: The size of the data files, relative to the real ones (for example, 0.1 or 10).
+    :param seed: The seed of the random choice of each close approach's NEO.
+    :return: A tuple of the paths to the NEO file and the close approach file.
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    neo_path, cad_path = directory / 'neos.csv', directory / 'cad.json'
+    designations = generate_neos(neo_path, max(1, round(scale * REAL_NEOS)))
+    generate_approaches(cad_path, round(scale * REAL_APPROACHES), designations, seed)
+    return neo_path, cad_path
+
+
+def main():
+    """Generate a pair of data files at the requested scale."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory', type=pathlib.Path,
+                        help="The directory in which to write neos.csv and cad.json.")
+    parser.add_argument('--scale', type=float, default=1,
+                        help="The size of the data files, relative to the real ones.")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="The seed of the random choice of each close approach's NEO.")
+    args = parser.parse_args()
+    neo_path, cad_path = generate(args.directory, args.scale, args.seed)
+    print(f"Wrote {neo_path} ({neo_path.stat().st_size / 2 ** 20:.1f} MiB) and "
+          f"{cad_path} ({cad_path.stat().st_size / 2 ** 20:.1f} MiB).")
+
+
+if __name__ == '__main__':
+    main()
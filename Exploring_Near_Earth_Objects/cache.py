@@ -0,0 +1,115 @@
+"""Cache the results of queries against an `NEODatabase`, within a memory budget.
+
+The interactive shell of the main module often repeats a query, or refines it
+with a different `--limit`, `--sort-by` or `--outfile`, while keeping the same
+filters. A `QueryCache` remembers the rows (see `NEODatabase.query_rows`) that
+matched each recent collection of filters, keyed by `filters.filter_key`, so
+that such a query only has to fetch the close approaches at those rows.
+
+The cached rows are compact `array`s of integers. Once their total size exceeds
+the budget, the least recently used entries are evicted. The cache counts its
+hits, misses and evictions, which the shell reports with `cache stats`.
+
+The cache also counts the misses of recent filters that aren't cached, so that
+a capped query, which is cheap to answer directly, need only find every match
+once it's repeated.
+"""
+import collections
+import sys
+
+from filters import filter_key
+
+
+# The default memory budget of a `QueryCache`, in bytes.
+DEFAULT_BUDGET = 64 * 2 ** 20
+# The number of uncached collections of filters whose misses are counted.
+MISSED_KEYS = 256
+
+
+class QueryCache:
+    """A least-recently-used cache of the rows that match collections of filters."""
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        """Create a new, empty `QueryCache`.
+
+        :param budget: The maximum total size, in bytes, of the cached rows.
+        """
+        self.budget = budget
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._missed = collections.OrderedDict()
+
+    def __len__(self):
+        """Return `len(self)`, the number of cached collections of filters."""
+        return len(self._entries)
+
+    def get(self, filters):
+        """Return the cached rows that match a collection of filters, or `None`.
+
+        A successful lookup marks the entry as the most recently used.
+
+        :param filters: A collection of filters.
+        :return: An `array` of rows, or `None` if they aren't cached.
+        """
+        key = filter_key(filters)
+        rows = self._entries.get(key)
+        if rows is None:
+            self.misses += 1
+            self._missed[key] = self._missed.pop(key, 0) + 1
+            if len(self._missed) > MISSED_KEYS:
+                self._missed.popitem(last=False)
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return rows
+
+    def misses_of(self, filters):
+        """Return how many recent lookups of a collection of filters have missed.
+
+        :param filters: A collection of filters.
+        :return: The number of misses since the filters were last cached.
+        """
+        return self._missed.get(filter_key(filters), 0)
+
+    def put(self, filters, rows):
+        """Cache the rows that match a collection of filters, evicting older entries to fit.
+
+        Rows that don't fit in the budget by themselves aren't cached.
+
+        :param filters: A collection of filters.
+        :param rows: An `array` of every row that matches the filters.
+        :return: Whether the rows were cached.
+        """
+        key = filter_key(filters)
+        size = sys.getsizeof(rows)
+        if key in self._entries:
+            self.size -= sys.getsizeof(self._entries.pop(key))
+        if size > self.budget:
+            return False
+        while self.size + size > self.budget:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= sys.getsizeof(evicted)
+            self.evictions += 1
+        self._entries[key] = rows
+        self._missed.pop(key, None)
+        self.size += size
+        return True
+
+    def clear(self):
+        """Evict every entry, without counting them as evictions."""
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self):
+        """Describe the usage of this cache in human-readable text.
+
+        :return: A one-line string of the cache's hits, misses, evictions and size.
+        """
+        lookups = self.hits + self.misses
+        ratio = f" ({self.hits / lookups:.0%} hit rate)" if lookups else ""
+        return (f"{self.hits} hits, {self.misses} misses{ratio}, {self.evictions} evictions; "
+                f"{len(self)} cached queries in {self.size / 2 ** 20:.1f} "
+                f"of {self.budget / 2 ** 20:.1f} MiB.")
@@ -3,15 +3,384 @@
 A `NEODatabase` holds an interconnected data set of NEOs and close approaches.
 It provides methods to fetch an NEO by primary designation or by name, as well
 as a method to query the set of close approaches that match a collection of
-user-specified criteria.
+user-specified criteria. NEOs can also be searched by partial or misspelled
+names and designations with `search_neos`, which is backed by a `names.NameIndex`.
 
 Under normal circumstances, the main module creates one NEODatabase from the
 data on NEOs and close approaches extracted by `extract.load_neos` and
 `extract.load_approaches`.
 
+To avoid scanning every close approach for narrow queries, the database keeps a
+`SortedIndex` over each of the time, distance and velocity columns, as well as
+`ColumnStats` for the diameter and hazardous columns of the linked NEOs. A query
+is turned into a `QueryPlan` by `planner.plan`: it bisects the index that yields
+the fewest candidates and evaluates the remaining predicates on that slice, most
+selective first, as one function compiled from their source.
+
+An `NEODatabase` can also be built from the columns of `parallel.load_columns`
+with `NEODatabase.from_columns`, or opened over a memory-mapped `store.ColumnStore`
+with `NEODatabase.from_store`, in which case the NEOs and close approaches are
+only built as they're accessed.
+
+Optionally, the database can delegate queries to a `VectorizedEngine`, which
+evaluates filters as boolean masks over NumPy columns.
+
+New NEOs and close approaches can be added with `append`, which updates the
+lookups and indexes in place rather than rebuilding them.
+
+Full scans can also be spread over worker processes with `use_shards`, given a
+`sharding.ShardedScan` over the database's snapshot.
+
+Close approaches near in time to a moment - the nearest few, or those within a
+window of days - are found by bisecting the time index, with
+`nearest_approaches` and `approaches_around`. The closest approach ever of each
+NEO is found when the database is linked, for `closest_approach` and
+`approaches_around_closest`.
+
+While a `profiling.Profiler` is active, linking and indexing are timed, and the
+predicates of each query count the rows they scan and match.
+
 You'll edit this file in Tasks 2 and 3.
 """
-from models import NearEarthObject
+import array
+import bisect
+import collections
+import datetime
+import heapq
+import itertools
+import math
+import operator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from helpers import datetime_to_minutes
+from models import NearEarthObject, CloseApproach, RowView
+from names import DEFAULT_LIMIT, NameIndex
+from parallel import objects_from_columns
+from planner import ColumnStats, compile_predicate, plan
+import profiling
+from vectorized import VectorizedEngine
+
+
+# The columns by which query results can be sorted, and the attributes that hold them.
+SORT_ATTRIBUTES = {
+    'time': 'epoch_minutes',
+    'distance': 'distance',
+    'velocity': 'velocity',
+    'diameter': 'neo.diameter',
+}
+SORT_COLUMNS = tuple(SORT_ATTRIBUTES)
+
+# The default number of close approaches found by `NEODatabase.nearest_approaches`.
+DEFAULT_NEAREST = 10
+MINUTES_PER_DAY = 24 * 60
+
+
+class SortedIndex:
+    """A sorted index over one column of close approaches.
+
+    A `SortedIndex` holds the values of a column in sorted order, alongside the
+    row (the position in the database's collection of close approaches) that
+    each value came from. The rows whose values fall within an inclusive range
+    can then be found by bisection.
+    """
+
+    # The number of runs of new values above which `insert` rebuilds the index.
+    INSERT_RUNS = 64
+
+    def __init__(self, values):
+        """Create a new `SortedIndex` from the values of a column, in row order.
+
+        :param values: A sequence of mutually comparable column values.
+        """
+        self.rows = sorted(range(len(values)), key=values.__getitem__)
+        self.keys = [values[row] for row in self.rows]
+        self._in_internal_order = None
+
+    @classmethod
+    def from_sorted(cls, keys, rows):
+        """Create a `SortedIndex` from values that are already sorted.
+
+        :param keys: A sequence of sorted column values.
+        :param rows: A sequence of the rows that each value came from.
+        :return: A `SortedIndex`.
+        """
+        index = cls.__new__(cls)
+        index.keys = keys
+        index.rows = rows
+        index._in_internal_order = None
+        return index
+
+    def __len__(self):
+        """Return `len(self)`, the number of indexed rows."""
+        return len(self.keys)
+
+    def insert(self, values, rows):
+        """Add the values of some new rows to this index, keeping it sorted.
+
+        Each new row must come after every indexed row in internal order, so
+        that it follows the indexed rows with an equal value. The new values
+        that fall between the same two indexed values are inserted with one
+        slice assignment, so appending values larger than every indexed one -
+        such as the times of new close approaches - only touches the end.
+
+        :param values: A sequence of the new column values.
+        :param rows: A sequence of the row of each new value.
+        """
+        pairs = sorted(zip(values, rows))
+        if not pairs:
+            return
+        runs = []
+        for key, row in pairs:
+            position = bisect.bisect_right(self.keys, key)
+            if runs and runs[-1][0] == position:
+                runs[-1][1].append(key)
+                runs[-1][2].append(row)
+            else:
+                runs.append((position, [key], [row]))
+        if self._in_internal_order is not None:
+            self._in_internal_order = (self._in_internal_order and len(runs) == 1
+                                       and runs[0][0] == len(self.keys)
+                                       and runs[0][2] == sorted(runs[0][2]))
+        if len(runs) <= self.INSERT_RUNS:
+            # Insert from the end, so that the positions of earlier runs stay valid.
+            for position, keys, new_rows in reversed(runs):
+                self.keys[position:position] = keys
+                self.rows[position:position] = new_rows
+            return
+        # Otherwise, copy each indexed entry once, interleaving the runs.
+        merged_keys, merged_rows = [], []
+        previous = 0
+        for position, keys, new_rows in runs:
+            merged_keys += self.keys[previous:position]
+            merged_keys += keys
+            merged_rows += self.rows[previous:position]
+            merged_rows += new_rows
+            previous = position
+        merged_keys += self.keys[previous:]
+        merged_rows += self.rows[previous:]
+        self.keys, self.rows = merged_keys, merged_rows
+
+    def in_internal_order(self):
+        """Return whether the rows of this index are in internal order.
+
+        This is the case for the time index when the close approaches are
+        sorted by time, as in the NASA data set. Every span of such an index is
+        then already in internal order.
+        """
+        if self._in_internal_order is None:
+            self._in_internal_order = list(self.rows) == list(range(len(self.rows)))
+        return self._in_internal_order
+
+    def correlation(self, samples=1000):
+        """Estimate the correlation between the order of this index and internal order.
+
+        A correlation near 1 (or -1) means that rows with nearby values are
+        also near each other in internal order - as is the case for approach
+        times - so the matches of a range are clustered rather than spread out.
+
+        :param samples: The number of evenly spaced index positions to sample.
+        :return: Pearson's correlation between sampled positions and their rows, from -1 to 1.
+        """
+        step = max(1, len(self.rows) // samples)
+        rows = list(self.rows[::step])
+        if len(rows) < 2:
+            return 0.0
+        positions = range(len(rows))
+        mean_position = (len(rows) - 1) / 2
+        mean_row = sum(rows) / len(rows)
+        covariance = sum((p - mean_position) * (r - mean_row) for p, r in zip(positions, rows))
+        spread = math.sqrt(sum((p - mean_position) ** 2 for p in positions)
+                           * sum((r - mean_row) ** 2 for r in rows))
+        return covariance / spread if spread else 0.0
+
+    def span(self, lo=None, hi=None):
+        """Find the positions in this index of the values within `[lo, hi]`.
+
+        :param lo: The inclusive lower bound, or `None` if unbounded.
+        :param hi: The inclusive upper bound, or `None` if unbounded.
+        :return: A `(start, stop)` tuple of positions into this index.
+        """
+        start = 0 if lo is None else bisect.bisect_left(self.keys, lo)
+        stop = len(self.keys) if hi is None else bisect.bisect_right(self.keys, hi)
+        return start, max(start, stop)
+
+    def rows_between(self, lo=None, hi=None):
+        """Return the rows whose values are within `[lo, hi]`, in index order.
+
+        :param lo: The inclusive lower bound, or `None` if unbounded.
+        :param hi: The inclusive upper bound, or `None` if unbounded.
+        :return: A list of rows.
+        """
+        start, stop = self.span(lo, hi)
+        return self.rows[start:stop]
+
+    def walk(self, start, stop, descending=False):
+        """Generate the rows at positions `[start, stop)` of this index, in key order.
+
+        Rows with equal keys are always generated in internal order, so that
+        walking the index in descending order agrees with a stable sort.
+
+        :param start: The first position to walk.
+        :param stop: The position after the last one to walk.
+        :param descending: Whether to generate rows from the largest key to the smallest.
+        :return: A stream of rows.
+        """
+        if not descending:
+            yield from map(self.rows.__getitem__, range(start, stop))
+            return
+        keys, rows = self.keys, self.rows
+        while stop > start:
+            # The rows of each run of equal keys are in internal order already.
+            run = bisect.bisect_left(keys, keys[stop - 1], start, stop)
+            yield from rows[run:stop]
+            stop = run
+
+    def nearest(self, value):
+        """Generate the rows of this index in order of the distance of their values from a value.
+
+        The position of the value is found by bisection, and the index is then
+        walked outwards in both directions, so the first `k` rows cost
+        `O(log n + k)`. Of two rows at the same distance, the one with the
+        smaller value comes first, and rows with equal values are generated in
+        internal order.
+
+        :param value: A value, comparable with and subtractable from the indexed values.
+        :return: A stream of rows.
+        """
+        keys, rows = self.keys, self.rows
+        split = bisect.bisect_left(keys, value)
+
+        def below():
+            stop = split
+            while stop > 0:
+                run = bisect.bisect_left(keys, keys[stop - 1], 0, stop)
+                for position in range(run, stop):
+                    yield value - keys[position], rows[position]
+                stop = run
+
+        above = ((keys[position] - value, rows[position]) for position in range(split, len(keys)))
+        # Ties go to the first stream, so to the smaller value.
+        for _, row in heapq.merge(below(), above, key=operator.itemgetter(0)):
+            yield row
+
+
+def _link(neos, approaches):
+    """Link close approaches to their NEOs in bulk.
+
+    Each designation is resolved to an integer code - the row of its NEO -
+    once. The rows of the close approaches are then grouped by code, with a
+    stable sort (vectorized if NumPy is installed), so that the close
+    approaches of each NEO are a contiguous slice of one shared array. Each
+    NEO gets a `RowView` of its slice, rather than a list of its own.
+
+    :param neos: A sequence of `NearEarthObject`s.
+    :param approaches: A sequence of unlinked `CloseApproach`es.
+    :return: A tuple of the linked close approaches, the offset of each
+             NEO's slice of the grouped rows (with a final offset at the
+             end), the grouped rows, a dictionary of each designation's NEO
+             row, and a `collections.Counter` of the close approaches of
+             unknown designations.
+    """
+    code_by_pdes = {neo.designation: code for code, neo in enumerate(neos)}
+    # Read the designations straight from the slot, which is fastest when
+    # every close approach is unlinked and every designation is known.
+    designations = list(map(operator.attrgetter('_unlinked_designation'), approaches))
+    unlinked = collections.Counter()
+    try:
+        codes = array.array('i', map(code_by_pdes.__getitem__, designations))
+    except KeyError:
+        if None in designations:
+            designations = [approach._designation for approach in approaches]
+        codes = array.array('i', map(code_by_pdes.get, designations, itertools.repeat(-1)))
+        if -1 in codes:
+            unlinked.update(designation for designation, code
+                            in zip(designations, codes) if code < 0)
+            approaches = [approach for approach, code in zip(approaches, codes) if code >= 0]
+            codes = array.array('i', filter((-1).__ne__, codes))
+
+    if np is not None:
+        grouped = np.frombuffer(codes, dtype=np.int32)
+        rows = array.array('i', np.argsort(grouped, kind='stable').astype(np.int32).tobytes())
+        offsets = [0, *np.cumsum(np.bincount(grouped, minlength=len(neos))).tolist()]
+    else:
+        counts = collections.Counter(codes)
+        offsets = [0, *itertools.accumulate(counts[code] for code in range(len(neos)))]
+        # A stable sort keeps each NEO's close approaches in their original order.
+        rows = array.array('i', sorted(range(len(codes)), key=codes.tolist().__getitem__))
+
+    collections.deque(map(CloseApproach.link, approaches, map(neos.__getitem__, codes)),
+                      maxlen=0)
+    # Adjacent views share the integer objects of their offsets.
+    for code, neo in enumerate(neos):
+        neo.approaches = RowView(approaches, rows, offsets[code], offsets[code + 1])
+    return approaches, offsets, rows, code_by_pdes, unlinked
+
+
+def _closest_rows(offsets, rows, distances):
+    """Find the row of the closest close approach of each NEO.
+
+    :param offsets: The offset of each NEO's slice of `rows`, with a final offset at the end.
+    :param rows: The rows of the close approaches, grouped by NEO, each group in internal order.
+    :param distances: The distance of the close approach of each row.
+    :return: An `array` of the row of each NEO's closest approach - the first, in internal
+             order, of any that are equally close - or -1 for an NEO without close approaches.
+    """
+    closest = array.array('i', [-1]) * (len(offsets) - 1)
+    if np is not None and len(rows):
+        grouped = np.asarray(rows)
+        bounds = np.asarray(offsets, dtype=np.int64)
+        counts = np.diff(bounds)
+        present = np.flatnonzero(counts)
+        values = np.asarray(distances, dtype=np.float64)[grouped]
+        # The positions that hold their NEO's smallest distance; the first of each NEO's wins.
+        smallest = np.repeat(np.minimum.reduceat(values, bounds[present]), counts[present])
+        positions = np.flatnonzero(values == smallest)
+        codes = np.repeat(np.arange(len(closest)), counts)[positions]
+        found, first = np.unique(codes, return_index=True)
+        np.frombuffer(closest, dtype=np.int32)[found] = grouped[positions[first]]
+        return closest
+    distance = distances.__getitem__
+    for code in range(len(closest)):
+        start, stop = offsets[code], offsets[code + 1]
+        if start < stop:
+            closest[code] = min(rows[start:stop], key=distance)
+    return closest
+
+
+def _to_minutes(when):
+    """Convert a naive `datetime` - or a `date`, for midnight at its start - to epoch minutes."""
+    if not isinstance(when, datetime.datetime):
+        when = datetime.datetime.combine(when, datetime.time())
+    return datetime_to_minutes(when)
+
+
+def _sort_key(column, descending=False):
+    """Return a key function that orders close approaches by a column.
+
+    NEOs of unknown diameter are ordered after every other NEO, whichever the
+    direction of the sort.
+
+    :param column: One of the `SORT_COLUMNS`.
+    :param descending: Whether the key is used to sort in descending order.
+    :return: A 1-argument callable on a `CloseApproach`.
+    """
+    if column == 'diameter':
+        missing = -math.inf if descending else math.inf
+        return lambda approach: (missing if math.isnan(approach.neo.diameter)
+                                 else approach.neo.diameter)
+    return operator.attrgetter(SORT_ATTRIBUTES[column])
+
+
+def _ascending(rows):
+    """Generate rows in ascending order, sorting only as many as are consumed."""
+    heap = list(rows)
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)
 
 
 class NEODatabase:
@@ -23,7 +392,11 @@ class NEODatabase:
     querying for close approaches that match criteria.
     """
 
-    def __init__(self, neos, approaches):
+    # Whether to evaluate the predicates of a query plan as one compiled function,
+    # rather than by calling each predicate in turn.
+    compile_predicates = True
+
+    def __init__(self, neos, approaches, vectorized=False):
         """Create a new `NEODatabase`.
 
         As a precondition, this constructor assumes that the collections of NEOs
@@ -38,25 +411,287 @@ class NEODatabase:
         a collection of that NEO's close approaches, and the `.neo` attribute of
         each close approach references the appropriate NEO.
 
+        Close approaches whose designation doesn't match any NEO are left out
+        of the database. They're counted, by designation, in `.unlinked`.
+
         :param neos: A collection of `NearEarthObject`s.
         :param approaches: A collection of `CloseApproach`es.
+        :param vectorized: Whether to evaluate queries with a `VectorizedEngine`, which requires NumPy.
         """
         self._neos = neos
-        self._approaches = approaches
 
         # : What additional auxiliary data structures will be useful?
         self._neo_by_name = {}
         self._neo_by_pdes = {}
         # : Link together the NEOs and their close approaches.
-        for neo in self._neos:
+        with profiling.stage('link') as stage:
+            for neo in self._neos:
+                self._neo_by_pdes[neo.designation] = neo
+                if neo.name:
+                    self._neo_by_name[neo.name] = neo
+            (self._approaches, self._approach_offsets, self._approach_rows, self._neo_rows,
+             self.unlinked) = _link(neos, approaches)
+            # The row of each NEO's closest approach, by NEO row.
+            self._closest = _closest_rows(self._approach_offsets, self._approach_rows,
+                                          [approach.distance for approach in self._approaches])
+            stage.count(len(self._approaches))
+
+        with profiling.stage('index'):
+            # An index of the names and designations, for prefix and fuzzy searches.
+            self._names = NameIndex(
+                (key, row) for row, neo in enumerate(neos)
+                for key in (neo.designation, neo.name) if key
+            )
+            # Sorted indexes over the close approach columns that range filters target.
+            self._indexes = {
+                'time': SortedIndex([approach.epoch_minutes for approach in self._approaches]),
+                'distance': SortedIndex([approach.distance for approach in self._approaches]),
+                'velocity': SortedIndex([approach.velocity for approach in self._approaches]),
+            }
+            # Statistics used to estimate the selectivity of unindexed columns.
+            self._stats = {
+                'diameter': ColumnStats(approach.neo.diameter for approach in self._approaches),
+                'hazardous': ColumnStats(approach.neo.hazardous for approach in self._approaches),
+            }
+        self._engine = VectorizedEngine(self._neos, self._approaches) if vectorized else None
+        self._column_engine = self._engine
+        self._store = None
+        self._shards = None
+        # The snapshot whose rows are in the internal order of this database, if any.
+        self.snapshot_path = None
+
+    def append(self, neos=(), approaches=()):
+        """Add NEOs and close approaches to this database, updating it in place.
+
+        The new NEOs and close approaches must be unlinked, as for the
+        constructor. NEOs whose designation is already in the database are
+        left out, and so are close approaches whose designation matches no NEO,
+        old or new - they're counted in `.unlinked`. The new close approaches
+        follow the current ones in internal order.
+
+        The lookups, the name index, the sorted indexes and the statistics of
+        the database are updated in place, as is the `VectorizedEngine`, if
+        there is one, rather than rebuilt. The cost is proportional to the
+        number of new NEOs and close approaches, besides moving the entries of
+        the sorted indexes that come after the new values.
+
+        A database over a memory-mapped `store.ColumnStore` is read-only. Since
+        this database no longer matches its snapshot, full scans are no longer
+        spread over worker processes.
+
+        :param neos: A collection of new `NearEarthObject`s.
+        :param approaches: A collection of new `CloseApproach`es.
+        :return: A tuple of the number of NEOs and of close approaches that were added.
+        :raises ValueError: If this database is over a `ColumnStore`.
+        """
+        if self._store is not None:
+            raise ValueError("A database over a memory-mapped snapshot can't be appended to.")
+        added = []
+        for neo in neos:
+            if neo.designation in self._neo_rows:
+                continue
+            self._neo_rows[neo.designation] = len(self._neos)
             self._neo_by_pdes[neo.designation] = neo
             if neo.name:
                 self._neo_by_name[neo.name] = neo
+            neo.approaches = RowView(self._approaches, array.array('i'))
+            self._neos.append(neo)
+            added.append(neo)
+        if self._names is not None:
+            self._names.add((key, self._neo_rows[neo.designation])
+                            for neo in added for key in (neo.designation, neo.name) if key)
+
+        start = len(self._approaches)
+        linked = []
+        neo_rows = array.array('i')
+        rows_by_neo = collections.defaultdict(list)
+        for approach in approaches:
+            designation = approach._designation
+            code = self._neo_rows.get(designation)
+            if code is None:
+                self.unlinked[designation] += 1
+                continue
+            approach.link(self._neos[code])
+            rows_by_neo[code].append(start + len(linked))
+            neo_rows.append(code)
+            linked.append(approach)
+        self._approaches.extend(linked)
+        self._closest.extend(array.array('i', [-1]) * (len(self._neos) - len(self._closest)))
+        for code, rows in rows_by_neo.items():
+            neo = self._neos[code]
+            neo.approaches = neo.approaches.extended(rows)
+            closest = min(rows, key=lambda row: self._approaches[row].distance)
+            if (self._closest[code] < 0 or self._approaches[closest].distance
+                    < self._approaches[self._closest[code]].distance):
+                self._closest[code] = closest
 
-        for approach in self._approaches:
-            neo = self._neo_by_pdes[approach._designation]
-            approach.neo = neo
-            neo.approaches.append(approach)
+        rows = range(start, start + len(linked))
+        for column, index in self._indexes.items():
+            getter = operator.attrgetter(SORT_ATTRIBUTES[column])
+            index.insert([getter(approach) for approach in linked], rows)
+        self._stats['diameter'].add(approach.neo.diameter for approach in linked)
+        self._stats['hazardous'].add(approach.neo.hazardous for approach in linked)
+        if self._column_engine is not None:
+            self._column_engine.append(added, linked, neo_rows)
+        self._shards = None
+        self.snapshot_path = None
+        return len(added), len(linked)
+
+    @classmethod
+    def from_columns(cls, neo_columns, approach_columns, **kwargs):
+        """Create a linked `NEODatabase` from the columns of `parallel.load_columns`.
+
+        :param neo_columns: A dictionary of NEO columns.
+        :param approach_columns: A dictionary of close approach columns.
+        :param kwargs: Additional keyword arguments passed to the constructor.
+        :return: A linked `NEODatabase`.
+        """
+        return cls(*objects_from_columns(neo_columns, approach_columns), **kwargs)
+
+    @classmethod
+    def from_grouped(cls, neos, approaches, approach_neos, offsets, rows, indexes,
+                     vectorized=False):
+        """Create an `NEODatabase` from close approaches that are already grouped and indexed.
+
+        This is the constructor, minus the work that a snapshot has already done
+        (see `snapshot.read_database`): the close approaches are linked through
+        the rows of their NEOs rather than by designation, and the sorted
+        indexes are built from their persisted rows rather than by sorting. The
+        name index is built on first use.
+
+        :param neos: A sequence of unlinked `NearEarthObject`s.
+        :param approaches: A sequence of unlinked `CloseApproach`es, each of which has a known NEO.
+        :param approach_neos: A sequence of the row of each close approach's NEO.
+        :param offsets: The offset of each NEO's slice of `rows`, with a final offset at the end.
+        :param rows: The rows of the close approaches, grouped by NEO, in internal order.
+        :param indexes: A dictionary of each indexed column to a tuple of its values in sorted
+                        order, and the rows of the close approaches that they came from.
+        :param vectorized: Whether to evaluate queries with a `VectorizedEngine`, which requires NumPy.
+        :return: A new `NEODatabase`.
+        """
+        database = cls.__new__(cls)
+        with profiling.stage('link') as stage:
+            collections.deque(map(CloseApproach.link, approaches,
+                                  map(neos.__getitem__, approach_neos)), maxlen=0)
+            for code, neo in enumerate(neos):
+                neo.approaches = RowView(approaches, rows, offsets[code], offsets[code + 1])
+            database._neos = neos
+            database._approaches = approaches
+            database._neo_by_pdes = {neo.designation: neo for neo in neos}
+            database._neo_by_name = {neo.name: neo for neo in neos if neo.name}
+            database._neo_rows = {neo.designation: code for code, neo in enumerate(neos)}
+            database.unlinked = collections.Counter()
+            database._closest = _closest_rows(offsets, rows,
+                                              [approach.distance for approach in approaches])
+            stage.count(len(approaches))
+
+        with profiling.stage('index'):
+            database._names = None
+            # The indexes are copied into lists, which `SortedIndex.insert` can splice.
+            database._indexes = {column: SortedIndex.from_sorted(list(keys), list(index_rows))
+                                 for column, (keys, index_rows) in indexes.items()}
+            database._stats = {
+                'diameter': ColumnStats(approach.neo.diameter for approach in approaches),
+                'hazardous': ColumnStats(approach.neo.hazardous for approach in approaches),
+            }
+        database._engine = VectorizedEngine(neos, approaches) if vectorized else None
+        database._column_engine = database._engine
+        database._store = None
+        database._shards = None
+        database.snapshot_path = None
+        return database
+
+    @classmethod
+    def from_store(cls, store, vectorized=False):
+        """Create an `NEODatabase` over a memory-mapped `store.ColumnStore`.
+
+        The NEOs and close approaches of the store are already linked, and are
+        only built once they're accessed. The sorted indexes are read from the
+        store, and the statistics of unindexed columns are estimated from a
+        sample of its close approaches.
+
+        :param store: A `ColumnStore`.
+        :param vectorized: Whether to evaluate queries with a `VectorizedEngine`, which requires NumPy.
+        :return: A new `NEODatabase`.
+        """
+        database = cls.__new__(cls)
+        database._neos = store.neos
+        database._approaches = store.approaches
+        database._neo_by_name = store.lookup('neo_name')
+        database._neo_by_pdes = store.lookup('neo_designation')
+        database._neo_rows = database._neo_by_pdes.rows()
+        database._names = None
+        database._closest = None
+        database.unlinked = collections.Counter()
+        database._indexes = {
+            column: SortedIndex.from_sorted(*store.sorted_keys(column))
+            for column in ('time', 'distance', 'velocity')
+        }
+        database._stats = {
+            'diameter': ColumnStats(store.neo_column_sample('diameter')),
+            'hazardous': ColumnStats(map(bool, store.neo_column_sample('hazardous'))),
+        }
+        database._engine = VectorizedEngine.from_store(store) if vectorized else None
+        database._column_engine = database._engine
+        database._store = store
+        database._shards = None
+        database.snapshot_path = store.path
+        return database
+
+    def __len__(self):
+        """Return the number of close approaches in this database."""
+        return len(self._approaches)
+
+    def use_shards(self, shards):
+        """Evaluate the filters of full scans with a pool of worker processes.
+
+        :param shards: A `sharding.ShardedScan` over a snapshot of this database, or `None`.
+        """
+        self._shards = shards
+
+    def column_engine(self):
+        """Return a `VectorizedEngine` over the columns of this database, or `None`.
+
+        This is the engine that evaluates queries, if the database is
+        vectorized. Otherwise, one is built on first use and kept, as long as
+        NumPy is installed.
+
+        :return: A `VectorizedEngine`, or `None` if NumPy isn't installed.
+        """
+        if self._column_engine is None and np is not None:
+            if self._store is None:
+                self._column_engine = VectorizedEngine(self._neos, self._approaches)
+            else:
+                self._column_engine = VectorizedEngine.from_store(self._store)
+        return self._column_engine
+
+    def name_index(self):
+        """Return the `names.NameIndex` of the names and designations of the NEOs.
+
+        A database over a `store.ColumnStore`, or from `from_grouped`, builds its
+        index on first use.
+
+        :return: A `NameIndex`, whose rows are positions of NEOs.
+        """
+        if self._names is None:
+            if self._store is None:
+                keys = ((key, row) for row, neo in enumerate(self._neos)
+                        for key in (neo.designation, neo.name) if key)
+            else:
+                keys = itertools.chain(self._neo_by_pdes.rows().items(),
+                                       self._neo_by_name.rows().items())
+            self._names = NameIndex(keys)
+        return self._names
+
+    def search_neos(self, text, limit=DEFAULT_LIMIT):
+        """Search for NEOs by name or primary designation, ignoring case and small misspellings.
+
+        :param text: A whole or partial name or designation, such as 'halley' or 'Er'.
+        :param limit: The maximum number of candidates to return.
+        :return: A list of `(NearEarthObject, Candidate)` pairs, best match first.
+        """
+        return [(self._neos[candidate.row], candidate)
+                for candidate in self.name_index().search(text, limit)]
 
     def get_neo_by_designation(self, designation):
         """Find and return an NEO by its primary designation.
@@ -97,7 +732,7 @@ class NEODatabase:
         else:
             return None
 
-    def query(self, filters=()):
+    def query(self, filters=(), limit=None, sort_by=None, descending=False):
         """Query close approaches to generate those that match a collection of filters.
 
         This generates a stream of `CloseApproach` objects that match all of the
@@ -108,14 +743,258 @@ class NEODatabase:
         The `CloseApproach` objects are generated in internal order, which isn't
         guaranteed to be sorted meaningfully, although is often sorted by time.
 
+        If a `limit` is given, at most that many close approaches are generated,
+        and the query is planned so as to find them without evaluating the
+        filters on every close approach.
+
+        If `sort_by` is given, the matches are generated sorted by that column
+        instead, with ties in internal order and NEOs of unknown diameter last.
+        Sorting by an indexed column may walk its index, and a capped sort only
+        keeps the first `limit` matches with a bounded heap.
+
         :param filters: A collection of filters capturing user-specified criteria.
+        :param limit: The maximum number of matches to generate, or `None` (or 0) for all of them.
+        :param sort_by: One of the `SORT_COLUMNS` by which to sort the matches, or `None`.
+        :param descending: Whether to sort the matches in descending order.
         :return: A stream of matching `CloseApproach` objects.
         """
         # : Generate `CloseApproach` objects that match all of the filters.
-        if filters:
-            for approach in self._approaches:
-                if all(map(lambda f: f(approach), filters)):
-                    yield approach
+        limit = limit or None
+        if sort_by is not None and sort_by not in SORT_ATTRIBUTES:
+            raise ValueError(f"Cannot sort close approaches by {sort_by!r}.")
+        if not filters and sort_by is None:
+            yield from itertools.islice(self._approaches, limit)
+            return
+        if self._engine is not None:
+            yield from self._engine.query(filters, limit, sort_by, descending)
+            return
+
+        query_plan = self.plan(filters, limit, sort_by, descending)
+        if self._sharded(query_plan):
+            # The workers only produce matches, so there's nothing left to evaluate.
+            rows = self._shards.rows(filters, limit if query_plan.order is None else None)
+            matches = map(self._approaches.__getitem__, rows)
+        else:
+            rows = self._candidate_rows(query_plan)
+            candidates = (self._approaches if rows is None
+                          else map(self._approaches.__getitem__, rows))
+            matches = filter(self._predicate(query_plan), candidates)
+
+        key = None if query_plan.order is None else _sort_key(sort_by, descending)
+        if query_plan.order == 'heap':
+            select = heapq.nlargest if descending else heapq.nsmallest
+            yield from select(limit, matches, key=key)
+        elif query_plan.order == 'sort':
+            yield from sorted(matches, key=key, reverse=descending)
+        else:
+            yield from itertools.islice(matches, limit)
+
+    def _sharded(self, query_plan):
+        """Return whether a query plan is a full scan that should be spread over worker processes."""
+        return (self._shards is not None and query_plan.rows is None
+                and query_plan.order != 'index')
+
+    def _candidate_rows(self, query_plan):
+        """Return the rows that the access path of a query plan produces, in evaluation order.
+
+        :param query_plan: A `QueryPlan` of this database.
+        :return: An iterable of rows, or `None` for a full scan in internal order.
+        """
+        if query_plan.order == 'index':
+            return self._indexes[query_plan.sort_by].walk(*query_plan.positions,
+                                                          query_plan.descending)
+        if query_plan.rows is None:
+            return None
+        if self._indexes[query_plan.index].in_internal_order():
+            return query_plan.rows
+        if query_plan.limit is None or query_plan.order is not None:
+            # Restore internal order, so results don't depend on the index used.
+            return sorted(query_plan.rows)
+        # Restore internal order lazily, so the scan stops after `limit` matches.
+        return _ascending(query_plan.rows)
+
+    def query_rows(self, filters=(), limit=None):
+        """Find the rows of the close approaches that match a collection of filters.
+
+        A row is the position of a close approach in the database's collection
+        of close approaches, so rows are a compact way to remember matches.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param limit: The maximum number of rows to find, or `None` (or 0) for all of them.
+        :return: An `array` of the matching rows, in internal order.
+        """
+        limit = limit or None
+        if not filters:
+            return array.array('i', range(len(self._approaches))[:limit])
+        if self._engine is not None:
+            return array.array('i', self._engine.rows(filters, limit).astype(np.int32).tobytes())
+
+        query_plan = self.plan(filters, limit)
+        if self._sharded(query_plan):
+            return self._shards.rows(filters, limit)
+        rows = self._candidate_rows(query_plan)
+        if rows is None:
+            rows = range(len(self._approaches))
+        rows, candidates = itertools.tee(rows)
+        matches = itertools.compress(rows, map(self._predicate(query_plan),
+                                               map(self._approaches.__getitem__, candidates)))
+        return array.array('i', itertools.islice(matches, limit))
+
+    def _predicate(self, query_plan):
+        """Return one predicate that's true of a candidate row of a query plan that matches.
+
+        :param query_plan: A `QueryPlan` of this database.
+        :return: A 1-argument callable on a `CloseApproach`.
+        """
+        profiler = profiling.active()
+        if profiler is not None:
+            # Count the rows that each predicate scans and matches, instead of compiling them.
+            return profiler.counted(query_plan.explain().splitlines()[0],
+                                    [planned.predicate for planned in query_plan.predicates])
+        if self.compile_predicates:
+            return query_plan.compile()
+        predicates = [planned.predicate for planned in query_plan.predicates]
+        return lambda approach: all(map(lambda p: p(approach), predicates))
+
+    def fetch(self, rows, limit=None, sort_by=None, descending=False):
+        """Generate the close approaches at some rows, such as those from `query_rows`.
+
+        :param rows: An iterable of rows.
+        :param limit: The maximum number of close approaches to generate, or `None` (or 0) for all.
+        :param sort_by: One of the `SORT_COLUMNS` by which to sort the close approaches, or `None`.
+        :param descending: Whether to sort the close approaches in descending order.
+        :return: A stream of `CloseApproach` objects, in the order of `rows` unless sorted.
+        """
+        limit = limit or None
+        if sort_by is not None and sort_by not in SORT_ATTRIBUTES:
+            raise ValueError(f"Cannot sort close approaches by {sort_by!r}.")
+        approaches = map(self._approaches.__getitem__, rows)
+        if sort_by is None:
+            yield from itertools.islice(approaches, limit)
+            return
+        key = _sort_key(sort_by, descending)
+        if limit is not None:
+            select = heapq.nlargest if descending else heapq.nsmallest
+            yield from select(limit, approaches, key=key)
         else:
-            for approach in self._approaches:
-                yield approach
+            yield from sorted(approaches, key=key, reverse=descending)
+
+    def closest_approach(self, neo):
+        """Return the closest approach ever of an NEO, by nominal distance.
+
+        The closest approach of every NEO is found once, when the database is
+        linked - or, for a database over a `store.ColumnStore`, on first use.
+
+        :param neo: A `NearEarthObject` of this database.
+        :return: The `CloseApproach` of the NEO with the smallest distance, or `None` if it has none.
+        """
+        if self._closest is None:
+            columns = self._store.columns
+            self._closest = _closest_rows(columns['neo_approach_offsets'],
+                                          columns['neo_approach_rows'],
+                                          columns['approach_distance'])
+        code = self._neo_rows.get(neo.designation)
+        if code is None or self._closest[code] < 0:
+            return None
+        return self._approaches[self._closest[code]]
+
+    def nearest_approaches(self, when, count=DEFAULT_NEAREST, filters=()):
+        """Find the close approaches nearest in time to a moment.
+
+        The time index is bisected at the moment and walked outwards, so
+        without filters this takes `O(log n + count)` time. With filters, the
+        walk goes on until `count` close approaches match.
+
+        :param when: A naive `datetime` in UTC, or a `date` for midnight at its start.
+        :param count: The number of close approaches to find.
+        :param filters: A collection of filters that the close approaches must match.
+        :return: A list of at most `count` `CloseApproach`es, nearest first; of two that are as
+                 near, the earlier comes first.
+        """
+        approaches = map(self._approaches.__getitem__,
+                         self._indexes['time'].nearest(_to_minutes(when)))
+        if filters:
+            approaches = filter(compile_predicate(filters), approaches)
+        return list(itertools.islice(approaches, count))
+
+    def approaches_around(self, when, days, filters=()):
+        """Generate the close approaches within a number of days of a moment, in time order.
+
+        The window is a span of the time index, found by bisection.
+
+        :param when: A naive `datetime` in UTC, or a `date` for midnight at its start.
+        :param days: The number of days before and after the moment - the window is inclusive.
+        :param filters: A collection of filters that the close approaches must match.
+        :return: A stream of `CloseApproach`es, ordered by time, with ties in internal order.
+        """
+        minutes = _to_minutes(when)
+        reach = math.floor(days * MINUTES_PER_DAY)
+        rows = self._indexes['time'].rows_between(minutes - reach, minutes + reach)
+        approaches = map(self._approaches.__getitem__, rows)
+        if filters:
+            approaches = filter(compile_predicate(filters), approaches)
+        yield from approaches
+
+    def approaches_around_closest(self, days, hazardous=None, filters=()):
+        """Generate the close approaches within a number of days of each NEO's closest approach.
+
+        For example, `approaches_around_closest(10, hazardous=True)` finds every
+        close approach - of any NEO - within 10 days of the closest pass of each
+        potentially hazardous NEO. Each window is looked up as by
+        `approaches_around`, so this costs one bisection per NEO rather than a
+        scan.
+
+        :param days: The number of days before and after each closest approach.
+        :param hazardous: If `True` or `False`, only the NEOs with that hazard flag are considered.
+        :param filters: A collection of filters that the close approaches in each window must match.
+        :return: A stream of `(neo, closest, approaches)` tuples, in NEO order, for each NEO with a
+                 close approach, where `approaches` is a list of the close approaches in the window.
+        """
+        for neo, closest in self.closest_approaches(hazardous):
+            yield neo, closest, list(self.approaches_around(closest.time, days, filters))
+
+    def closest_approaches(self, hazardous=None):
+        """Generate the closest approach ever of each NEO that has one.
+
+        :param hazardous: If `True` or `False`, only the NEOs with that hazard flag are considered.
+        :return: A stream of `(neo, closest)` tuples, in NEO order.
+        """
+        for neo in self._neos:
+            if hazardous is not None and neo.hazardous != hazardous:
+                continue
+            closest = self.closest_approach(neo)
+            if closest is not None:
+                yield neo, closest
+
+    def plan(self, filters, limit=None, sort_by=None, descending=False):
+        """Plan the evaluation of a collection of filters against this database.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param limit: The maximum number of matches that will be generated, or `None` for all.
+        :param sort_by: The column by which the matches will be sorted, or `None`.
+        :param descending: Whether the matches will be sorted in descending order.
+        :return: A `QueryPlan` describing how `query` evaluates these filters.
+        """
+        return plan(filters, self._indexes, self._stats, len(self._approaches), limit,
+                    sort_by, descending)
+
+    def explain(self, filters=(), limit=None, sort_by=None, descending=False):
+        """Describe how `query` would evaluate a collection of filters.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param limit: The maximum number of matches that will be generated, or `None` for all.
+        :param sort_by: The column by which the matches will be sorted, or `None`.
+        :param descending: Whether the matches will be sorted in descending order.
+        :return: A human-readable description of the query plan.
+        """
+        if self._engine is not None and (filters or sort_by):
+            if sort_by is not None:
+                direction = 'descending' if descending else 'ascending'
+                return ("Vectorized scan: every filter is evaluated as a boolean mask over "
+                        f"NumPy columns, and the matches are sorted by {sort_by}, in "
+                        f"{direction} order, with a stable argsort.")
+            if limit:
+                return ("Vectorized scan: every filter is evaluated as a boolean mask over "
+                        f"blocks of NumPy columns, until {limit} matches are found.")
+            return "Vectorized scan: every filter is evaluated as a boolean mask over NumPy columns."
+        return self.plan(filters, limit or None, sort_by, descending).explain()
@@ -5,18 +5,31 @@ described in the project instructions, into a collection of `NearEarthObject`s.
 
 The `load_approaches` function extracts close approach data from a JSON file,
 formatted as described in the project instructions, into a collection of
-`CloseApproach` objects.
+`CloseApproach` objects. It's a thin wrapper around `stream_approaches`, which
+generates the close approaches one at a time, and `iter_cad_rows`, which
+incrementally parses the rows of the "data" array without ever holding the
+whole JSON document in memory. Columns are located by name, using the "fields"
+header of the document. The `iter_cad_batches` function splits the "data" array
+into batches of raw JSON text, so that other processes can decode them (see the
+`parallel` module).
+
+While a `profiling.Profiler` is active, loading is timed, and the parsing of
+close approach dates is timed separately.
 
 The main module calls these functions with the arguments provided at the command
 line, and uses the resulting collections to build an `NEODatabase`.
 
 You'll edit this file in Task 2.
 """
+import codecs
 import csv
 import json
+import operator
+import re
 
 from models import NearEarthObject, CloseApproach
 from helpers import cd_to_datetime
+import profiling
 
 
 def load_neos(neo_csv_path):
@@ -26,7 +39,7 @@ def load_neos(neo_csv_path):
     :return: A collection of `NearEarthObject`s.
     """
     NearEarthObjectList = []
-    with open(neo_csv_path, 'r') as infile:
+    with profiling.stage('load_neos') as stage, open(neo_csv_path, 'r') as infile:
         reader = csv.DictReader(infile)
         for row in reader:
             designation = row['pdes']
@@ -38,6 +51,7 @@ def load_neos(neo_csv_path):
             hazardous = row['pha'] == 'Y'
             neo = NearEarthObject(designation, name, diameter, hazardous)
             NearEarthObjectList.append(neo)
+        stage.count(len(NearEarthObjectList))
     return NearEarthObjectList
 
 
@@ -47,16 +61,284 @@ def load_approaches(cad_json_path):
     :param cad_json_path: A path to a JSON file containing data about close approaches.
     :return: A collection of `CloseApproach`es.
     """
-    CloseApproachList = []
     # : Load close approach data from the given JSON file.
-    with open(cad_json_path, "r") as cad_file:
-        reader = json.load(cad_file)
-        data_list = reader["data"]
-        for data in data_list:
-            designation = data[0]
-            time = cd_to_datetime(data[3])
-            distance = float(data[4])
-            velocity = float(data[7])
-            cad = CloseApproach(designation, time, distance, velocity)
-            CloseApproachList.append(cad)
-    return CloseApproachList
+    with profiling.stage('load_approaches') as stage:
+        approaches = list(stream_approaches(cad_json_path))
+        stage.count(len(approaches))
+    return approaches
+
+
+def stream_approaches(cad_json_path):
+    """Generate close approaches, one at a time, from a JSON file.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :yield: Each `CloseApproach`, in the order of the file.
+    """
+    parse_date = profiling.timed('cd_to_datetime', cd_to_datetime)
+    for designation, calendar_date, distance, velocity in iter_cad_rows(
+            cad_json_path, ('des', 'cd', 'dist', 'v_rel')):
+        yield CloseApproach(designation, parse_date(calendar_date),
+                            float(distance), float(velocity))
+
+
+def iter_cad_rows(cad_json_path, columns, chunk_size=1 << 16):
+    """Incrementally parse the rows of the "data" array of a close approach JSON file.
+
+    Only one row of the "data" array is decoded at a time. The requested columns
+    are located through the "fields" header; if the header follows the "data"
+    array in the file, it's first read from the end of the file.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param columns: A sequence of field names, such as `('des', 'cd')`.
+    :param chunk_size: The number of bytes to read from the file at a time.
+    :yield: A tuple of the values of the requested columns, for each row.
+    """
+    with open(cad_json_path, 'rb') as infile:
+        stream = _JSONStream(infile, chunk_size)
+        fields = None
+        for key in stream.keys():
+            if key == 'fields':
+                fields = stream.value()
+            elif key == 'data':
+                if fields is None:
+                    fields = _read_trailing_fields(cad_json_path, chunk_size)
+                try:
+                    indices = [fields.index(column) for column in columns]
+                except ValueError:
+                    raise ValueError(f"{cad_json_path} lacks one of the fields {columns!r}.")
+                getter = operator.itemgetter(*indices)
+                if len(indices) == 1:
+                    for row in stream.items():
+                        yield (getter(row),)
+                else:
+                    for row in stream.items():
+                        yield getter(row)
+            else:
+                stream.value()
+
+
+def iter_cad_batches(cad_json_path, batch_size=10000, chunk_size=1 << 16):
+    """Split the "data" array of a close approach JSON file into batches of raw JSON text.
+
+    The rows are delimited, but not decoded, so that the batches can be handed
+    to other processes to decode in parallel.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param batch_size: The maximum number of rows in each batch.
+    :param chunk_size: The number of bytes to read from the file at a time.
+    :return: A tuple of the list of field names and a generator of batches, each
+             the text of a JSON array of up to `batch_size` rows.
+    """
+    with open(cad_json_path, 'rb') as infile:
+        fields = _skip_to_data(_JSONStream(infile, chunk_size), cad_json_path)
+    if fields is None:
+        fields = _read_trailing_fields(cad_json_path, chunk_size)
+
+    def batches():
+        with open(cad_json_path, 'rb') as infile:
+            stream = _JSONStream(infile, chunk_size)
+            _skip_to_data(stream, cad_json_path)
+            batch = []
+            for row in stream.raw_items():
+                batch.append(row)
+                if len(batch) == batch_size:
+                    yield f"[{','.join(batch)}]"
+                    batch = []
+            if batch:
+                yield f"[{','.join(batch)}]"
+
+    return fields, batches()
+
+
+def _skip_to_data(stream, cad_json_path):
+    """Walk the members of a close approach JSON document up to its "data" array.
+
+    :param stream: A `_JSONStream` at the start of the document.
+    :param cad_json_path: The path of the document, for error messages.
+    :return: The list of field names, if the "fields" header precedes the "data" array, or `None`.
+    """
+    fields = None
+    for key in stream.keys():
+        if key == 'data':
+            return fields
+        if key == 'fields':
+            fields = stream.value()
+        else:
+            stream.value()
+    raise ValueError(f"{cad_json_path} has no \"data\" array.")
+
+
+# The "fields" key of a JSON object, as opposed to a string value "fields".
+_FIELDS_KEY = re.compile(rb'"fields"\s*:')
+# The least number of bytes after a chunk that are searched with it, for keys that straddle chunks.
+_FIELDS_OVERLAP = 64
+
+
+def _read_trailing_fields(cad_json_path, chunk_size):
+    """Read the "fields" header of a close approach JSON file from the end of the file.
+
+    The file is searched backwards, a chunk at a time, for a "fields" key, and
+    the value of the last one that is a list of field names is returned. Each
+    chunk is only searched together with the start of what follows it, so that
+    a key that straddles chunks is found, and reading stays linear in the size
+    of the file.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param chunk_size: The number of bytes to read from the file at a time.
+    :return: The list of field names.
+    """
+    with open(cad_json_path, 'rb') as infile:
+        offset = infile.seek(0, 2)
+        following = b''
+        while offset > 0:
+            size = min(chunk_size, offset)
+            offset -= size
+            infile.seek(offset)
+            chunk = infile.read(size)
+            # Only keys that start in this chunk are new; the rest were tried already.
+            starts = [match.start() for match in _FIELDS_KEY.finditer(chunk + following)
+                      if match.start() < size]
+            for start in reversed(starts):
+                infile.seek(offset + start)
+                stream = _JSONStream(infile, chunk_size)
+                try:
+                    stream.value()
+                    stream.expect(':')
+                    fields = stream.value()
+                except ValueError:
+                    continue
+                if isinstance(fields, list) and all(isinstance(field, str) for field in fields):
+                    return fields
+            following = (chunk + following)[:max(size, _FIELDS_OVERLAP)]
+    raise ValueError(f"{cad_json_path} has no \"fields\" header.")
+
+
+class _JSONStream:
+    """An incremental reader of a JSON document from a binary file.
+
+    The document is decoded a chunk at a time. Objects and arrays can be walked
+    one member at a time with `keys` and `items`, and any other value is decoded
+    as a whole with `value`.
+    """
+
+    _WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, infile, chunk_size):
+        """Create a new `_JSONStream` reading from the current position of a binary file."""
+        self._file = infile
+        self._chunk_size = chunk_size
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """Read another chunk, dropping consumed text. Return False at the end of the file."""
+        if self._eof:
+            return False
+        data = self._file.read(self._chunk_size)
+        self._eof = not data
+        self._buffer = self._buffer[self._pos:] + self._utf8.decode(data, final=self._eof)
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, or '' at the end of the file."""
+        while True:
+            self._pos = self._WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        """Consume and return the next character, which must be one of `chars`."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Malformed JSON: expected one of {chars!r}, found {char!r}.")
+        self._pos += 1
+        return char
+
+    def value(self):
+        """Decode and return the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A value that ends the buffer (such as a number) may continue in the next chunk.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def keys(self):
+        """Walk the members of the next JSON object.
+
+        Each key is yielded with the stream positioned at its value, which the
+        consumer must read (with `value`, `keys` or `items`) before resuming.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+    # The longest prefix of a flat JSON array - such as a row of the "data" array - with no
+    # nested arrays or objects.
+    _FLAT_PREFIX = re.compile(r'\[(?:[^\[\]{}"]|"(?:[^"\\]|\\.)*")*')
+
+    def _flat_end(self):
+        """Return the end of the flat array at the current position, or `None` if the next value isn't one.
+
+        Chunks are read only until the array is closed, or until an element that
+        isn't flat is found, so that the rest of the document is never buffered.
+        """
+        while True:
+            match = self._FLAT_PREFIX.match(self._buffer, self._pos)
+            if match is None:
+                return None
+            end = match.end()
+            # At the end of the buffer, or in an unterminated string, the array may continue.
+            if end < len(self._buffer) and self._buffer[end] != '"':
+                return end + 1 if self._buffer[end] == ']' else None
+            if not self._fill():
+                return None
+
+    def raw_items(self):
+        """Generate the undecoded text of each element of the next JSON array, one at a time."""
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            self.peek()
+            end = self._flat_end()
+            if end is None:
+                # Not a flat array, so decode just this element and encode it again.
+                yield json.dumps(self.value())
+            else:
+                yield self._buffer[self._pos:end]
+                self._pos = end
+            if self.expect(',]') == ']':
+                return
+
+    def items(self):
+        """Generate the decoded elements of the next JSON array, one at a time."""
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
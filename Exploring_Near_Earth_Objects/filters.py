@@ -11,13 +11,31 @@ from a comparator (from the `operator` module), a reference value, and a class
 method `get` that subclasses can override to fetch an attribute of interest from
 the supplied `CloseApproach`.
 
+Each filter also names the `column` of a close approach that it constrains and,
+when its comparator is a closed range (`ge`, `le` or `eq`), can describe itself
+as an `interval` over that column. The `NEODatabase` uses these intervals to
+bisect its sorted indexes rather than scanning every close approach. A filter's
+`attribute` names where the column lives on a close approach, which lets the
+query planner compile its predicates into a single function.
+
+Filters are hashable, and equal when they have the same class, comparator and
+reference value, so `filter_key` can turn a collection of filters into a key that
+doesn't depend on the order of the filters - for example, to cache results.
+
 The `limit` function simply limits the maximum number of values produced by an
-iterator.
+iterator. It's lazy: once it has produced `n` values, it stops pulling from the
+iterator, so an `NEODatabase.query` generator stops evaluating filters too. To
+also let the query plan for the cap - for example, so that an index scan stops
+early - pass the same `n` as the `limit` of `NEODatabase.query`.
 
 You'll edit this file in Tasks 3a and 3c.
 """
+import datetime
+import itertools
 import operator
 
+from helpers import datetime_to_minutes, datetime_to_str, minutes_to_datetime
+
 
 class UnsupportedCriterionError(NotImplementedError):
     """A filter criterion is unsupported."""
@@ -36,9 +54,16 @@ class AttributeFilter:
     infix notation).
 
     Concrete subclasses can override the `get` classmethod to provide custom
-    behavior to fetch a desired attribute from the given `CloseApproach`.
+    behavior to fetch a desired attribute from the given `CloseApproach`, and
+    set `column` to the name of the underlying attribute.
     """
 
+    # The name of the close approach column this filter constrains, if any.
+    column = None
+    # The dotted path of attributes from a close approach to the value produced
+    # by `key`, if there is one, so that predicates on it can be compiled.
+    attribute = None
+
     def __init__(self, op, value):
         """Construct a new `AttributeFilter` from an binary predicate and a reference value.
 
@@ -69,6 +94,60 @@ class AttributeFilter:
         """
         raise UnsupportedCriterionError
 
+    @classmethod
+    def key(cls, approach):
+        """Get the raw value of this filter's `column` from a close approach.
+
+        This is the value by which the `NEODatabase` sorts its indexes. It
+        defaults to the value produced by `get`.
+
+        :param approach: A `CloseApproach` on which to evaluate this filter.
+        :return: The value of this filter's column for the close approach.
+        """
+        return cls.get(approach)
+
+    @classmethod
+    def bound(cls, value, upper):
+        """Convert a reference value into a bound on this filter's `column`.
+
+        :param value: The reference value of a filter.
+        :param upper: Whether the bound is an upper (rather than a lower) bound.
+        :return: An inclusive bound comparable to the values produced by `key`.
+        """
+        return value
+
+    @classmethod
+    def format_bound(cls, bound):
+        """Format a bound on this filter's `column` for humans, such as in a query plan."""
+        return str(bound)
+
+    def interval(self):
+        """Describe this filter as an inclusive interval over its column.
+
+        A `ge` filter is bounded below, a `le` filter is bounded above, and an
+        `eq` filter is bounded on both sides. A missing bound is `None`. Filters
+        with any other comparator can't be expressed as an interval.
+
+        :return: A `(lo, hi)` tuple of inclusive bounds, or `None`.
+        """
+        if self.op is operator.ge:
+            return self.bound(self.value, False), None
+        if self.op is operator.le:
+            return None, self.bound(self.value, True)
+        if self.op is operator.eq:
+            return self.bound(self.value, False), self.bound(self.value, True)
+        return None
+
+    def __eq__(self, other):
+        """Return `self == other`: whether two filters have the same class, comparator and value."""
+        if not isinstance(other, AttributeFilter):
+            return NotImplemented
+        return (type(self), self.op, self.value) == (type(other), other.op, other.value)
+
+    def __hash__(self):
+        """Return `hash(self)`, consistent with `__eq__`."""
+        return hash((type(self), self.op, self.value))
+
     def __repr__(self):
         """Magic method."""
         return f"{self.__class__.__name__}(op=operator.{self.op.__name__}, value={self.value})"
@@ -76,16 +155,38 @@ class AttributeFilter:
 
 class DateFilter(AttributeFilter):
     """Date filter."""
-    
+
+    column = 'time'
+    attribute = 'epoch_minutes'
+
     @classmethod
     def get(cls, approach):
         """Getter."""
         return approach.time.date()
 
+    @classmethod
+    def key(cls, approach):
+        """Key, in minutes since the Unix epoch."""
+        return approach.epoch_minutes
+
+    @classmethod
+    def bound(cls, value, upper):
+        """Widen a date into the first or last minute of that day."""
+        return datetime_to_minutes(
+            datetime.datetime.combine(value, datetime.time.max if upper else datetime.time.min))
+
+    @classmethod
+    def format_bound(cls, bound):
+        """Format a bound in minutes since the Unix epoch as a datetime."""
+        return datetime_to_str(minutes_to_datetime(bound))
+
 
 class DistanceFilter(AttributeFilter):
     """Filter."""
 
+    column = 'distance'
+    attribute = 'distance'
+
     @classmethod
     def get(cls, approach):
         """Getter."""
@@ -95,6 +196,9 @@ class DistanceFilter(AttributeFilter):
 class VelocityFilter(AttributeFilter):
     """Filter."""
 
+    column = 'velocity'
+    attribute = 'velocity'
+
     @classmethod
     def get(cls, approach):
         """Getter."""
@@ -104,6 +208,9 @@ class VelocityFilter(AttributeFilter):
 class DiameterFilter(AttributeFilter):
     """Filter."""
 
+    column = 'diameter'
+    attribute = 'neo.diameter'
+
     @classmethod
     def get(cls, approach):
         """Getter."""
@@ -113,6 +220,9 @@ class DiameterFilter(AttributeFilter):
 class HazadousFilter(AttributeFilter):
     """Filter."""
 
+    column = 'hazardous'
+    attribute = 'neo.hazardous'
+
     @classmethod
     def get(cls, approach):
         """Getter."""
@@ -197,6 +307,15 @@ def create_filters(
     return filter
 
 
+def filter_key(filters):
+    """Return a hashable key for a collection of filters, regardless of their order.
+
+    :param filters: A collection of filters, such as those from `create_filters`.
+    :return: A `frozenset` of the filters.
+    """
+    return frozenset(filters)
+
+
 def limit(iterator, n=None):
     """Produce a limited stream of values from an iterator.
 
@@ -204,9 +323,9 @@ def limit(iterator, n=None):
 
     :param iterator: An iterator of values.
     :param n: The maximum number of values to produce.
-    :yield: The first (at most) `n` values from the iterator.
+    :return: An iterator of the first (at most) `n` values from the iterator.
     """
     # : Produce at most `n` values from the given iterator.
     if n is None or 0 == n:
         return iterator
-    return [data for num, data in enumerate(iterator) if num < n]
+    return itertools.islice(iterator, n)
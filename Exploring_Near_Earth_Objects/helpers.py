@@ -3,14 +3,23 @@
 NASA's dataset provides timestamps as naive datetimes (corresponding to UTC).
 
 The `cd_to_datetime` function converts a string, formatted as the `cd` field of
-NASA's close approach data, into a Python `datetime`
+NASA's close approach data, into a Python `datetime`. Because it's called once
+per close approach, it slices the fixed positions of NASA's canonical format
+directly, and only defers to the slower `strptime` for anything else.
 
 The `datetime_to_str` function converts a Python `datetime` into a string.
 Although `datetime`s already have human-readable string representations, those
 representations display seconds, but NASA's data (and our datetimes!) don't
 provide that level of resolution, so the output format also will not.
+
+The `datetime_to_minutes` and `minutes_to_datetime` functions convert between
+naive datetimes and whole minutes since the Unix epoch, a compact integer
+representation that preserves the resolution of NASA's data. The
+`minutes_to_str` function formats such a number of minutes the same way as
+`datetime_to_str`, without building a `datetime` for every call.
 """
 import datetime
+import functools
 
 
 def cd_to_datetime(calendar_date):
@@ -23,12 +32,46 @@ def cd_to_datetime(calendar_date):
 
     This will become the Python object `datetime.datetime(2020, 12, 31, 12, 0)`.
 
+    The canonical 17-character form is parsed by slicing its fixed positions.
+    Anything else - including invalid dates - is handed to `strptime`, so that
+    the results and errors are the same as `strptime`'s.
+
     :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
     :return: A naive `datetime` corresponding to the given calendar date and time.
     """
+    if len(calendar_date) == 17 and calendar_date[11] == ' ' and calendar_date[14] == ':':
+        hour, minute = calendar_date[12:14], calendar_date[15:]
+        if hour.isdigit() and minute.isdigit() and hour.isascii() and minute.isascii():
+            try:
+                year, month, day = _parse_date_prefix(calendar_date[:11])
+                return datetime.datetime(year, month, day, int(hour), int(minute))
+            except ValueError:
+                pass
     return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
 
 
+# The English locale's abbreviated month names, as used by NASA.
+_MONTHS = {name: number for number, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), start=1)}
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _parse_date_prefix(prefix):
+    """Parse the YYYY-bb-DD prefix of a NASA-formatted calendar date.
+
+    Many close approaches share a date, so the results are memoized.
+
+    :param prefix: The first 11 characters of a calendar date.
+    :return: A `(year, month, day)` tuple of ints.
+    :raises ValueError: If the prefix isn't in the canonical format.
+    """
+    year, month, day = prefix[:4], prefix[5:8], prefix[9:]
+    if prefix[4] != '-' or prefix[8] != '-' or month not in _MONTHS \
+            or not (year + day).isdigit() or not (year + day).isascii():
+        raise ValueError(f"{prefix!r} is not in YYYY-bb-DD format.")
+    return int(year), _MONTHS[month], int(day)
+
+
 def datetime_to_str(dt):
     """Convert a naive Python datetime into a human-readable string.
 
@@ -42,3 +85,47 @@ def datetime_to_str(dt):
     :return: That datetime, as a human-readable string without seconds.
     """
     return datetime.datetime.strftime(dt, "%Y-%m-%d %H:%M")
+
+
+# The origin and unit of the integer representation of datetimes.
+EPOCH = datetime.datetime(1970, 1, 1)
+MINUTE = datetime.timedelta(minutes=1)
+
+
+def datetime_to_minutes(dt):
+    """Convert a naive Python datetime into whole minutes since the Unix epoch.
+
+    Any seconds are truncated, rounding towards the past.
+
+    :param dt: A naive Python datetime.
+    :return: The number of whole minutes from the epoch to that datetime, as an int.
+    """
+    return (dt - EPOCH) // MINUTE
+
+
+def minutes_to_datetime(minutes):
+    """Convert whole minutes since the Unix epoch into a naive Python datetime.
+
+    :param minutes: A number of minutes since the epoch, as an int.
+    :return: The corresponding naive Python datetime.
+    """
+    return EPOCH + datetime.timedelta(minutes=minutes)
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_day(day):
+    """Format the date of a number of whole days since the Unix epoch, as `datetime_to_str` would."""
+    return datetime.datetime.strftime(EPOCH + datetime.timedelta(days=day), "%Y-%m-%d")
+
+
+def minutes_to_str(minutes):
+    """Convert whole minutes since the Unix epoch into a human-readable string.
+
+    The result is the same as `datetime_to_str(minutes_to_datetime(minutes))`,
+    but the date is formatted once per day rather than once per call.
+
+    :param minutes: A number of minutes since the epoch, as an int.
+    :return: That time, as a human-readable string without seconds.
+    """
+    day, minute = divmod(minutes, 1440)
+    return f"{_format_day(day)} {minute // 60:02d}:{minute % 60:02d}"
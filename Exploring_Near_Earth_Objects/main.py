@@ -5,7 +5,7 @@ See `README.md` for a detailed discussion of this project.
 
 This script can be invoked from the command line::
 
-    $ python3 main.py {inspect,query,interactive} [args]
+    $ python3 main.py {inspect,query,stats,proximity,interactive,append,serve} [args]
 
 The `inspect` subcommand looks up an NEO by name or by primary designation, and
 optionally lists all of that NEO's known close approaches:
@@ -14,6 +14,13 @@ optionally lists all of that NEO's known close approaches:
     $ python3 main.py inspect --name Halley
     $ python3 main.py inspect --verbose --name Halley
 
+To find an NEO from a partial or misspelled name or designation, ignoring case,
+use `--search`, which lists the best candidates - exact matches, then prefix
+matches, then the closest matches by edit distance:
+
+    $ python3 main.py inspect --search halley
+    $ python3 main.py inspect --search Er
+
 The `query` subcommand searches for close approaches that match given criteria:
 
     $ python3 main.py query --date 1969-07-29
@@ -23,18 +30,109 @@ The `query` subcommand searches for close approaches that match given criteria:
     $ python3 main.py query --start-date 2000-01-01 --max-diameter 0.1 --not-hazardous
     $ python3 main.py query --hazardous --max-distance 0.05 --min-velocity 30
 
-The set of results can be limited in size and/or saved to an output file in CSV
-or JSON format:
+To see how a query is evaluated - which index it uses, and in which order the
+remaining filters are applied - add `--explain`:
+
+    $ python3 main.py query --explain --start-date 2020-01-01 --max-distance 0.025
+
+Matches are produced in internal order, which is usually by time. To sort them
+by `time`, `distance`, `velocity` or `diameter` instead, use `--sort-by`, and
+add `--desc` to sort from the largest value down:
+
+    $ python3 main.py query --sort-by distance --limit 5
+    $ python3 main.py query --start-date 2020-01-01 --sort-by velocity --desc --limit 5
+
+The `stats` subcommand accepts the same filters, and summarizes the matching
+close approaches instead of listing them - optionally grouped by year, month or
+NEO, with the minimum, mean and maximum of some columns and a histogram:
+
+    $ python3 main.py stats --start-date 2020-01-01 --group-by month --aggregate velocity
+    $ python3 main.py stats --hazardous --group-by neo --top 5
+    $ python3 main.py stats --max-distance 0.1 --histogram diameter --bins 5
+
+The `proximity` subcommand finds the close approaches nearest in time to a
+moment, or every close approach within a window of days around it - optionally
+matching the same filters - by bisecting the database's time index rather than
+scanning. It can also show the closest approach ever of an NEO, or of every
+potentially hazardous NEO, followed by the close approaches around each one:
+
+    $ python3 main.py proximity --at 2020-03-14 --nearest 5
+    $ python3 main.py proximity --at '2020-03-14 12:00' --within 3 --max-distance 0.1
+    $ python3 main.py proximity --closest-of Eros
+    $ python3 main.py proximity --closest-of-hazardous --within 10
+
+The set of results can be limited in size and/or saved to an output file in CSV,
+JSON or newline-delimited JSON format:
 
     $ python3 main.py query --limit 5 --outfile results.csv
     $ python3 main.py query --limit 15 --outfile results.json
+    $ python3 main.py query --outfile results.jsonl
+
+Text output is compressed while it's written if the output file also ends with
+`.gz` (or `.zst`, if the zstandard package is installed), and results can be
+saved as a columnar NumPy archive (if NumPy is installed) with `.npz`:
+
+    $ python3 main.py query --outfile results.csv.gz
+    $ python3 main.py query --outfile results.npz
 
 The `interactive` subcommand loads the NEO database and spawns an interactive
-command shell that can repeatedly execute `inspect` and `query` commands without
-having to wait to reload the database each time. However, it doesn't hot-reload.
+command shell that can repeatedly execute `inspect`, `query` and `stats`
+commands without having to wait to reload the database each time. However, it
+doesn't hot-reload.
+
+Within the interactive shell, the rows that match the filters of recent queries
+are cached, so that repeating a query with a different `--limit`, `--sort-by` or
+`--outfile` doesn't evaluate its filters again. The cache evicts the least
+recently used results beyond `--cache-size` MiB, and the shell's `cache stats`
+command reports its hits, misses and evictions:
+
+    $ python3 main.py interactive --cache-size 128
+
+The `append` subcommand adds the NEOs and close approaches of delta files - in
+the same formats as the data files - to the database's snapshot, without parsing
+the data files again, so that later invocations include them:
+
+    $ python3 main.py append --neos new-neos.csv --approaches new-cad.json
+
+The `serve` subcommand loads the NEO database once and answers `inspect` and
+`query` requests over HTTP, streaming query results as CSV or JSON (see the
+`server` module for the endpoints and their parameters):
+
+    $ python3 main.py serve --port 8000
+    $ curl 'http://127.0.0.1:8000/query?start_date=2020-01-01&limit=5&format=csv'
+
+Queries can be evaluated by a NumPy-backed vectorized engine, if NumPy is
+installed, with `--vectorized`:
+
+    $ python3 main.py --vectorized query --start-date 2050-01-01 --min-velocity 50
+
+To see where the time of a command goes, add `--timings`, which reports the
+wall time, rows and peak memory of each stage - parsing, date parsing, linking,
+indexing, querying and writing - and how many rows each filter of a query scans
+and matches, to stderr. With `--profile FILE`, the command is also profiled with
+cProfile, and the statistics are written to FILE. Neither applies to `serve`,
+whose requests are answered in other threads. In the interactive shell,
+`timing on` reports the timings of each command:
+
+    $ python3 main.py --timings query --start-date 2020-01-01 --max-distance 0.025
+    $ python3 main.py --profile query.prof query --hazardous --outfile results.csv
+    $ python3 -m pstats query.prof
 
 If needed, the script can load data from data files other than the default with
 `--neofile` or `--cadfile`.
+
+The linked data is cached in a binary snapshot next to the close approach data
+file, which is used instead of the data files as long as they haven't changed.
+To ignore and rewrite the snapshot, use `--rebuild-cache`. With `--mmap`, the
+snapshot is memory-mapped instead of read, so that many concurrent processes
+share one copy of the data and only build the objects they touch.
+
+When the data files have to be parsed, `--jobs N` spreads the parsing over N
+worker processes. Queries that have to scan every close approach are then also
+spread over N worker processes, which share the columns of the snapshot:
+
+    $ python3 main.py --jobs 4 --rebuild-cache query --limit 5
+    $ python3 main.py --jobs 4 query --min-diameter 1 --hazardous --outfile results.csv
 """
 import argparse
 import cmd
@@ -44,10 +142,17 @@ import shlex
 import sys
 import time
 
-from extract import load_neos, load_approaches
-from database import NEODatabase
+from aggregate import COLUMNS, GROUPINGS, format_summary, summarize
+from cache import DEFAULT_BUDGET, QueryCache
+from database import DEFAULT_NEAREST, SORT_COLUMNS
 from filters import create_filters, limit
-from write import write_to_csv, write_to_json
+import profiling
+from write import writer_for
+from vectorized import numpy_available
+from server import DEFAULT_HOST, DEFAULT_PORT, NEOServer
+from sharding import ShardedScan
+from snapshot import append_to_snapshot, load_database
+from store import open_database
 
 
 # Paths to the root of the project and the `data` subfolder.
@@ -73,10 +178,25 @@ def date_fromisoformat(date_string):
         raise argparse.ArgumentTypeError(f"'{date_string}' is not a valid date. Use YYYY-MM-DD.")
 
 
+def datetime_fromisoformat(datetime_string):
+    """Return a `datetime.datetime` corresponding to a string in YYYY-MM-DD [hh:mm] format.
+
+    :param datetime_string: A date, optionally followed by a time, such as '2020-03-14 12:00'.
+    :return: A naive `datetime.datetime`, at midnight if no time was given.
+    """
+    for fmt in ('%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.datetime.strptime(datetime_string, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"'{datetime_string}' is not a valid date and time. "
+                                     "Use YYYY-MM-DD or 'YYYY-MM-DD hh:mm'.")
+
+
 def make_parser():
     """Create an ArgumentParser for this script.
 
-    :return: A tuple of the top-level, inspect, and query parsers.
+    :return: A tuple of the top-level, inspect, query, and stats parsers.
     """
     parser = argparse.ArgumentParser(
         description="Explore past and future close approaches of near-Earth objects."
@@ -89,6 +209,23 @@ def make_parser():
     parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
                         type=pathlib.Path,
                         help="Path to JSON file of close approach data.")
+    parser.add_argument('--rebuild-cache', action='store_true',
+                        help="Ignore any cached snapshot of the data files, and rewrite it.")
+    parser.add_argument('--mmap', action='store_true',
+                        help="Memory-map the cached snapshot of the data files, "
+                             "sharing it with other processes.")
+    parser.add_argument('--vectorized', action='store_true',
+                        help="Evaluate queries as vectorized NumPy operations. Requires NumPy.")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="The number of worker processes with which to parse the data files, "
+                             "and to scan every close approach for queries without a "
+                             "narrowing index. Defaults to 1, which does both in this process.")
+    parser.add_argument('--timings', action='store_true',
+                        help="Report the wall time, rows and peak memory of each stage, and the "
+                             "rows that each filter scans and matches, to stderr.")
+    parser.add_argument('--profile', type=pathlib.Path, metavar='FILE',
+                        help="Also profile the command with cProfile, and write the statistics "
+                             "to FILE for `python3 -m pstats`. Implies --timings.")
     subparsers = parser.add_subparsers(dest='cmd')
 
     # Add the `inspect` subcommand parser.
@@ -101,12 +238,13 @@ def make_parser():
                             help="The primary designation of the NEO to inspect (e.g. '433').")
     inspect_id.add_argument('-n', '--name',
                             help="The IAU name of the NEO to inspect (e.g. 'Halley').")
+    inspect_id.add_argument('-s', '--search',
+                            help="A partial or misspelled name or primary designation for which "
+                                 "to list the best candidates (e.g. 'halley').")
 
-    # Add the `query` subcommand parser.
-    query = subparsers.add_parser('query',
-                                  description="Query for close approaches that "
-                                              "match a collection of filters.")
-    filters = query.add_argument_group('Filters',
+    # The filters shared by the `query` and `stats` subcommand parsers.
+    filter_parser = argparse.ArgumentParser(add_help=False)
+    filters = filter_parser.add_argument_group('Filters',
                                        description="Filter close approaches by their attributes "
                                                    "or the attributes of their NEOs.")
     filters.add_argument('-d', '--date', type=date_fromisoformat,
@@ -144,38 +282,117 @@ def make_parser():
     filters.add_argument('--not-hazardous', dest='hazardous', default=None, action='store_false',
                          help="If specified, only return close approaches of NEOs that "
                               "are not potentially hazardous.")
+
+    # Add the `query` subcommand parser.
+    query = subparsers.add_parser('query', parents=[filter_parser],
+                                  description="Query for close approaches that "
+                                              "match a collection of filters.")
     query.add_argument('-l', '--limit', type=int,
                        help="The maximum number of matches to return. "
                             "Defaults to 10 if no --outfile is given.")
     query.add_argument('-o', '--outfile', type=pathlib.Path,
                        help="File in which to save structured results. "
                             "If omitted, results are printed to standard output.")
+    query.add_argument('--sort-by', choices=SORT_COLUMNS,
+                       help="Sort the matches by this column, instead of by internal order. "
+                            "NEOs of unknown diameter are sorted last.")
+    query.add_argument('--desc', dest='descending', action='store_true',
+                       help="With --sort-by, sort the matches in descending order.")
+    query.add_argument('--explain', action='store_true',
+                       help="Before the results, print the plan used to evaluate the filters.")
+
+    # Add the `stats` subcommand parser.
+    stats = subparsers.add_parser('stats', parents=[filter_parser],
+                                  description="Summarize the close approaches that "
+                                              "match a collection of filters.")
+    stats.add_argument('-g', '--group-by', choices=GROUPINGS,
+                       help="Summarize the matches of each year, month or NEO separately.")
+    stats.add_argument('-a', '--aggregate', choices=COLUMNS, action='append', default=[],
+                       help="Also compute the minimum, mean and maximum of this column. "
+                            "Can be given more than once.")
+    stats.add_argument('--histogram', choices=COLUMNS,
+                       help="Also count the matches in equal-width bins of this column.")
+    stats.add_argument('--bins', type=int, default=10,
+                       help="The number of histogram bins. Defaults to 10.")
+    stats.add_argument('--top', type=int,
+                       help="Only show this many groups, those with the most matches.")
 
     repl = subparsers.add_parser('interactive',
                                  description="Start an interactive command session "
                                              "to repeatedly run `interact` and `query` commands.")
     repl.add_argument('-a', '--aggressive', action='store_true',
                       help="If specified, kill the session whenever a project file is modified.")
-    return parser, inspect, query
-
-
-def inspect(database, pdes=None, name=None, verbose=False):
+    repl.add_argument('--cache-size', type=float, default=DEFAULT_BUDGET / 2 ** 20,
+                      help="The memory budget, in MiB, of the cache of query results. "
+                           "Defaults to 64; 0 disables the cache.")
+
+    proximity = subparsers.add_parser('proximity', parents=[filter_parser],
+                                      description="Find the close approaches nearest in time to "
+                                                  "a moment, or to the closest approach ever of "
+                                                  "NEOs, optionally matching the filters.")
+    anchor = proximity.add_mutually_exclusive_group(required=True)
+    anchor.add_argument('--at', type=datetime_fromisoformat,
+                        help="The moment, in YYYY-MM-DD or 'YYYY-MM-DD hh:mm' format (UTC), "
+                             "near which to find close approaches.")
+    anchor.add_argument('--closest-of', metavar='NEO',
+                        help="The primary designation or name of an NEO whose closest approach "
+                             "ever to show, and near which to find close approaches.")
+    anchor.add_argument('--closest-of-hazardous', action='store_true',
+                        help="Show the closest approach ever of every potentially hazardous NEO, "
+                             "and find close approaches near each of them.")
+    proximity.add_argument('-k', '--nearest', type=int, default=DEFAULT_NEAREST,
+                           help="With --at, the number of nearest close approaches to find. "
+                                f"Defaults to {DEFAULT_NEAREST}.")
+    proximity.add_argument('-w', '--within', type=float, metavar='DAYS',
+                           help="Find every close approach within this many days before or "
+                                "after the moment, or each closest approach, instead.")
+
+    append = subparsers.add_parser('append',
+                                   description="Add new NEOs and close approaches from delta "
+                                               "files to the snapshot of the data files.")
+    append.add_argument('--neos', action='append', default=[], type=pathlib.Path,
+                        help="A CSV file of new NEOs, in the format of the NEO data file. "
+                             "Can be given more than once.")
+    append.add_argument('--approaches', action='append', default=[], type=pathlib.Path,
+                        help="A JSON file of new close approaches, in the format of the close "
+                             "approach data file. Can be given more than once.")
+
+    serve = subparsers.add_parser('serve',
+                                  description="Answer `inspect` and `query` requests over HTTP, "
+                                              "from one loaded database.")
+    serve.add_argument('--host', default=DEFAULT_HOST,
+                       help=f"The address on which to listen. Defaults to {DEFAULT_HOST}.")
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT,
+                       help=f"The port on which to listen. Defaults to {DEFAULT_PORT}.")
+    serve.add_argument('-q', '--quiet', action='store_true',
+                       help="Don't log each request to stderr.")
+    return parser, inspect, query, stats
+
+
+def inspect(database, pdes=None, name=None, verbose=False, search=None):
     """Perform the `inspect` subcommand.
 
     This function fetches an NEO by designation or by name. If a matching NEO is
     found, information about the NEO is printed (additionally, information for
     all of the NEO's known close approaches is printed if `verbose=True`).
-    Otherwise, a message is printed noting that there are no matching NEOs.
+    Otherwise, a message is printed noting that there are no matching NEOs,
+    with the closest names or designations, if any.
 
-    At least one of `pdes` and `name` must be given. If both are given, prefer
-    to look up the NEO by the primary designation.
+    At least one of `pdes`, `name` and `search` must be given. If more are
+    given, prefer to look up the NEO by the primary designation, then by name.
+    With only `search`, the best candidates are listed instead, with the close
+    approaches of the best one if `verbose=True`.
 
     :param database: The `NEODatabase` containing data on NEOs and their close approaches.
     :param pdes: The primary designation of an NEO for which to search.
     :param name: The name of an NEO for which to search.
     :param verbose: Whether to additionally print all of a matching NEO's close approaches.
-    :return: The matching `NearEarthObject`, or None if not found.
+    :param search: A partial or misspelled name or designation for which to list candidates.
+    :return: The matching (or best candidate) `NearEarthObject`, or None if not found.
     """
+    if not pdes and not name:
+        return inspect_candidates(database, search, verbose)
+
     # Fetch the NEO of interest.
     if pdes:
         neo = database.get_neo_by_designation(pdes)
@@ -185,6 +402,10 @@ def inspect(database, pdes=None, name=None, verbose=False):
     # Ensure that we have received an NEO.
     if not neo:
         print("No matching NEOs exist in the database.", file=sys.stderr)
+        candidates = database.search_neos(pdes or name, limit=3)
+        if candidates:
+            print(f"Did you mean {', '.join(repr(c.key) for _, c in candidates)}?",
+                  file=sys.stderr)
         return None
 
     # Display information about this NEO, and optionally its close approaches if verbose.
@@ -195,7 +416,43 @@ def inspect(database, pdes=None, name=None, verbose=False):
     return neo
 
 
-def query(database, args):
+def inspect_candidates(database, text, verbose=False):
+    """List the NEOs whose names or designations best match some text.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param text: A partial or misspelled name or designation.
+    :param verbose: Whether to additionally print all of the best candidate's close approaches.
+    :return: The best candidate `NearEarthObject`, or None if there are none.
+    """
+    candidates = database.search_neos(text)
+    if not candidates:
+        print("No matching NEOs exist in the database.", file=sys.stderr)
+        return None
+    for number, (neo, candidate) in enumerate(candidates, 1):
+        match = candidate.kind if candidate.kind != 'fuzzy' else f"{candidate.distance} edits"
+        print(f"{number}. {neo} - {match} on {candidate.key!r}")
+    if verbose:
+        for approach in candidates[0][0].approaches:
+            print(f"- {approach}")
+    return candidates[0][0]
+
+
+def filters_from_args(args):
+    """Create a collection of filters from the filter arguments of a subcommand.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: A collection of filters for use with `query`.
+    """
+    return create_filters(
+        date=args.date, start_date=args.start_date, end_date=args.end_date,
+        distance_min=args.distance_min, distance_max=args.distance_max,
+        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
+        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
+        hazardous=args.hazardous
+    )
+
+
+def query(database, args, cache=None):
     """Perform the `query` subcommand.
 
     Create a collection of filters with `create_filters` and supply them to the
@@ -203,35 +460,184 @@ def query(database, args):
 
     If an output file wasn't given, print these results to stdout, limiting to
     10 entries if no limit was specified. If an output file was given, use the
-    file's extension to infer whether the file should hold CSV or JSON data, and
-    then write the results to the output file in that format.
+    file's extensions to infer whether the file should hold CSV, JSON,
+    newline-delimited JSON or columnar NumPy data, possibly compressed, and then
+    write the results to the output file in that format.
+
+    If a `QueryCache` is given, the rows that match the filters are looked up
+    in it. Every matching row is found and cached if the query isn't capped, or
+    if its filters have missed the cache before.
 
     :param database: The `NEODatabase` containing data on NEOs and their close approaches.
     :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param cache: A `QueryCache` of the rows that match recent filters, or `None`.
     """
     # Construct a collection of filters from arguments supplied at the command line.
-    filters = create_filters(
-        date=args.date, start_date=args.start_date, end_date=args.end_date,
-        distance_min=args.distance_min, distance_max=args.distance_max,
-        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
-        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
-        hazardous=args.hazardous
-    )
-    # Query the database with the collection of filters.
-    results = database.query(filters)
+    filters = filters_from_args(args)
+    # Results printed to stdout are limited to 10 entries if not specified.
+    cap = args.limit if args.outfile else args.limit or 10
+    rows = cache.get(filters) if cache is not None else None
+    if args.explain:
+        if rows is not None:
+            print(f"Cached: the {len(rows)} matching rows are fetched from the query cache.")
+        else:
+            print(database.explain(filters, cap, args.sort_by, args.descending))
+
+    if rows is None and cache is not None:
+        # A capped query is answered directly until it's repeated - with one
+        # more row than needed, to learn whether those are every match.
+        every = not cap or cache.misses_of(filters) > 1
+        with profiling.stage('database.query_rows') as stage:
+            found = database.query_rows(filters, None if every else cap + 1)
+            stage.count(len(found))
+        if every or len(found) <= cap:
+            cache.put(filters, found)
+            rows = found
+        elif args.sort_by is None:
+            rows = found[:cap]
+
+    # Query the database with the collection of filters, telling it about the cap.
+    if rows is not None:
+        results = database.fetch(rows, cap, args.sort_by, args.descending)
+    else:
+        results = database.query(filters, cap, args.sort_by, args.descending)
+    results = profiling.iterate('database.query', results)
 
     if not args.outfile:
-        # Write the results to stdout, limiting to 10 entries if not specified.
-        for result in limit(results, args.limit or 10):
-            print(result)
+        # Write the results to stdout.
+        with profiling.stage('print'):
+            for result in limit(results, cap):
+                print(result)
     else:
-        # Write the results to a file.
-        if args.outfile.suffix == '.csv':
-            write_to_csv(limit(results, args.limit), args.outfile)
-        elif args.outfile.suffix == '.json':
-            write_to_json(limit(results, args.limit), args.outfile)
+        # Write the results to a file, in the format given by its suffixes.
+        writer = writer_for(args.outfile)
+        if writer is None:
+            print("Please use an output file that ends with `.csv`, `.json`, `.jsonl` or `.npz` - "
+                  "optionally compressing text with a further `.gz` or `.zst`.", file=sys.stderr)
+            return
+        try:
+            writer(limit(results, cap), args.outfile)
+        except ImportError as err:
+            print(err, file=sys.stderr)
+
+
+def stats(database, args):
+    """Perform the `stats` subcommand.
+
+    Create a collection of filters with `create_filters`, and summarize the
+    matching close approaches - optionally grouped by year, month or NEO - with
+    `summarize`. The summary is printed to stdout.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    if args.bins < 1:
+        print("The number of histogram bins must be at least 1.", file=sys.stderr)
+        return
+    summary = summarize(database, filters_from_args(args), group_by=args.group_by,
+                        columns=list(dict.fromkeys(args.aggregate)),
+                        histogram=args.histogram, bins=args.bins)
+    print(format_summary(summary, args.top))
+
+
+def proximity(database, args):
+    """Perform the `proximity` subcommand.
+
+    With `--at`, print the close approaches nearest in time to a moment - or,
+    with `--within`, every close approach in a window of days around it. With
+    `--closest-of` or `--closest-of-hazardous`, print the closest approach ever
+    of one NEO or of every potentially hazardous NEO, each followed by the close
+    approaches in a window of days around it with `--within`. Only the close
+    approaches that match the filters are listed, but the closest approaches
+    are chosen among every close approach.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    if args.nearest < 1:
+        print("The number of nearest close approaches must be at least 1.", file=sys.stderr)
+        return
+    if args.within is not None and args.within < 0:
+        print("The window of days must not be negative.", file=sys.stderr)
+        return
+    filters = filters_from_args(args)
+    if args.at is not None:
+        if args.within is None:
+            approaches = database.nearest_approaches(args.at, args.nearest, filters)
         else:
-            print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
+            approaches = database.approaches_around(args.at, args.within, filters)
+        for approach in approaches:
+            print(approach)
+        return
+
+    if args.closest_of is not None:
+        neo = (database.get_neo_by_designation(args.closest_of)
+               or database.get_neo_by_name(args.closest_of))
+        if neo is None:
+            print("No matching NEOs exist in the database.", file=sys.stderr)
+            return
+        closest = database.closest_approach(neo)
+        if closest is None:
+            print(f"{neo} has no known close approaches.", file=sys.stderr)
+            return
+        anchors = [(neo, closest)]
+    else:
+        anchors = database.closest_approaches(hazardous=True)
+    for neo, closest in anchors:
+        print(f"Closest approach of {neo}: {closest}")
+        if args.within is not None:
+            for approach in database.approaches_around(closest.time, args.within, filters):
+                print(f"- {approach}")
+
+
+def report_unlinked(database):
+    """Warn, on stderr, of the close approaches that were skipped because their NEOs are unknown.
+
+    :param database: An `NEODatabase`.
+    """
+    if database.unlinked:
+        print(f"Skipped {sum(database.unlinked.values())} close approaches of "
+              f"{len(database.unlinked)} unknown NEOs, such as "
+              f"{', '.join(map(repr, list(database.unlinked)[:3]))}.", file=sys.stderr)
+
+
+def append(args):
+    """Perform the `append` subcommand.
+
+    Add the NEOs and close approaches of the delta files to the database and
+    its snapshot with `append_to_snapshot`, and report how many were added, and
+    how many close approaches of unknown NEOs were skipped.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: The updated `NEODatabase`, or None if the snapshot couldn't be written.
+    """
+    try:
+        database, (neos, approaches) = append_to_snapshot(
+            args.neofile, args.cadfile, args.neos, args.approaches, jobs=args.jobs)
+    except OSError as err:
+        print(f"Unable to append to the snapshot: {err}", file=sys.stderr)
+        return None
+    report_unlinked(database)
+    print(f"Added {neos} NEOs and {approaches} close approaches to {database.snapshot_path}.")
+    return database
+
+
+def serve(database, args):
+    """Perform the `serve` subcommand.
+
+    Answer HTTP requests with an `NEOServer` until interrupted.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    with NEOServer(database, args.host, args.port, quiet=args.quiet) as server:
+        host, port = server.server_address[:2]
+        print(f"Serving {len(database)} close approaches on http://{host}:{port}/ "
+              f"- press Ctrl-C to stop.", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
 
 
 class NEOShell(cmd.Cmd):
@@ -251,7 +657,11 @@ class NEOShell(cmd.Cmd):
              "Type `help` or `?` to list commands and `exit` to exit.\n")
     prompt = '(neo) '
 
-    def __init__(self, database, inspect_parser, query_parser, aggressive=False, **kwargs):
+    # The commands that are timed while timing is on.
+    timed_commands = ('inspect', 'i', 'query', 'q', 'stats')
+
+    def __init__(self, database, inspect_parser, query_parser, stats_parser=None,
+                 aggressive=False, cache=None, timing=False, **kwargs):
         """Create a new `NEOShell`.
 
         Creating this object doesn't start the session - for that, use `.cmdloop()`.
@@ -259,14 +669,20 @@ class NEOShell(cmd.Cmd):
         :param database: The `NEODatabase` containing data on NEOs and their close approaches.
         :param inspect_parser: The subparser for the `inspect` subcommand.
         :param query_parser: The subparser for the `query` subcommand.
+        :param stats_parser: The subparser for the `stats` subcommand.
         :param aggressive: Whether to kill the session whenever a project file is changed.
+        :param cache: A `QueryCache` of the rows that match recent queries, or `None`.
+        :param timing: Whether to report the timings of each command, as with `timing on`.
         :param kwargs: A dictionary of excess keyword arguments passed to the superclass.
         """
         super().__init__(**kwargs)
         self.db = database
         self.inspect = inspect_parser
         self.query = query_parser
+        self.stats = stats_parser if stats_parser is not None else make_parser()[3]
         self.aggressive = aggressive
+        self.cache = cache
+        self.timing = timing
 
     @classmethod
     def parse_arg_with(cls, arg, parser):
@@ -310,6 +726,10 @@ class NEOShell(cmd.Cmd):
         Additionally, list all known close approaches:
 
             (neo) inspect --verbose --name Eros
+
+        List the best candidates for a partial or misspelled name:
+
+            (neo) inspect --search eros
         """
         args = self.parse_arg_with(arg, self.inspect)
         if not args:
@@ -318,7 +738,7 @@ class NEOShell(cmd.Cmd):
         # Run the `inspect` subcommand.
         inspect(self.db,
                 pdes=args.pdes, name=args.name,
-                verbose=args.verbose)
+                verbose=args.verbose, search=args.search)
 
     def do_q(self, arg):
         """Shorthand for `query`."""
@@ -340,18 +760,105 @@ class NEOShell(cmd.Cmd):
 
             (neo) query --limit 2
 
+        The matches can be sorted by `time`, `distance`, `velocity` or `diameter`
+        with `--sort-by`, from the largest value down with `--desc`:
+
+            (neo) query --sort-by distance --desc --limit 5
+
         The results can be saved to a file (instead of displayed to stdout) with
         `--outfile`:
 
             (neo) query --limit 5 --outfile results.csv
             (neo) query --limit 5 --outfile results.json
+            (neo) query --limit 5 --outfile results.jsonl
         """
         args = self.parse_arg_with(arg, self.query)
         if not args:
             return
 
         # Run the `inspect` subcommand.
-        query(self.db, args)
+        query(self.db, args, self.cache)
+
+    def do_cache(self, arg):
+        """Report on, or clear, the cache of query results.
+
+        Queries remember the rows that match their filters, so repeating a query
+        with the same filters - even with a different `--limit`, `--sort-by` or
+        `--outfile` - doesn't evaluate the filters again. To see how often the
+        cache has been used, and how full it is:
+
+            (neo) cache stats
+
+        To empty it:
+
+            (neo) cache clear
+        """
+        if self.cache is None:
+            print("The query cache is disabled.", file=sys.stderr)
+        elif arg.strip() in ('', 'stats'):
+            print(self.cache.stats())
+        elif arg.strip() == 'clear':
+            self.cache.clear()
+        else:
+            print("Usage: cache [stats|clear]", file=sys.stderr)
+
+    def do_stats(self, arg):
+        """Perform the `stats` subcommand within the REPL session.
+
+        This command behaves the same as the `stats` subcommand from the command
+        line, and accepts the same filters as `query`. For example, to count the
+        close approaches of each month of 2020, with their mean velocity:
+
+            (neo) stats --start-date 2020-01-01 --end-date 2020-12-31 --group-by month -a velocity
+
+        Or to find the five NEOs with the most potentially hazardous approaches:
+
+            (neo) stats --hazardous --group-by neo --top 5
+
+        A histogram of a column can be added with `--histogram` and `--bins`:
+
+            (neo) stats --histogram distance --bins 5
+        """
+        args = self.parse_arg_with(arg, self.stats)
+        if not args:
+            return
+
+        # Run the `stats` subcommand.
+        stats(self.db, args)
+
+    def do_timing(self, arg):
+        """Turn the timing of commands on or off.
+
+        While timing is on, each `inspect`, `query` and `stats` command is
+        followed by the wall time, rows and peak memory of each of its stages,
+        and by the number of rows that each filter of a query scans and matches:
+
+            (neo) timing on
+            (neo) query --start-date 2020-01-01 --max-distance 0.025
+
+        To stop timing commands:
+
+            (neo) timing off
+        """
+        if arg.strip() == 'on':
+            self.timing = True
+        elif arg.strip() == 'off':
+            self.timing = False
+        elif arg.strip():
+            print("Usage: timing [on|off]", file=sys.stderr)
+            return
+        print(f"Timing is {'on' if self.timing else 'off'}.")
+
+    def onecmd(self, line):
+        """Perform a command, reporting its timings if timing is on."""
+        command = self.parseline(line)[0]
+        if not self.timing or command not in self.timed_commands:
+            return super().onecmd(line)
+        with profiling.Profiler() as profiler:
+            with profiling.stage(command):
+                stop = super().onecmd(line)
+        print(profiler.report(), file=sys.stderr)
+        return stop
 
     def do_EOF(self, _arg):
         """Exit the interactive session."""
@@ -379,19 +886,68 @@ class NEOShell(cmd.Cmd):
 
 def main():
     """Run the main script."""
-    parser, inspect_parser, query_parser = make_parser()
+    parser, inspect_parser, query_parser, stats_parser = make_parser()
     args = parser.parse_args()
+    if args.vectorized and not numpy_available():
+        parser.error("--vectorized requires NumPy to be installed.")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1.")
+    if args.cmd == 'serve' and (args.timings or args.profile):
+        parser.error("--timings and --profile can't time serve, whose requests are answered "
+                     "in other threads.")
+    if not (args.timings or args.profile):
+        run(args, inspect_parser, query_parser, stats_parser)
+        return
+    with profiling.Profiler(args.profile) as profiler:
+        run(args, inspect_parser, query_parser, stats_parser)
+    print(profiler.report(), file=sys.stderr)
+
+
+def run(args, inspect_parser, query_parser, stats_parser):
+    """Load the database, and run the chosen subcommand.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param inspect_parser: The subparser for the `inspect` subcommand.
+    :param query_parser: The subparser for the `query` subcommand.
+    :param stats_parser: The subparser for the `stats` subcommand.
+    """
+    if args.cmd == 'append':
+        append(args)
+        return
+
+    # Extract data from the data files (or their snapshot) into structured Python objects.
+    with profiling.stage('load'):
+        if args.mmap:
+            database = open_database(args.neofile, args.cadfile, rebuild=args.rebuild_cache,
+                                     vectorized=args.vectorized, jobs=args.jobs)
+        else:
+            database = load_database(args.neofile, args.cadfile, rebuild=args.rebuild_cache,
+                                     vectorized=args.vectorized, jobs=args.jobs)
+    report_unlinked(database)
+    if args.jobs > 1 and not args.vectorized and database.snapshot_path is not None:
+        database.use_shards(ShardedScan(database.snapshot_path, len(database),
+                                        args.jobs))
 
-    # Extract data from the data files into structured Python objects.
-    database = NEODatabase(load_neos(args.neofile), load_approaches(args.cadfile))
+    if args.cmd is None:
+        return
 
     # Run the chosen subcommand.
-    if args.cmd == 'inspect':
-        inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
-    elif args.cmd == 'query':
-        query(database, args)
-    elif args.cmd == 'interactive':
-        NEOShell(database, inspect_parser, query_parser, aggressive=args.aggressive).cmdloop()
+    with profiling.stage(args.cmd):
+        if args.cmd == 'inspect':
+            inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose,
+                    search=args.search)
+        elif args.cmd == 'query':
+            query(database, args)
+        elif args.cmd == 'stats':
+            stats(database, args)
+        elif args.cmd == 'proximity':
+            proximity(database, args)
+        elif args.cmd == 'serve':
+            serve(database, args)
+        elif args.cmd == 'interactive':
+            cache = QueryCache(int(args.cache_size * 2 ** 20)) if args.cache_size > 0 else None
+            NEOShell(database, inspect_parser, query_parser, stats_parser,
+                     aggressive=args.aggressive, cache=cache, timing=args.timings).cmdloop()
 
 
 if __name__ == '__main__':
@@ -11,14 +11,80 @@ velocity.
 A `NearEarthObject` maintains a collection of its close approaches, and a
 `CloseApproach` maintains a reference to its NEO.
 
+Because a data set holds hundreds of thousands of close approaches, both classes
+use `__slots__` instead of a per-instance `__dict__` (keeping only a weak
+reference slot, so that a memory-mapped store can cache them weakly). A `CloseApproach` stores
+its approach time as an integer number of minutes since the Unix epoch, and
+builds the `datetime` on demand. Once linked to its NEO, it no longer holds its
+own copy of the NEO's designation.
+
+Once linked, the close approaches of an NEO are a `RowView`: a window onto a
+shared array of rows, rather than a list of their own.
+
 The functions that construct these objects use information extracted from the
 data files from NASA, so these objects should be able to handle all of the
 quirks of the data set, such as missing names and unknown diameters.
 
 You'll edit this file in Task 1.
 """
+import array
+import collections.abc
+
+from helpers import cd_to_datetime, datetime_to_str, datetime_to_minutes, minutes_to_datetime
 
-from helpers import cd_to_datetime, datetime_to_str
+
+class RowView(collections.abc.Sequence):
+    """A read-only view of some rows of a sequence, such as the close approaches of an NEO.
+
+    The rows are the positions `rows[start:stop]` of the underlying sequence,
+    so that many views can share one array of rows without copying it.
+    """
+
+    __slots__ = ('_sequence', '_rows', '_start', '_stop')
+
+    def __init__(self, sequence, rows, start=0, stop=None):
+        """Create a new `RowView`.
+
+        :param sequence: The underlying sequence.
+        :param rows: A sequence of positions into the underlying sequence.
+        :param start: The first position of `rows` in this view.
+        :param stop: The position of `rows` after the last one in this view, defaulting to its end.
+        """
+        self._sequence = sequence
+        self._rows = rows
+        self._start = start
+        self._stop = len(rows) if stop is None else stop
+
+    def __len__(self):
+        """Return `len(self)`."""
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        """Return `self[index]`."""
+        if isinstance(index, slice):
+            return RowView(self._sequence, self._rows[self._start:self._stop][index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._sequence[self._rows[self._start + index]]
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation of this object."""
+        return f"RowView({list(self)!r})"
+
+    def extended(self, rows):
+        """Return a new `RowView` of the rows of this view followed by some more rows.
+
+        The new view has an array of its own, so the cost is proportional to
+        the length of the view, rather than to the underlying sequence.
+
+        :param rows: An iterable of further positions into the underlying sequence.
+        :return: A `RowView`.
+        """
+        combined = array.array('i', self._rows[self._start:self._stop])
+        combined.extend(rows)
+        return RowView(self._sequence, combined)
 
 
 class NearEarthObject:
@@ -34,6 +100,8 @@ class NearEarthObject:
     `NEODatabase` constructor.
     """
 
+    __slots__ = ('designation', 'name', 'diameter', 'hazardous', 'approaches', '__weakref__')
+
     # : How can you, and should you, change the arguments to this constructor?
     # If you make changes, be sure to update the comments in this file.
     def __init__(self, pdes, name, diameter, hazadous):
@@ -97,8 +165,14 @@ class CloseApproach:
     initially, this information (the NEO's primary designation) is saved in a
     private attribute, but the referenced NEO is eventually replaced in the
     `NEODatabase` constructor.
+
+    The approach time is stored in `epoch_minutes`, as whole minutes since the
+    Unix epoch, and the `time` property converts it to and from a `datetime`.
     """
 
+    __slots__ = ('epoch_minutes', 'distance', 'velocity', 'neo', '_unlinked_designation',
+                 '__weakref__')
+
     # : How can you, and should you, change the arguments to this constructor?
     # If you make changes, be sure to update the comments in this file.
     def __init__(self, designation, time, distance, velocity):
@@ -110,7 +184,7 @@ class CloseApproach:
         # onto attributes named `_designation`, `time`, `distance`, and `velocity`.
         # You should coerce these values to their appropriate data type and handle any edge cases.
         # The `cd_to_datetime` function will be useful.
-        self._designation = designation
+        self._unlinked_designation = designation
         self.time = time
         self.distance = distance
         self.velocity = velocity
@@ -118,6 +192,44 @@ class CloseApproach:
         # Create an attribute for the referenced NEO, originally None.
         self.neo = None
 
+    @classmethod
+    def from_minutes(cls, designation, epoch_minutes, distance, velocity):
+        """Create a new `CloseApproach` from an approach time in minutes since the Unix epoch.
+
+        This avoids building an intermediate `datetime`.
+        """
+        approach = cls.__new__(cls)
+        approach._unlinked_designation = designation
+        approach.epoch_minutes = epoch_minutes
+        approach.distance = distance
+        approach.velocity = velocity
+        approach.neo = None
+        return approach
+
+    @property
+    def time(self):
+        """Return the approach time, as a naive `datetime` in UTC."""
+        return minutes_to_datetime(self.epoch_minutes)
+
+    @time.setter
+    def time(self, time):
+        """Set the approach time from a naive `datetime` in UTC, to the minute."""
+        self.epoch_minutes = datetime_to_minutes(time)
+
+    @property
+    def _designation(self):
+        """Return the primary designation of this approach's NEO, whether or not it's linked."""
+        neo = self.neo
+        return self._unlinked_designation if neo is None else neo.designation
+
+    def link(self, neo):
+        """Link this close approach to its NEO, and drop the now redundant designation.
+
+        :param neo: The `NearEarthObject` of this close approach.
+        """
+        self.neo = neo
+        self._unlinked_designation = None
+
     @property
     def time_str(self):
         """Return a formatted representation of this `CloseApproach`'s approach time.
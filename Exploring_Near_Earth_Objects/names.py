@@ -0,0 +1,216 @@
+"""Search the names and designations of NEOs by case-insensitive prefix and by edit distance.
+
+A `NameIndex` is built once from the names and primary designations of a
+collection of NEOs (see `NEODatabase.search_neos`), so that partial or
+misspelled lookups - such as 'halley', 'Er' or 'Eross' - don't need a linear
+scan over every NEO:
+
+- The case-folded keys are kept in one sorted list. The keys that start with a
+  prefix are a contiguous slice of it, found with `bisect`. Keys that are added
+  later are inserted in place.
+- Each key is also indexed by its trigrams (its overlapping substrings of three
+  characters, padded at both ends). Close strings share most of their trigrams,
+  so a fuzzy search only computes the edit distance between the query and the
+  few keys that share the most uncommon trigrams with it.
+
+Search results are `Candidate`s, ranked by how well they match: case-insensitive
+exact matches, then prefix matches in alphabetical order, then the closest
+matches by edit distance.
+"""
+import array
+import bisect
+import collections
+import heapq
+
+
+# The kinds of matches, from best to worst.
+KINDS = ('exact', 'prefix', 'fuzzy')
+
+# The default number of candidates to return.
+DEFAULT_LIMIT = 10
+# The number of keys that are compared with the text of a fuzzy search.
+CANDIDATES = 32
+# The fraction of keys above which a trigram is too common to count in a fuzzy search.
+COMMON_FRACTION = 0.05
+
+
+class Candidate(collections.namedtuple('Candidate', ['key', 'row', 'kind', 'distance'])):
+    """A name or designation that matches a search, and how well it matches.
+
+    `key` is the name or designation as it's written in the data set, and `row`
+    the position of its NEO. `kind` is one of the `KINDS`, and `distance` is the
+    edit distance between the query and the case-folded key - for a prefix
+    match, the number of characters after the prefix.
+    """
+
+    __slots__ = ()
+
+
+def _trigrams(text):
+    """Return the set of padded trigrams of a case-folded string."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, bound):
+    """Return the Levenshtein distance between two strings, if it's at most a bound.
+
+    The distance is computed with Myers' bit-parallel algorithm, which keeps a
+    column of the dynamic programming table in the bits of two integers.
+
+    :param a: A string.
+    :param b: A string.
+    :param bound: The largest distance of interest.
+    :return: The edit distance, or `bound + 1` if it's larger than `bound`.
+    """
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    if not a:
+        return min(len(b), bound + 1)
+    masks = {}
+    for i, char in enumerate(a):
+        masks[char] = masks.get(char, 0) | 1 << i
+    full = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    positive, negative, distance = full, 0, len(a)
+    for char in b:
+        equal = masks.get(char, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+        up = negative | ~(horizontal | positive)
+        down = positive & horizontal
+        if up & last:
+            distance += 1
+        elif down & last:
+            distance -= 1
+        up = (up << 1) | 1
+        down <<= 1
+        positive = (down | ~(vertical | up)) & full
+        negative = up & vertical
+    return min(distance, bound + 1)
+
+
+class NameIndex:
+    """An index of strings, such as NEO names, for prefix and fuzzy searches."""
+
+    def __init__(self, keys=()):
+        """Create a new `NameIndex`.
+
+        :param keys: An iterable of `(key, row)` pairs, where each key is a nonempty string.
+        """
+        entries = sorted((key.casefold(), key, row) for key, row in keys)
+        # The case-folded key, key and row of each entry, in the order they were added.
+        self._folded = []
+        self._keys = []
+        self._rows = array.array('i')
+        # The case-folded keys in sorted order, and their entries.
+        self._sorted = [folded for folded, _, _ in entries]
+        self._sorted_entries = array.array('i', range(len(entries)))
+        # The entries that contain each trigram.
+        self._grams = collections.defaultdict(lambda: array.array('i'))
+        self._append(entries)
+
+    def _append(self, entries):
+        """Add `(folded, key, row)` entries to every structure but the sorted keys."""
+        for folded, key, row in entries:
+            entry = len(self._keys)
+            self._folded.append(folded)
+            self._keys.append(key)
+            self._rows.append(row)
+            for gram in _trigrams(folded):
+                self._grams[gram].append(entry)
+
+    def add(self, keys):
+        """Add more keys to this index, in time proportional to their number.
+
+        :param keys: An iterable of `(key, row)` pairs, where each key is a nonempty string.
+        """
+        entries = [(key.casefold(), key, row) for key, row in keys]
+        for entry, (folded, _, _) in enumerate(entries, len(self._keys)):
+            position = bisect.bisect_right(self._sorted, folded)
+            self._sorted.insert(position, folded)
+            self._sorted_entries.insert(position, entry)
+        self._append(entries)
+
+    def __len__(self):
+        """Return `len(self)`, the number of indexed keys."""
+        return len(self._keys)
+
+    def _candidate(self, entry, kind, distance):
+        """Return the `Candidate` of an entry."""
+        return Candidate(self._keys[entry], self._rows[entry], kind, distance)
+
+    def prefixed(self, text, limit=DEFAULT_LIMIT):
+        """Find the keys that start with some text, ignoring case, in alphabetical order.
+
+        :param text: The prefix to search for.
+        :param limit: The maximum number of keys to return.
+        :return: A list of `Candidate`s, exact matches first.
+        """
+        folded = text.casefold()
+        start = bisect.bisect_left(self._sorted, folded)
+        found = []
+        for position in range(start, len(self._sorted)):
+            if len(found) >= limit or not self._sorted[position].startswith(folded):
+                break
+            extra = len(self._sorted[position]) - len(folded)
+            found.append(self._candidate(self._sorted_entries[position],
+                                         'prefix' if extra else 'exact', extra))
+        return found
+
+    def similar(self, text, limit=DEFAULT_LIMIT, bound=None):
+        """Find the keys within an edit distance of some text, ignoring case, closest first.
+
+        Only the `CANDIDATES` keys that share the most selective trigrams with
+        the text are compared with it, so this is a fast approximation.
+
+        :param text: The text to search for.
+        :param limit: The maximum number of keys to return.
+        :param bound: The largest edit distance, defaulting to a third of the length of the text.
+        :return: A list of `Candidate`s, ordered by edit distance and then alphabetically.
+        """
+        folded = text.casefold()
+        if bound is None:
+            bound = max(1, len(folded) // 3)
+        postings = [self._grams[gram] for gram in _trigrams(folded) if gram in self._grams]
+        if not postings:
+            return []
+        # Trigrams shared by many keys, such as the '202' of provisional designations,
+        # say little about a key and are expensive to count, so they're skipped.
+        common = max(len(self) * COMMON_FRACTION, CANDIDATES)
+        selective = [entries for entries in postings if len(entries) <= common]
+        shared = collections.Counter()
+        for entries in selective or [min(postings, key=len)]:
+            shared.update(entries)
+        best = heapq.nlargest(CANDIDATES, shared.items(), key=lambda item: item[1])
+        scored = []
+        for entry, _ in best:
+            distance = edit_distance(folded, self._folded[entry], bound)
+            if distance <= bound:
+                scored.append((distance, self._folded[entry], entry))
+        scored.sort()
+        return [self._candidate(entry, 'exact' if not distance else 'fuzzy', distance)
+                for distance, _, entry in scored[:limit]]
+
+    def search(self, text, limit=DEFAULT_LIMIT, bound=None):
+        """Find the keys that best match some text: exact, then prefix, then fuzzy matches.
+
+        Each row appears at most once, with its best match.
+
+        :param text: The text to search for.
+        :param limit: The maximum number of candidates to return.
+        :param bound: The largest edit distance of fuzzy matches (see `similar`).
+        :return: A list of `Candidate`s, best first.
+        """
+        if not text:
+            return []
+        found = self.prefixed(text, limit)
+        if len(found) < limit:
+            found += self.similar(text, limit, bound)
+        ranked = []
+        seen = set()
+        for candidate in sorted(found, key=lambda c: KINDS.index(c.kind)):
+            if candidate.row not in seen:
+                seen.add(candidate.row)
+                ranked.append(candidate)
+        return ranked[:limit]
@@ -0,0 +1,160 @@
+"""Load the data files with a pool of worker processes.
+
+Most of the time spent loading the data files goes into decoding JSON, parsing
+calendar dates and converting numbers, one row at a time. The `load_columns`
+function spreads that work over a `concurrent.futures.ProcessPoolExecutor`:
+
+- One worker parses the CSV file of NEOs while the others process close approaches.
+- The main process splits the "data" array of the JSON file into batches of raw
+  JSON text (see `extract.iter_cad_batches`), without decoding the rows.
+- Each worker decodes a batch and converts it into compact columns - typed
+  `array.array`s of epoch minutes, distances and velocities, and one string
+  holding every designation - so that very little has to be pickled on the way
+  back to the main process.
+- The main process concatenates the columns of the batches, in order.
+
+The `load_objects` function then builds the same `NearEarthObject`s and
+`CloseApproach`es, in the same order, as `load_neos` and `load_approaches`.
+"""
+import array
+import collections
+import concurrent.futures
+import csv
+import json
+
+from extract import iter_cad_batches
+from helpers import cd_to_datetime, datetime_to_minutes
+from models import NearEarthObject, CloseApproach
+
+
+# The number of close approaches decoded by a worker at a time.
+BATCH_SIZE = 20000
+
+
+def _join_strings(strings):
+    """Pack strings into a single string and an array of the offset at which each ends."""
+    ends = array.array('q')
+    end = 0
+    for string in strings:
+        end += len(string)
+        ends.append(end)
+    return ''.join(strings), ends
+
+
+def _split_strings(heap, ends):
+    """Unpack the strings packed by `_join_strings`."""
+    strings = []
+    start = 0
+    for end in ends:
+        strings.append(heap[start:end])
+        start = end
+    return strings
+
+
+def _neo_columns(neo_csv_path):
+    """Parse a CSV file of NEOs into packed columns, in a worker process."""
+    designations, names = [], []
+    diameters, hazardous = array.array('d'), array.array('b')
+    with open(neo_csv_path, 'r') as infile:
+        for row in csv.DictReader(infile):
+            designations.append(row['pdes'])
+            names.append(row['name'])
+            try:
+                diameters.append(float(row['diameter']))
+            except ValueError:
+                diameters.append(float('nan'))
+            hazardous.append(row['pha'] == 'Y')
+    return _join_strings(designations), _join_strings(names), diameters, hazardous
+
+
+def _approach_columns(batch, positions):
+    """Decode a batch of rows of close approaches into packed columns, in a worker process."""
+    des, cd, dist, v_rel = positions
+    designations = []
+    times, distances, velocities = array.array('q'), array.array('d'), array.array('d')
+    for row in json.loads(batch):
+        designations.append(row[des])
+        times.append(datetime_to_minutes(cd_to_datetime(row[cd])))
+        distances.append(float(row[dist]))
+        velocities.append(float(row[v_rel]))
+    return _join_strings(designations), times, distances, velocities
+
+
+def load_columns(neo_csv_path, cad_json_path, jobs, batch_size=BATCH_SIZE):
+    """Parse a pair of data files into columns with a pool of worker processes.
+
+    The NEO columns are `'designation'` and `'name'` (lists of strings, with
+    missing names as `None`), `'diameter'` (an array of floats) and
+    `'hazardous'` (an array of 0s and 1s). The close approach columns are
+    `'designation'` (a list of strings), `'time'` (an array of epoch minutes),
+    `'distance'` and `'velocity'` (arrays of floats). Rows are in file order.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param jobs: The number of worker processes.
+    :param batch_size: The number of close approaches decoded by a worker at a time.
+    :return: A tuple of a dictionary of NEO columns and a dictionary of close approach columns.
+    """
+    approach_columns = {'designation': [], 'time': array.array('q'),
+                        'distance': array.array('d'), 'velocity': array.array('d')}
+
+    def gather(future):
+        (heap, ends), times, distances, velocities = future.result()
+        approach_columns['designation'].extend(_split_strings(heap, ends))
+        approach_columns['time'].extend(times)
+        approach_columns['distance'].extend(distances)
+        approach_columns['velocity'].extend(velocities)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        neo_future = executor.submit(_neo_columns, neo_csv_path)
+
+        fields, batches = iter_cad_batches(cad_json_path, batch_size)
+        positions = tuple(fields.index(name) for name in ('des', 'cd', 'dist', 'v_rel'))
+        # Bound the number of batches in flight, so that the raw text of the
+        # whole file is never held in memory at once.
+        pending = collections.deque()
+        for batch in batches:
+            pending.append(executor.submit(_approach_columns, batch, positions))
+            if len(pending) > 2 * jobs:
+                gather(pending.popleft())
+        while pending:
+            gather(pending.popleft())
+
+        (designations, designation_ends), (names, name_ends), diameters, hazardous = \
+            neo_future.result()
+
+    neo_columns = {'designation': _split_strings(designations, designation_ends),
+                   'name': [name or None for name in _split_strings(names, name_ends)],
+                   'diameter': diameters, 'hazardous': hazardous}
+    return neo_columns, approach_columns
+
+
+def objects_from_columns(neo_columns, approach_columns):
+    """Build unlinked NEOs and close approaches from the columns of `load_columns`.
+
+    :param neo_columns: A dictionary of NEO columns.
+    :param approach_columns: A dictionary of close approach columns.
+    :return: A tuple of a list of `NearEarthObject`s and a list of `CloseApproach`es.
+    """
+    neos = [NearEarthObject(designation, name, diameter, bool(hazardous))
+            for designation, name, diameter, hazardous in zip(
+                neo_columns['designation'], neo_columns['name'],
+                neo_columns['diameter'], neo_columns['hazardous'])]
+    approaches = [CloseApproach.from_minutes(designation, time, distance, velocity)
+                  for designation, time, distance, velocity in zip(
+                      approach_columns['designation'], approach_columns['time'],
+                      approach_columns['distance'], approach_columns['velocity'])]
+    return neos, approaches
+
+
+def load_objects(neo_csv_path, cad_json_path, jobs, batch_size=BATCH_SIZE):
+    """Read NEOs and close approaches with a pool of worker processes.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param jobs: The number of worker processes.
+    :param batch_size: The number of close approaches decoded by a worker at a time.
+    :return: A tuple of a list of `NearEarthObject`s and a list of `CloseApproach`es,
+             equal to those of `load_neos` and `load_approaches`.
+    """
+    return objects_from_columns(*load_columns(neo_csv_path, cad_json_path, jobs, batch_size))
@@ -0,0 +1,451 @@
+"""Plan the evaluation of a collection of filters against an `NEODatabase`.
+
+The filters produced by `create_filters` are independent of one another - there
+is one per command-line option, in the order the options were declared. The
+`plan` function rewrites them into a `QueryPlan`:
+
+- Every filter that can be expressed as an interval over a column is merged
+  with the other filters on that column into a single `RangePredicate`. For
+  example, `--start-date` and `--end-date` become one range over `time`, and
+  `--date` becomes the range covering that day.
+- The column whose index yields the fewest candidate rows becomes the access
+  path, and its predicate is answered entirely by the index.
+- The remaining predicates are ordered so that the cheapest, most selective
+  predicates are evaluated first, using per-column statistics.
+
+If the number of matches is capped, as with `--limit`, an index scan restores
+internal order lazily, so that it stops after enough matches. A full scan is
+preferred instead when it's expected to find enough matches after reading fewer
+rows than the index would produce - unless a constrained column is correlated
+with internal order, as approach times are, so its matches are clustered.
+
+If the matches are to be sorted by an indexed column, as with `--sort-by`, the
+plan may walk that column's index in key order instead, so that no sort is
+needed and - with a cap - the walk stops after enough matches. Otherwise, the
+candidates of the usual access path are filtered and then sorted, or, with a
+cap, only the first few are kept with a bounded heap.
+
+Rather than calling each predicate in turn on every candidate, a `QueryPlan`
+can `compile` its predicates into one function, generated from source: each
+range is inlined as a chained comparison on the attribute it constrains, such
+as `lo0 <= a.distance <= hi0 and a.neo.hazardous == lo1`, and only opaque
+filters are still called.
+
+A `QueryPlan` can `explain` itself, which the `query` subcommand exposes with
+`--explain`.
+"""
+import bisect
+import math
+
+
+# The relative cost of evaluating a predicate on a column, by where the column
+# lives. Columns on the NEO need an extra attribute dereference per approach.
+APPROACH_COLUMN_COST = 1
+NEO_COLUMN_COST = 2
+# The cost of evaluating a filter that couldn't be merged into a range.
+OPAQUE_FILTER_COST = 3
+# The relative cost, per candidate row of an index scan, of restoring internal
+# order with a heap - which is done in C, so it's cheap compared to a predicate.
+HEAP_ROW_COST = 0.05
+# Above this absolute correlation with internal order, an indexed column's
+# matches are too clustered for a capped full scan to be expected to stop early.
+CORRELATION_THRESHOLD = 0.5
+
+
+class ColumnStats:
+    """Summary statistics of the values of one column, used to estimate selectivity.
+
+    The statistics consist of the number of rows, the number of missing (NaN)
+    values, and an equi-depth histogram: a sorted list of quantiles of the
+    present values, such that each pair of adjacent quantiles brackets an equal
+    share of the rows.
+    """
+
+    def __init__(self, values, buckets=100):
+        """Create a new `ColumnStats` from the values of a column.
+
+        :param values: An iterable of mutually comparable column values.
+        :param buckets: The number of buckets of the equi-depth histogram.
+        """
+        values = list(values)
+        present = sorted(value for value in values if value == value)
+        self.count = len(values)
+        self.nulls = self.count - len(present)
+        if present:
+            step = (len(present) - 1) / buckets
+            self.quantiles = [present[round(i * step)] for i in range(buckets + 1)]
+        else:
+            self.quantiles = []
+
+    def add(self, values):
+        """Count some more values of the column, such as those of newly appended rows.
+
+        The histogram is only built from the new values if there wasn't one,
+        which keeps its estimates fair as long as the new values are few, or
+        distributed like the others.
+
+        :param values: An iterable of column values.
+        """
+        added = ColumnStats(values)
+        self.count += added.count
+        self.nulls += added.nulls
+        if not self.quantiles:
+            self.quantiles = added.quantiles
+
+    def selectivity(self, lo=None, hi=None):
+        """Estimate the fraction of rows whose values are within `[lo, hi]`.
+
+        Missing values never fall within a range.
+
+        :param lo: The inclusive lower bound, or `None` if unbounded.
+        :param hi: The inclusive upper bound, or `None` if unbounded.
+        :return: An estimated fraction between 0 and 1.
+        """
+        if not self.count or not self.quantiles:
+            return 0.0
+        buckets = len(self.quantiles) - 1
+        start = 0 if lo is None else bisect.bisect_left(self.quantiles, lo)
+        stop = len(self.quantiles) if hi is None else bisect.bisect_right(self.quantiles, hi)
+        if (lo is not None and hi is not None and hi < lo) \
+                or (lo is not None and self.quantiles[-1] < lo) \
+                or (hi is not None and hi < self.quantiles[0]):
+            return 0.0
+        # Each quantile stands in for an equal share of the present values. A
+        # range strictly between two quantiles is credited with half a share.
+        covered = max(stop - start, 0.5) / (buckets + 1)
+        return covered * (self.count - self.nulls) / self.count
+
+
+class RangePredicate:
+    """A predicate that a column of a close approach falls within an inclusive range.
+
+    A `RangePredicate` replaces every `AttributeFilter` on the same column that
+    can be expressed as an interval. It fetches the column with the `key`
+    classmethod of those filters, so a range over `time` compares integer minutes
+    since the epoch (`epoch_minutes`) directly, instead of building a `datetime`
+    and calling `.date()` on every approach.
+    """
+
+    def __init__(self, filter_class, lo=None, hi=None):
+        """Create a new `RangePredicate`.
+
+        :param filter_class: The `AttributeFilter` subclass whose column this ranges over.
+        :param lo: The inclusive lower bound, or `None` if unbounded.
+        :param hi: The inclusive upper bound, or `None` if unbounded.
+        """
+        self.filter_class = filter_class
+        self.column = filter_class.column
+        self.lo = lo
+        self.hi = hi
+
+    def narrow(self, lo=None, hi=None):
+        """Intersect this range with another range over the same column.
+
+        :param lo: The inclusive lower bound, or `None` if unbounded.
+        :param hi: The inclusive upper bound, or `None` if unbounded.
+        """
+        if lo is not None and (self.lo is None or lo > self.lo):
+            self.lo = lo
+        if hi is not None and (self.hi is None or hi < self.hi):
+            self.hi = hi
+
+    def __call__(self, approach):
+        """Invoke `self(approach)`."""
+        value = self.filter_class.key(approach)
+        if self.lo is not None and not self.lo <= value:
+            return False
+        if self.hi is not None and not value <= self.hi:
+            return False
+        return True
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation of this object."""
+        lo = None if self.lo is None else self.filter_class.format_bound(self.lo)
+        hi = None if self.hi is None else self.filter_class.format_bound(self.hi)
+        return f"RangePredicate({self.column}, lo={lo}, hi={hi})"
+
+
+class PlannedPredicate:
+    """A predicate of a `QueryPlan`, annotated with its estimated cost and selectivity."""
+
+    def __init__(self, predicate, selectivity, cost):
+        """Create a new `PlannedPredicate`.
+
+        :param predicate: A 1-argument callable on a `CloseApproach`.
+        :param selectivity: The estimated fraction of rows that satisfy the predicate.
+        :param cost: The relative cost of evaluating the predicate once.
+        """
+        self.predicate = predicate
+        self.selectivity = selectivity
+        self.cost = cost
+
+    @property
+    def rank(self):
+        """Return the rank of this predicate - lower ranks are evaluated earlier.
+
+        For a conjunction of independent predicates, evaluating them in
+        increasing order of `cost / (1 - selectivity)` minimizes the expected
+        cost per row.
+        """
+        if self.selectivity >= 1:
+            return math.inf
+        return self.cost / (1 - self.selectivity)
+
+
+class QueryPlan:
+    """A plan for evaluating a collection of filters against an `NEODatabase`.
+
+    A plan consists of an access path - either a full scan or a span of one of
+    the database's sorted indexes - followed by an ordered list of predicates
+    that each candidate row must satisfy, and, if the matches are sorted, how
+    they're put in order.
+    """
+
+    def __init__(self, total, access=None, predicates=(), limit=None,
+                 sort_by=None, descending=False):
+        """Create a new `QueryPlan`.
+
+        :param total: The number of close approaches in the database.
+        :param access: The `RangePredicate` looked up in an index, or `None` for a full scan.
+        :param predicates: The `PlannedPredicate`s, in evaluation order.
+        :param limit: The maximum number of matches to produce, or `None` for all of them.
+        :param sort_by: The column by which to sort the matches, or `None` for internal order.
+        :param descending: Whether to sort the matches in descending order.
+        """
+        self.total = total
+        self.access = access
+        self.rows = None
+        self.predicates = list(predicates)
+        self.limit = limit
+        self.sort_by = sort_by
+        self.descending = descending
+        # One of None (internal order), 'index' (walk the sort column's index),
+        # 'heap' (keep the first `limit` matches) or 'sort' (sort every match).
+        self.order = None
+        # The `(start, stop)` positions walked in the sort column's index.
+        self.positions = None
+        self._compiled = None
+
+    def compile(self):
+        """Compile the predicates of this plan into one function, once.
+
+        :return: A 1-argument callable on a `CloseApproach`, which is true if every predicate is.
+        """
+        if self._compiled is None:
+            self._compiled = compile_predicate(planned.predicate for planned in self.predicates)
+        return self._compiled
+
+    @property
+    def index(self):
+        """Return the name of the indexed column used as the access path, or `None`."""
+        if self.order == 'index':
+            return self.sort_by
+        return None if self.access is None else self.access.column
+
+    @property
+    def span(self):
+        """Return the inclusive `(lo, hi)` interval looked up in the index, or `None`."""
+        return None if self.access is None else (self.access.lo, self.access.hi)
+
+    @property
+    def candidates(self):
+        """Return the number of rows that the access path produces."""
+        if self.positions is not None:
+            return self.positions[1] - self.positions[0]
+        return self.total if self.rows is None else len(self.rows)
+
+    def explain(self):
+        """Describe this plan in human-readable text.
+
+        :return: A multi-line string describing the access path and the predicates.
+        """
+        direction = 'descending' if self.descending else 'ascending'
+        if self.order == 'index':
+            lines = [f"Index walk on {self.index} in {direction} order"
+                     + ("" if self.access is None else f" with {self.access!r}")
+                     + f": {self.candidates} of {self.total} close approaches."]
+        elif self.index is None:
+            lines = [f"Full scan of {self.total} close approaches."]
+        else:
+            lines = [f"Index scan on {self.index} with {self.access!r}: "
+                     f"{self.candidates} of {self.total} close approaches."]
+        if self.limit is not None:
+            lines[0] += f" Stops after {self.limit} matches."
+        if not self.predicates:
+            lines.append("No predicates; every candidate matches.")
+        for number, planned in enumerate(self.predicates, start=1):
+            lines.append(f"{number}. {planned.predicate!r} "
+                         f"(selectivity ~{planned.selectivity:.4f}, cost {planned.cost})")
+        if self.predicates:
+            lines.append(f"Compiled into: {self.compile().expression}")
+        if self.order == 'heap':
+            lines.append(f"Keeps the first {self.limit} matches by {self.sort_by}, "
+                         f"in {direction} order, with a bounded heap.")
+        elif self.order == 'sort':
+            lines.append(f"Sorts the matches by {self.sort_by}, in {direction} order.")
+        return '\n'.join(lines)
+
+
+def compile_predicate(predicates):
+    """Compile a sequence of predicates into one function that evaluates them in order.
+
+    The source of the function is generated so that every `RangePredicate` -
+    or filter that can be expressed as an interval, such as those from
+    `create_filters` - over a column with a known `attribute` is inlined as a
+    comparison, and any other predicate is called. The bounds and the called
+    predicates are bound by name, rather than formatted into the source, so that
+    they compare exactly.
+
+    :param predicates: A sequence of 1-argument callables on a `CloseApproach`.
+    :return: A 1-argument function, with the generated `expression` as an attribute.
+    """
+    namespace = {}
+    terms = []
+    for number, predicate in enumerate(predicates):
+        attribute, interval = None, None
+        if isinstance(predicate, RangePredicate):
+            attribute, interval = predicate.filter_class.attribute, (predicate.lo, predicate.hi)
+        elif getattr(predicate, 'attribute', None) is not None:
+            attribute, interval = predicate.attribute, predicate.interval()
+        if attribute is None or interval is None:
+            namespace[f'p{number}'] = predicate
+            terms.append(f'p{number}(a)')
+            continue
+        value = f'a.{attribute}'
+        lo, hi = namespace[f'lo{number}'], namespace[f'hi{number}'] = interval
+        if lo is not None and hi is not None and lo == hi:
+            terms.append(f'{value} == lo{number}')
+        elif lo is not None and hi is not None:
+            terms.append(f'lo{number} <= {value} <= hi{number}')
+        elif lo is not None:
+            terms.append(f'lo{number} <= {value}')
+        elif hi is not None:
+            terms.append(f'{value} <= hi{number}')
+    expression = ' and '.join(terms) or 'True'
+    exec(compile(f'def predicate(a):\n    return {expression}\n', '<compiled predicate>', 'exec'),
+         namespace)
+    function = namespace['predicate']
+    function.expression = expression
+    return function
+
+
+def plan(filters, indexes, stats, total, limit=None, sort_by=None, descending=False):
+    """Plan the evaluation of a collection of filters.
+
+    :param filters: A collection of filters, such as those from `create_filters`.
+    :param indexes: A mapping from column names to `SortedIndex`es.
+    :param stats: A mapping from column names to `ColumnStats` for unindexed columns.
+    :param total: The number of close approaches in the database.
+    :param limit: The maximum number of matches to produce, or `None` for all of them.
+    :param sort_by: The column by which to sort the matches, or `None` for internal order.
+    :param descending: Whether to sort the matches in descending order.
+    :return: A `QueryPlan`.
+    """
+    ranges = {}
+    opaque = []
+    for f in filters:
+        interval = f.interval() if f.column is not None else None
+        if interval is None:
+            opaque.append(f)
+            continue
+        if f.column not in ranges:
+            ranges[f.column] = RangePredicate(type(f))
+        ranges[f.column].narrow(*interval)
+
+    spans = {column: indexes[column].span(predicate.lo, predicate.hi)
+             for column, predicate in ranges.items() if column in indexes}
+    planned = {}
+    for column, predicate in ranges.items():
+        if column in spans:
+            start, stop = spans[column]
+            selectivity = (stop - start) / total if total else 0.0
+            cost = APPROACH_COLUMN_COST
+        elif column in stats:
+            selectivity = stats[column].selectivity(predicate.lo, predicate.hi)
+            cost = NEO_COLUMN_COST
+        else:
+            selectivity, cost = 1.0, NEO_COLUMN_COST
+        planned[column] = PlannedPredicate(predicate, selectivity, cost)
+
+    # Prefer the indexed range that yields the fewest candidate rows.
+    access = None
+    for column, (start, stop) in spans.items():
+        if access is None or stop - start < spans[access][1] - spans[access][0]:
+            access = column
+
+    query_plan = QueryPlan(total, limit=limit, sort_by=sort_by, descending=descending)
+    if sort_by is None:
+        if access is not None and limit is not None \
+                and _prefer_capped_full_scan(planned.values(), indexes, limit, total):
+            access = None
+    elif sort_by in indexes and _prefer_index_walk(planned, spans, access, sort_by,
+                                                   limit, total):
+        query_plan.order = 'index'
+        query_plan.positions = spans.get(sort_by, (0, total))
+        access = sort_by if sort_by in spans else None
+    else:
+        query_plan.order = 'sort' if limit is None else 'heap'
+
+    if access is not None:
+        query_plan.access = planned.pop(access).predicate
+        if query_plan.order != 'index':
+            query_plan.rows = indexes[access].rows[slice(*spans[access])]
+
+    query_plan.predicates = sorted(planned.values(), key=lambda p: p.rank)
+    query_plan.predicates.extend(PlannedPredicate(f, 1.0, OPAQUE_FILTER_COST) for f in opaque)
+    return query_plan
+
+
+def _prefer_capped_full_scan(planned, indexes, limit, total):
+    """Decide whether a full scan finds `limit` matches more cheaply than the best index scan.
+
+    :param planned: The `PlannedPredicate`s of every range, including the access path's.
+    :param indexes: A mapping from column names to `SortedIndex`es.
+    :param limit: The maximum number of matches to produce.
+    :param total: The number of close approaches in the database.
+    :return: Whether to scan every close approach in internal order instead.
+    """
+    planned = list(planned)
+    if any(abs(indexes[p.predicate.column].correlation()) > CORRELATION_THRESHOLD
+           for p in planned if p.predicate.column in indexes):
+        return False
+    selectivity = 1.0
+    for p in planned:
+        selectivity *= p.selectivity
+    if not selectivity:
+        return False
+    # With independent predicates, matches are spread evenly through internal order.
+    rows_read = min(total, limit / selectivity)
+    candidates = min(p.selectivity for p in planned if p.predicate.column in indexes) * total
+    return rows_read * APPROACH_COLUMN_COST < candidates * HEAP_ROW_COST
+
+
+def _prefer_index_walk(planned, spans, access, sort_by, limit, total):
+    """Decide whether to produce sorted matches by walking the sort column's index.
+
+    Without a cap, walking the index is preferred unless another index yields
+    fewer candidates, since sorting those few is cheaper than filtering the
+    whole span of the sort column. With a cap, the walk stops after `limit`
+    matches, so it's preferred if it's expected to read no more rows than the
+    best access path yields.
+
+    :param planned: A mapping from column names to the `PlannedPredicate` of each range.
+    :param spans: A mapping from indexed column names to `(start, stop)` index positions.
+    :param access: The indexed column that yields the fewest candidates, or `None`.
+    :param sort_by: The indexed column by which to sort the matches.
+    :param limit: The maximum number of matches to produce, or `None` for all of them.
+    :param total: The number of close approaches in the database.
+    :return: Whether to walk the index of `sort_by`.
+    """
+    walked = spans[sort_by][1] - spans[sort_by][0] if sort_by in spans else total
+    candidates = spans[access][1] - spans[access][0] if access is not None else total
+    if limit is None:
+        return walked <= candidates
+    selectivity = 1.0
+    for column, p in planned.items():
+        if column != sort_by:
+            selectivity *= p.selectivity
+    if not selectivity:
+        return walked <= candidates
+    # With independent predicates, matches are spread evenly along the walk.
+    return min(walked, limit / selectivity) <= candidates
@@ -0,0 +1,336 @@
+"""Time the stages of a command, count the rows its filters scan and match, and profile it.
+
+When a command is slow, a `Profiler` shows where the time goes. While it's
+active (as a context manager), the hooks placed in the pipeline report to it:
+
+- `stage` times a named stage, such as `load_approaches` or `write_to_csv`, and
+  records the process's peak memory (its maximum resident set size) after it.
+  Stages nest: the time of a stage includes the time of the stages within it,
+  and its self time doesn't.
+- `iterate` times a lazy stream, such as the results of a query, counting only
+  the time spent producing each item, and counts the items.
+- `timed` wraps a function that's called once per row, such as the parsing of
+  each close approach's date, so that its calls add up to a stage of their own.
+- `NEODatabase` counts, with `Profiler.counted`, how many rows each predicate
+  of a query plan is evaluated on and how many of them it passes.
+
+When no `Profiler` is active, `stage` returns a shared do-nothing context
+manager, and `iterate` and `timed` return their argument unchanged, so the hooks
+cost nothing in normal runs.
+
+Like `cProfile`, a `Profiler` only follows the thread that activated it: the
+hooks of other threads don't see it, so they can't interleave their stages
+with its own.
+
+A `Profiler` can also run `cProfile` over its whole extent, and dump the
+statistics to a file that can be browsed with `python3 -m pstats`.
+
+The main module activates a `Profiler` with `--timings` or `--profile`, and the
+interactive shell with `timing on`.
+"""
+import cProfile
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class _ThreadState(threading.local):
+    """The state of the hooks in each thread."""
+
+    # The active profiler of the thread, if any.
+    active = None
+
+
+_state = _ThreadState()
+
+
+def peak_memory():
+    """Return the peak resident set size of this process, in bytes, or `None` if it's unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports the peak in KiB, and macOS in bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageTiming:
+    """The accumulated wall time, calls and rows of one named stage."""
+
+    def __init__(self, name, depth):
+        """Create a new `StageTiming`.
+
+        :param name: The name of the stage.
+        :param depth: How many stages the stage was first entered within.
+        """
+        self.name = name
+        self.depth = depth
+        self.calls = 0
+        self.seconds = 0.0
+        # The part of `seconds` spent in stages within this one.
+        self.nested = 0.0
+        self.rows = None
+        self.peak = None
+
+    @property
+    def own_seconds(self):
+        """Return the time spent in this stage, excluding the stages within it."""
+        return self.seconds - self.nested
+
+    def count(self, rows):
+        """Add to the number of rows that this stage has produced."""
+        self.rows = (self.rows or 0) + rows
+
+
+class _NullStage:
+    """A do-nothing stand-in for a `StageTiming` context, used while no profiler is active."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def count(self, rows):
+        """Ignore a number of rows."""
+
+
+_NULL_STAGE = _NullStage()
+
+
+class FilterCounts:
+    """How many rows each predicate of a query was evaluated on, and how many it passed."""
+
+    def __init__(self, description, predicates):
+        """Create a new `FilterCounts`.
+
+        :param description: A description of the query's access path.
+        :param predicates: The predicates of the query, in evaluation order.
+        """
+        self.description = description
+        self.predicates = [repr(predicate) for predicate in predicates]
+        self.scanned = 0
+        self.matched = 0
+        # The number of rows evaluated by, and passed by, each predicate.
+        self.evaluated = [0] * len(self.predicates)
+        self.passed = [0] * len(self.predicates)
+
+
+class _Stage:
+    """The context of one entry into a stage of a `Profiler`."""
+
+    def __init__(self, profiler, timing):
+        self._profiler = profiler
+        self._timing = timing
+
+    def __enter__(self):
+        self._profiler._stack.append(self._timing)
+        self._start = time.perf_counter()
+        return self._timing
+
+    def __exit__(self, *exc_info):
+        self._profiler._finish(self._timing, time.perf_counter() - self._start)
+        self._timing.peak = peak_memory()
+        return False
+
+
+class Profiler:
+    """A collector of stage timings, filter counts and, optionally, `cProfile` statistics."""
+
+    def __init__(self, profile_path=None):
+        """Create a new `Profiler`.
+
+        Creating this object doesn't activate it - for that, use it as a context manager.
+
+        :param profile_path: A path to which to dump `cProfile` statistics, or `None` not to profile.
+        """
+        self.profile_path = profile_path
+        # The timing of each stage, in the order they were first entered.
+        self.stages = {}
+        # The `FilterCounts` of each query, in order.
+        self.queries = []
+        self._stack = []
+        self._previous = None
+        self._profile = None
+
+    def __enter__(self):
+        """Activate this profiler in this thread, and start `cProfile` if requested."""
+        self._previous, _state.active = _state.active, self
+        if self.profile_path is not None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Deactivate this profiler, and dump any `cProfile` statistics."""
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(str(self.profile_path))
+            self._profile = None
+        _state.active, self._previous = self._previous, None
+        return False
+
+    def _timing(self, name):
+        """Return the `StageTiming` of a stage, creating it on first use."""
+        timing = self.stages.get(name)
+        if timing is None:
+            timing = self.stages[name] = StageTiming(name, len(self._stack))
+        return timing
+
+    def _finish(self, timing, elapsed, calls=1):
+        """Account for time spent in a stage, which has just been left."""
+        self._stack.pop()
+        timing.calls += calls
+        timing.seconds += elapsed
+        if self._stack:
+            self._stack[-1].nested += elapsed
+
+    def stage(self, name):
+        """Return a context manager that times one entry into a stage.
+
+        :param name: The name of the stage.
+        :return: A context manager, whose target is the stage's `StageTiming`.
+        """
+        return _Stage(self, self._timing(name))
+
+    def iterate(self, name, iterable):
+        """Generate the items of an iterable, timing the production of each one as a stage.
+
+        :param name: The name of the stage.
+        :param iterable: An iterable, such as a stream of query results.
+        :yield: Each item of the iterable.
+        """
+        timing = self._timing(name)
+        timing.calls += 1
+        timing.count(0)
+        iterator = iter(iterable)
+        while True:
+            self._stack.append(timing)
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._finish(timing, time.perf_counter() - start, calls=0)
+                timing.peak = peak_memory()
+            timing.rows += 1
+            yield item
+
+    def timed(self, name, function):
+        """Wrap a function so that its calls are timed as a stage.
+
+        :param name: The name of the stage.
+        :param function: A callable.
+        :return: A callable that calls the function.
+        """
+        timing = self._timing(name)
+        stack = self._stack
+        clock = time.perf_counter
+
+        def wrapper(*args):
+            stack.append(timing)
+            start = clock()
+            try:
+                return function(*args)
+            finally:
+                self._finish(timing, clock() - start)
+
+        return wrapper
+
+    def counted(self, description, predicates):
+        """Combine the predicates of a query into one, which counts the rows each evaluates and passes.
+
+        :param description: A description of the query's access path.
+        :param predicates: A sequence of 1-argument callables on a `CloseApproach`, in evaluation order.
+        :return: A 1-argument callable on a `CloseApproach`, which is true if every predicate is.
+        """
+        counts = FilterCounts(description, predicates)
+        self.queries.append(counts)
+        numbered = list(enumerate(predicates))
+        evaluated, passed = counts.evaluated, counts.passed
+
+        def predicate(approach):
+            counts.scanned += 1
+            for number, each in numbered:
+                evaluated[number] += 1
+                if not each(approach):
+                    return False
+                passed[number] += 1
+            counts.matched += 1
+            return True
+
+        return predicate
+
+    def report(self):
+        """Describe the stage timings, filter counts and any `cProfile` output in human-readable text.
+
+        :return: A multi-line string.
+        """
+        lines = [f"{'Stage':<36} {'Calls':>8} {'Total ms':>10} {'Self ms':>10} "
+                 f"{'Rows':>10} {'Peak MiB':>9}"]
+        for timing in self.stages.values():
+            rows = '' if timing.rows is None else timing.rows
+            peak = '' if timing.peak is None else f"{timing.peak / 2 ** 20:.1f}"
+            lines.append(f"{'  ' * timing.depth + timing.name:<36} {timing.calls:>8} "
+                         f"{timing.seconds * 1000:>10.1f} {timing.own_seconds * 1000:>10.1f} "
+                         f"{rows:>10} {peak:>9}")
+        for number, counts in enumerate(self.queries, start=1):
+            lines.append(f"Query {number}: {counts.description}")
+            lines.append(f"  Scanned {counts.scanned} rows, of which {counts.matched} matched.")
+            for position, text in enumerate(counts.predicates):
+                evaluated, passed = counts.evaluated[position], counts.passed[position]
+                share = f" ({passed / evaluated:.2%})" if evaluated else ""
+                lines.append(f"  {position + 1}. {text}: {evaluated} scanned, "
+                             f"{passed} matched{share}")
+        if self.profile_path is not None:
+            lines.append(f"Profile written to {self.profile_path}; "
+                         f"browse it with `python3 -m pstats {self.profile_path}`.")
+        return '\n'.join(lines)
+
+
+def active():
+    """Return the active `Profiler` of this thread, or `None`."""
+    return _state.active
+
+
+def stage(name):
+    """Return a context manager that times one entry into a stage of the active profiler.
+
+    :param name: The name of the stage.
+    :return: A context manager, whose target has a `count(rows)` method.
+    """
+    profiler = _state.active
+    if profiler is None:
+        return _NULL_STAGE
+    return profiler.stage(name)
+
+
+def iterate(name, iterable):
+    """Time the production of each item of an iterable as a stage of the active profiler.
+
+    :param name: The name of the stage.
+    :param iterable: An iterable, such as a stream of query results.
+    :return: The iterable itself, if no profiler is active, or an iterator over its items.
+    """
+    profiler = _state.active
+    if profiler is None:
+        return iterable
+    return profiler.iterate(name, iterable)
+
+
+def timed(name, function):
+    """Time the calls of a function as a stage of the active profiler.
+
+    :param name: The name of the stage.
+    :param function: A callable.
+    :return: The function itself, if no profiler is active, or a timed wrapper around it.
+    """
+    profiler = _state.active
+    if profiler is None:
+        return function
+    return profiler.timed(name, function)
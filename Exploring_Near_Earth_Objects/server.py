@@ -0,0 +1,271 @@
+"""Serve `inspect` and `query` requests over HTTP from one warm `NEODatabase`.
+
+The `serve` subcommand of the main module loads the database once, and then
+answers requests from any number of clients - such as dashboards - without
+each of them having to load the data set:
+
+    GET /inspect?pdes=433
+    GET /inspect?name=Eros&verbose=true
+    GET /inspect?search=halley
+    GET /query?start_date=2020-01-01&distance_max=0.025&limit=5&format=json
+    GET /query?hazardous=true&sort_by=velocity&desc=true&format=csv
+
+`/inspect` answers with a JSON object. `/query` accepts every parameter of
+`create_filters` - dates in YYYY-MM-DD format, numbers, and `hazardous=true` or
+`false` - as well as `limit`, `sort_by` and `desc`, and streams its results as
+CSV, JSON or newline-delimited JSON (`format=csv`, `json` or `jsonl`) in the
+same layout as the output files of the `query` subcommand. The body is sent
+with chunked transfer encoding as the results are found, so the first results
+arrive before the query has finished, and memory doesn't grow with the number
+of results. HTTP/1.0 clients, which don't understand chunked encoding, get the
+body unframed, ended by closing the connection. Invalid parameters are answered with status 400 and a JSON error.
+
+Each request is handled in its own thread. Queries only read the database, so
+they can run concurrently.
+"""
+import datetime
+import http.server
+import io
+import json
+import socketserver
+import urllib.parse
+
+from database import SORT_COLUMNS
+from filters import create_filters, limit
+from write import json_record, stream_csv, stream_json, stream_jsonl
+
+
+# The default address on which to listen.
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+
+# The function that streams each output format, and its content type.
+FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'json': (stream_json, 'application/json'),
+    'jsonl': (stream_jsonl, 'application/x-ndjson'),
+}
+# The number of bytes of a response body that are buffered before each chunk is sent.
+CHUNK_SIZE = 1 << 16
+
+# The parameters of `create_filters`, and how to parse each of them.
+_DATE_PARAMETERS = ('date', 'start_date', 'end_date')
+_NUMBER_PARAMETERS = ('distance_min', 'distance_max', 'velocity_min', 'velocity_max',
+                      'diameter_min', 'diameter_max')
+_BOOLEANS = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+
+class RequestError(ValueError):
+    """A request whose parameters are missing or invalid."""
+
+
+def _boolean(params, name):
+    """Parse an optional boolean parameter, returning `None` if it's absent."""
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        return _BOOLEANS[value.lower()]
+    except KeyError:
+        raise RequestError(f"{name} must be true or false, not {value!r}.")
+
+
+def parse_filters(params):
+    """Create a collection of filters from the parameters of a request.
+
+    :param params: A dictionary of parameter names to (string) values.
+    :return: A collection of filters, as from `create_filters`.
+    :raises RequestError: If a parameter can't be parsed.
+    """
+    criteria = {}
+    for name in _DATE_PARAMETERS:
+        if name in params:
+            try:
+                criteria[name] = datetime.datetime.strptime(params[name], '%Y-%m-%d').date()
+            except ValueError:
+                raise RequestError(f"{name} must be a date in YYYY-MM-DD format, "
+                                   f"not {params[name]!r}.")
+    for name in _NUMBER_PARAMETERS:
+        if name in params:
+            try:
+                criteria[name] = float(params[name])
+            except ValueError:
+                raise RequestError(f"{name} must be a number, not {params[name]!r}.")
+    criteria['hazardous'] = _boolean(params, 'hazardous')
+    return create_filters(**criteria)
+
+
+def _neo_record(neo):
+    """Build the JSON-serializable dictionary of an NEO, as in the output of `write_to_json`."""
+    return {
+        "designation": neo.designation,
+        "name": neo.name if neo.name is not None else "",
+        "diameter_km": neo.diameter,
+        "potentially_hazardous": bool(neo.hazardous),
+    }
+
+
+class _BodyWriter(io.RawIOBase):
+    """A raw binary stream that sends a response body of unknown length as it's written.
+
+    For HTTP/1.1, each write is sent as one chunk of a chunked response. HTTP/1.0
+    has no chunked encoding, so the bytes are sent as they are, and the end of
+    the body is marked by closing the connection.
+    """
+
+    def __init__(self, wfile, chunked=True):
+        """Create a new `_BodyWriter` over the output file of a request handler.
+
+        :param wfile: The output file of a request handler.
+        :param chunked: Whether to frame the body with chunked transfer encoding.
+        """
+        super().__init__()
+        self._wfile = wfile
+        self._chunked = chunked
+
+    def writable(self):
+        """Return whether this stream can be written to."""
+        return True
+
+    def write(self, data):
+        """Send some bytes, as one chunk if the body is chunked, and return their number."""
+        if data:
+            if self._chunked:
+                self._wfile.write(b'%x\r\n%s\r\n' % (len(data), bytes(data)))
+            else:
+                self._wfile.write(data)
+        return len(data)
+
+    def finish(self):
+        """End the body, by sending the last, empty chunk if it's chunked."""
+        if self._chunked:
+            self._wfile.write(b'0\r\n\r\n')
+
+
+class NEORequestHandler(http.server.BaseHTTPRequestHandler):
+    """Handle the HTTP requests of an `NEOServer`."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        """Route a GET request to `/inspect` or `/query`."""
+        url = urllib.parse.urlsplit(self.path)
+        params = {name: values[-1] for name, values
+                  in urllib.parse.parse_qs(url.query, keep_blank_values=True).items()}
+        routes = {'/inspect': self.inspect, '/query': self.query}
+        if url.path not in routes:
+            self.send_json({'error': f"Unknown path {url.path!r}; use /inspect or /query."}, 404)
+            return
+        try:
+            routes[url.path](params)
+        except RequestError as err:
+            self.send_json({'error': str(err)}, 400)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away in the middle of a response.
+            self.close_connection = True
+
+    def send_json(self, body, status=200):
+        """Send a JSON-serializable object as a complete response.
+
+        :param body: A JSON-serializable object.
+        :param status: The HTTP status code of the response.
+        """
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def inspect(self, params):
+        """Answer `/inspect` with an NEO, found by `pdes` or `name`, or with candidates for `search`.
+
+        :param params: A dictionary of parameter names to values.
+        """
+        database = self.server.database
+        if params.get('search'):
+            candidates = database.search_neos(params['search'])
+            self.send_json({'candidates': [
+                {**_neo_record(neo), 'match': candidate.kind, 'distance': candidate.distance}
+                for neo, candidate in candidates
+            ]})
+            return
+        if params.get('pdes'):
+            neo = database.get_neo_by_designation(params['pdes'])
+        elif params.get('name'):
+            neo = database.get_neo_by_name(params['name'])
+        else:
+            raise RequestError("Inspect an NEO by pdes, name or search.")
+        if neo is None:
+            self.send_json({'error': "No matching NEOs exist in the database."}, 404)
+            return
+        body = {'neo': _neo_record(neo)}
+        if _boolean(params, 'verbose'):
+            body['approaches'] = [
+                {key: value for key, value in json_record(approach).items() if key != 'neo'}
+                for approach in neo.approaches
+            ]
+        self.send_json(body)
+
+    def query(self, params):
+        """Answer `/query` by streaming the matching close approaches in the requested format.
+
+        :param params: A dictionary of parameter names to values.
+        """
+        filters = parse_filters(params)
+        fmt = params.get('format', 'json')
+        if fmt not in FORMATS:
+            raise RequestError(f"format must be one of {', '.join(FORMATS)}, not {fmt!r}.")
+        sort_by = params.get('sort_by') or None
+        if sort_by is not None and sort_by not in SORT_COLUMNS:
+            raise RequestError(f"sort_by must be one of {', '.join(SORT_COLUMNS)}, "
+                               f"not {sort_by!r}.")
+        try:
+            cap = int(params['limit']) if params.get('limit') else None
+        except ValueError:
+            raise RequestError(f"limit must be an integer, not {params['limit']!r}.")
+        if cap is not None and cap < 0:
+            raise RequestError("limit must not be negative.")
+
+        results = self.server.database.query(filters, cap or None, sort_by,
+                                             bool(_boolean(params, 'desc')))
+        stream, content_type = FORMATS[fmt]
+        chunked = self.request_version != 'HTTP/1.0'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        writer = _BodyWriter(self.wfile, chunked)
+        body = io.TextIOWrapper(io.BufferedWriter(writer, CHUNK_SIZE), encoding='utf-8',
+                                newline='' if fmt == 'csv' else None)
+        stream(limit(results, cap), body)
+        body.flush()
+        body.detach()
+        writer.finish()
+
+    def log_message(self, format, *args):
+        """Log a request, unless the server is quiet."""
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class NEOServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """An HTTP server that answers each request from one `NEODatabase`, in its own thread."""
+
+    daemon_threads = True
+
+    def __init__(self, database, host=DEFAULT_HOST, port=DEFAULT_PORT, quiet=False):
+        """Create a new `NEOServer`, listening on an address.
+
+        :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+        :param host: The host name or address on which to listen.
+        :param port: The port on which to listen, or 0 for any free port.
+        :param quiet: Whether to leave requests unlogged.
+        """
+        super().__init__((host, port), NEORequestHandler)
+        self.database = database
+        self.quiet = quiet
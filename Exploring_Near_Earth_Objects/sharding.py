@@ -0,0 +1,146 @@
+"""Scan the close approaches of a snapshot in contiguous shards, with worker processes.
+
+A query whose plan is a full scan - for example, one that only filters on the
+unindexed diameter and hazardous columns - evaluates its filters on every close
+approach. A `ShardedScan` spreads that work over a pool of worker processes:
+
+- The close approaches are split into contiguous shards of rows.
+- Each worker memory-maps the database's snapshot (see `store.ColumnStore`)
+  once, so that every process shares the same pages of the columns, and only
+  the filters and the bounds of a shard are pickled.
+- A worker evaluates the filters on the columns of its shard - with a
+  `VectorizedEngine` if NumPy is installed - and returns the matching rows.
+- The main process concatenates the rows of the shards in order, so matches
+  are in internal order, as with `NEODatabase.query`. With a limit, no more
+  shards are scanned once there are enough matches.
+
+The main module attaches a `ShardedScan` to a database with `--jobs N`.
+"""
+import array
+import collections
+import concurrent.futures
+import math
+
+from store import ColumnStore
+from vectorized import VectorizedEngine, numpy_available
+
+
+# The number of close approaches in a shard, when the number of matches is capped.
+SHARD_SIZE = 1 << 16
+
+# The snapshot column of each filterable column, and whether it's indexed by NEO.
+_COLUMNS = {
+    'time': ('approach_time', False),
+    'distance': ('approach_distance', False),
+    'velocity': ('approach_velocity', False),
+    'diameter': ('neo_diameter', True),
+    'hazardous': ('neo_hazardous', True),
+}
+
+# The stores that have been opened in this (worker) process, by path.
+_opened = {}
+
+
+def _open(path):
+    """Open a snapshot once per process, returning the store and an engine over it, if any."""
+    if path not in _opened:
+        store = ColumnStore(path)
+        engine = VectorizedEngine.from_store(store) if numpy_available() else None
+        _opened[path] = store, engine
+    return _opened[path]
+
+
+def _scan_columns(store, filters, start, stop):
+    """Evaluate filters on the rows `[start, stop)` of a store's columns, without NumPy.
+
+    :param store: A `ColumnStore`.
+    :param filters: A collection of filters capturing user-specified criteria.
+    :param start: The first row to evaluate.
+    :param stop: The row after the last one to evaluate.
+    :return: An `array` of the matching rows.
+    """
+    rows = range(start, stop)
+    neos = store.columns['approach_neo']
+    opaque = []
+    for f in filters:
+        interval = f.interval() if f.column in _COLUMNS else None
+        if interval is None:
+            opaque.append(f)
+            continue
+        lo, hi = (-math.inf if interval[0] is None else interval[0],
+                  math.inf if interval[1] is None else interval[1])
+        name, by_neo = _COLUMNS[f.column]
+        values = store.columns[name]
+        if by_neo:
+            rows = [row for row in rows if lo <= values[neos[row]] <= hi]
+        else:
+            rows = [row for row in rows if lo <= values[row] <= hi]
+    for f in opaque:
+        rows = [row for row in rows if f(store.approaches[row])]
+    return array.array('i', rows)
+
+
+def _scan(path, filters, start, stop):
+    """Find the rows `[start, stop)` of a snapshot that match filters, in a worker process."""
+    store, engine = _open(path)
+    if engine is None:
+        return _scan_columns(store, filters, start, stop).tobytes()
+    mask = engine.mask(filters, start, stop)
+    return (mask.nonzero()[0] + start).astype('int32').tobytes()
+
+
+class ShardedScan:
+    """A pool of worker processes that scan the close approaches of a snapshot in shards."""
+
+    def __init__(self, path, total, jobs, shard_size=SHARD_SIZE):
+        """Create a new `ShardedScan`, and start its worker processes.
+
+        :param path: A path to a snapshot, whose rows are in the database's internal order.
+        :param total: The number of close approaches in the snapshot.
+        :param jobs: The number of worker processes.
+        :param shard_size: The number of close approaches in a shard, when matches are capped.
+        """
+        self.path = str(path)
+        self.total = total
+        self.jobs = jobs
+        self.shard_size = shard_size
+        self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+
+    def rows(self, filters, limit=None):
+        """Find the rows of the close approaches that match a collection of filters.
+
+        Without a limit, the close approaches are split into one shard per
+        worker. With a limit, they're split into smaller shards, which are
+        scanned in order until there are enough matches.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param limit: The maximum number of rows to find, or `None` for all of them.
+        :return: An `array` of the matching rows, in internal order.
+        """
+        size = self.shard_size if limit is not None else -(-self.total // self.jobs)
+        starts = iter(range(0, self.total, max(size, 1)))
+        found = array.array('i')
+        pending = collections.deque()
+
+        def submit():
+            start = next(starts, None)
+            if start is not None:
+                pending.append(self._executor.submit(_scan, self.path, list(filters),
+                                                     start, min(start + size, self.total)))
+
+        # Keep every worker busy, with a bounded number of shards in flight.
+        for _ in range(2 * self.jobs):
+            submit()
+        while pending:
+            found.frombytes(pending.popleft().result())
+            if limit is not None and len(found) >= limit:
+                for future in pending:
+                    future.cancel()
+                del found[limit:]
+                break
+            submit()
+        return found
+
+    def close(self):
+        """Shut down the worker processes."""
+        self._executor.shutdown()
@@ -0,0 +1,540 @@
+"""Cache a linked `NEODatabase` in a compact columnar binary snapshot.
+
+Parsing `neos.csv` and `cad.json` and linking the results is the slowest part
+of every invocation of the main module. The `load_database` function instead
+loads the NEOs and close approaches from a snapshot file written next to the
+data files, as long as the snapshot is still fresh, and otherwise parses the
+data files and (re)writes the snapshot.
+
+A snapshot is fresh if it was built from data files with the same size and
+modification time as the current ones. If only the modification time differs,
+the SHA-256 hashes of the files are compared instead, so that copying or
+touching a data file doesn't invalidate the snapshot.
+
+The snapshot format is a sequence of little-endian sections, each aligned to 8
+bytes:
+
+- the magic bytes `NEOSNAP` followed by a NUL byte;
+- the length of the header, as an unsigned 64-bit integer;
+- the header, a UTF-8 JSON object with the format `version`, the keys of the
+  `sources` the snapshot was built from, the number of `neos` and of
+  `approaches`, and the `typecode`, `length` and `offset` of every column;
+- the columns, each a packed `array.array` of the given typecode, at the given
+  offset from the end of the (padded) header.
+
+The columns are:
+
+- `neo_designation` and `neo_name`, strings stored as a `_heap` of UTF-8 bytes
+  (typecode `B`) and `_offsets` into it (typecode `Q`, one more than the number
+  of NEOs). A missing name is stored as the empty string;
+- `neo_diameter` (typecode `d`, NaN if unknown) and `neo_hazardous` (`b`);
+- `approach_neo` (`i`), the position of the approach's NEO among the NEOs;
+- `approach_time` (`q`), in whole minutes since the Unix epoch;
+- `approach_distance` and `approach_velocity` (`d`);
+- `neo_approach_offsets` (`Q`, one more than the number of NEOs) and
+  `neo_approach_rows` (`i`), the positions of each NEO's close approaches, in
+  internal order, as the slice between consecutive offsets;
+- `index_time`, `index_distance` and `index_velocity` (`i`), the positions of
+  the close approaches sorted by the named column.
+
+Besides being read eagerly by `read_snapshot`, or into a linked `NEODatabase`
+by `read_database` - which reuses the grouped rows and sorted indexes rather
+than linking and sorting again - a snapshot can be memory-mapped by a
+`store.ColumnStore`, which reads these columns in place.
+
+New NEOs and close approaches can be added to a snapshot from delta files with
+`append_to_snapshot`, without parsing the data files again. The snapshot then
+lists the delta files under the `deltas` key of its `sources`. Rebuilding a
+snapshot from the data files discards its deltas, with a warning.
+
+While a `profiling.Profiler` is active, reading and writing snapshots is timed.
+"""
+import array
+import hashlib
+import json
+import os
+import pathlib
+import sys
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from models import NearEarthObject, CloseApproach
+from parallel import load_objects
+import profiling
+
+
+MAGIC = b'NEOSNAP\0'
+VERSION = 2
+ALIGNMENT = 8
+
+
+class SnapshotError(ValueError):
+    """A snapshot file is malformed or was written in an incompatible format."""
+
+
+def snapshot_path(neo_csv_path, cad_json_path):
+    """Return the default path of the snapshot of a pair of data files.
+
+    The snapshot is written next to the close approach data file.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :return: A `pathlib.Path` to the snapshot file.
+    """
+    cad_json_path = pathlib.Path(cad_json_path)
+    return cad_json_path.with_name(f"{cad_json_path.stem}.neosnap")
+
+
+def source_key(path, digest=True):
+    """Describe a data file by its resolved path, size, modification time and hash.
+
+    :param path: A path to a data file.
+    :param digest: Whether to compute the SHA-256 hash of the file's contents.
+    :return: A JSON-serializable dictionary.
+    """
+    path = pathlib.Path(path).resolve()
+    stat = path.stat()
+    key = {'path': str(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if digest:
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as infile:
+            for block in iter(lambda: infile.read(1 << 20), b''):
+                sha256.update(block)
+        key['sha256'] = sha256.hexdigest()
+    return key
+
+
+def _source_is_unchanged(recorded, path):
+    """Return whether a data file still matches the key recorded in a snapshot."""
+    try:
+        current = source_key(path, digest=False)
+    except OSError:
+        return False
+    if current['size'] != recorded.get('size'):
+        return False
+    if current['mtime_ns'] == recorded.get('mtime_ns'):
+        return True
+    return source_key(path)['sha256'] == recorded.get('sha256')
+
+
+def _pad(size):
+    """Return the number of padding bytes that align `size` to `ALIGNMENT`."""
+    return -size % ALIGNMENT
+
+
+def _string_column(strings):
+    """Pack a sequence of strings into a heap of UTF-8 bytes and the offsets into it."""
+    heap = bytearray()
+    offsets = array.array('Q', [0])
+    for string in strings:
+        heap += string.encode('utf-8')
+        offsets.append(len(heap))
+    return array.array('B', heap), offsets
+
+
+def write_snapshot(path, neos, approaches, sources, indexes=None):
+    """Write linked NEOs and close approaches to a snapshot file.
+
+    The snapshot is written to a temporary file, which then atomically replaces
+    any existing snapshot.
+
+    :param path: A path to the snapshot file.
+    :param neos: A sequence of `NearEarthObject`s.
+    :param approaches: A sequence of `CloseApproach`es of `neos`, linked or not.
+                       As in `NEODatabase`, those of unknown NEOs are left out.
+    :param sources: A dictionary of the `source_key`s of the data files.
+    :param indexes: The rows of the close approaches sorted by each indexed column, if they're
+                    already known - for example, from the `SortedIndex`es of an `NEODatabase`
+                    whose close approaches are exactly `approaches`.
+    """
+    position = {neo.designation: row for row, neo in enumerate(neos)}
+    approaches = [a for a in approaches if a._designation in position]
+    columns = {}
+    columns['neo_designation_heap'], columns['neo_designation_offsets'] = \
+        _string_column(neo.designation for neo in neos)
+    columns['neo_name_heap'], columns['neo_name_offsets'] = \
+        _string_column(neo.name or '' for neo in neos)
+    columns['neo_diameter'] = array.array('d', (neo.diameter for neo in neos))
+    columns['neo_hazardous'] = array.array('b', (neo.hazardous for neo in neos))
+    columns['approach_neo'] = array.array('i', (
+        position[a._designation] for a in approaches))
+    columns['approach_time'] = array.array('q', (a.epoch_minutes for a in approaches))
+    columns['approach_distance'] = array.array('d', (a.distance for a in approaches))
+    columns['approach_velocity'] = array.array('d', (a.velocity for a in approaches))
+
+    # Group the close approaches by NEO, and sort them by each indexed column.
+    counts = [0] * len(neos)
+    for neo in columns['approach_neo']:
+        counts[neo] += 1
+    offsets = columns['neo_approach_offsets'] = array.array('Q', [0])
+    for count in counts:
+        offsets.append(offsets[-1] + count)
+    rows = columns['neo_approach_rows'] = array.array('i', bytes(4 * len(approaches)))
+    filled = list(offsets[:-1])
+    for row, neo in enumerate(columns['approach_neo']):
+        rows[filled[neo]] = row
+        filled[neo] += 1
+    for name in ('time', 'distance', 'velocity'):
+        column = columns[f'approach_{name}']
+        if indexes is not None:
+            columns[f'index_{name}'] = array.array('i', indexes[name])
+        else:
+            columns[f'index_{name}'] = array.array(
+                'i', sorted(range(len(column)), key=column.__getitem__))
+
+    # Lay out the columns one after another, following the header.
+    layout = {}
+    offset = 0
+    for name, column in columns.items():
+        layout[name] = {'offset': offset, 'typecode': column.typecode, 'length': len(column)}
+        size = len(column) * column.itemsize
+        offset += size + _pad(size)
+    header = {'version': VERSION, 'sources': sources,
+              'neos': len(neos), 'approaches': len(approaches), 'columns': layout}
+    encoded = json.dumps(header).encode('utf-8')
+
+    path = pathlib.Path(path)
+    partial = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(partial, 'wb') as outfile:
+            outfile.write(MAGIC)
+            outfile.write(len(encoded).to_bytes(8, 'little'))
+            outfile.write(encoded + b'\0' * _pad(len(encoded)))
+            for column in columns.values():
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                data = column.tobytes()
+                outfile.write(data + b'\0' * _pad(len(data)))
+        os.replace(partial, path)
+    finally:
+        if partial.exists():
+            partial.unlink()
+
+
+def read_header(buffer):
+    """Parse the header of a snapshot.
+
+    :param buffer: A bytes-like object holding (at least the start of) a snapshot.
+    :return: The header, as a dictionary.
+    :raises SnapshotError: If the buffer doesn't hold a snapshot of this format version.
+    """
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise SnapshotError("Not an NEO snapshot.")
+    length = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], 'little')
+    start = len(MAGIC) + 8
+    try:
+        header = json.loads(bytes(buffer[start:start + length]).decode('utf-8'))
+    except ValueError as err:
+        raise SnapshotError("Malformed NEO snapshot header.") from err
+    if header.get('version') != VERSION:
+        raise SnapshotError(f"Unsupported NEO snapshot version {header.get('version')!r}.")
+    # Resolve the offsets of the columns, which follow the header.
+    try:
+        for layout in header['columns'].values():
+            layout['offset'] += start + length + _pad(length)
+    except (KeyError, TypeError, AttributeError) as err:
+        raise SnapshotError("Malformed NEO snapshot header.") from err
+    return header
+
+
+def read_file_header(path):
+    """Read only the header of a snapshot file.
+
+    :param path: A path to the snapshot file.
+    :return: The header, as a dictionary.
+    :raises SnapshotError: If the file isn't a snapshot of this format version.
+    """
+    with open(path, 'rb') as infile:
+        prefix = infile.read(len(MAGIC) + 8)
+        if prefix[:len(MAGIC)] != MAGIC:
+            raise SnapshotError("Not an NEO snapshot.")
+        length = int.from_bytes(prefix[len(MAGIC):], 'little')
+        return read_header(prefix + infile.read(length))
+
+
+def read_column(buffer, header, name):
+    """Read a column of a snapshot into an `array.array`.
+
+    :param buffer: A bytes-like object holding a snapshot.
+    :param header: The header of the snapshot, from `read_header`.
+    :param name: The name of the column.
+    :return: An `array.array` of the column's values.
+    """
+    layout = header['columns'][name]
+    column = array.array(layout['typecode'])
+    end = layout['offset'] + layout['length'] * column.itemsize
+    if end > len(buffer):
+        raise SnapshotError(f"Truncated NEO snapshot: column {name!r} is incomplete.")
+    column.frombytes(buffer[layout['offset']:end])
+    if sys.byteorder != 'little':
+        column.byteswap()
+    return column
+
+
+def read_strings(buffer, header, name):
+    """Read a string column of a snapshot into a list of strings."""
+    heap = bytes(read_column(buffer, header, f"{name}_heap"))
+    offsets = read_column(buffer, header, f"{name}_offsets")
+    return [heap[start:stop].decode('utf-8') for start, stop in zip(offsets, offsets[1:])]
+
+
+def _read_objects(buffer, header):
+    """Read unlinked NEOs and close approaches from the columns of a snapshot.
+
+    :param buffer: A bytes-like object holding a snapshot.
+    :param header: The header of the snapshot, from `read_header`.
+    :return: A tuple of a list of `NearEarthObject`s, a list of `CloseApproach`es, and
+             the `approach_neo` column.
+    """
+    designations = read_strings(buffer, header, 'neo_designation')
+    names = read_strings(buffer, header, 'neo_name')
+    neos = [
+        NearEarthObject(designation, name or None, diameter, bool(hazardous))
+        for designation, name, diameter, hazardous in zip(
+            designations, names,
+            read_column(buffer, header, 'neo_diameter'),
+            read_column(buffer, header, 'neo_hazardous'))
+    ]
+    approach_neos = read_column(buffer, header, 'approach_neo')
+    approaches = [
+        CloseApproach.from_minutes(designations[neo], time, distance, velocity)
+        for neo, time, distance, velocity in zip(
+            approach_neos,
+            read_column(buffer, header, 'approach_time'),
+            read_column(buffer, header, 'approach_distance'),
+            read_column(buffer, header, 'approach_velocity'))
+    ]
+    return neos, approaches, approach_neos
+
+
+def read_snapshot(path):
+    """Read unlinked NEOs and close approaches from a snapshot file.
+
+    :param path: A path to the snapshot file.
+    :return: A tuple of a list of `NearEarthObject`s and a list of `CloseApproach`es.
+    :raises SnapshotError: If the file isn't a valid snapshot.
+    """
+    buffer = pathlib.Path(path).read_bytes()
+    neos, approaches, _ = _read_objects(buffer, read_header(buffer))
+    return neos, approaches
+
+
+def read_database(path, **kwargs):
+    """Read a linked `NEODatabase` from a snapshot file.
+
+    The close approaches are linked through the grouped rows of the snapshot,
+    and its sorted indexes are built from the persisted `index_*` columns, so
+    nothing is sorted again (see `NEODatabase.from_grouped`).
+
+    :param path: A path to the snapshot file.
+    :param kwargs: Additional keyword arguments passed to `NEODatabase.from_grouped`.
+    :return: A linked `NEODatabase`.
+    :raises SnapshotError: If the file isn't a valid snapshot.
+    """
+    buffer = pathlib.Path(path).read_bytes()
+    header = read_header(buffer)
+    neos, approaches, approach_neos = _read_objects(buffer, header)
+    indexes = {}
+    for column in ('time', 'distance', 'velocity'):
+        values = read_column(buffer, header, f'approach_{column}')
+        rows = read_column(buffer, header, f'index_{column}')
+        indexes[column] = (list(map(values.__getitem__, rows)), rows)
+    return NEODatabase.from_grouped(neos, approaches, approach_neos,
+                                    read_column(buffer, header, 'neo_approach_offsets'),
+                                    read_column(buffer, header, 'neo_approach_rows'),
+                                    indexes, **kwargs)
+
+
+def is_fresh(path, neo_csv_path, cad_json_path):
+    """Return whether a snapshot exists and was built from the current data files.
+
+    :param path: A path to the snapshot file.
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :return: Whether the snapshot can be used in place of the data files.
+    """
+    try:
+        header = read_file_header(path)
+    except (OSError, SnapshotError):
+        return False
+    sources = header.get('sources', {})
+    return ('neos' in sources and 'approaches' in sources
+            and sources['neos'].get('path') == str(pathlib.Path(neo_csv_path).resolve())
+            and sources['approaches'].get('path') == str(pathlib.Path(cad_json_path).resolve())
+            and _source_is_unchanged(sources['neos'], neo_csv_path)
+            and _source_is_unchanged(sources['approaches'], cad_json_path))
+
+
+def _parse(neo_csv_path, cad_json_path, jobs=1):
+    """Parse a pair of data files, with a pool of `jobs` worker processes if there's more than one."""
+    if jobs > 1:
+        with profiling.stage('load_objects') as stage:
+            neos, approaches = load_objects(neo_csv_path, cad_json_path, jobs)
+            stage.count(len(approaches))
+        return neos, approaches
+    return load_neos(neo_csv_path), load_approaches(cad_json_path)
+
+
+def ensure_snapshot(neo_csv_path, cad_json_path, path=None, rebuild=False, jobs=1):
+    """Make sure that a fresh snapshot of a pair of data files exists.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param path: A path to the snapshot file, defaulting to `snapshot_path`.
+    :param rebuild: Whether to rewrite the snapshot even if it's fresh.
+    :param jobs: The number of worker processes with which to parse the data files, if needed.
+    :return: The path to the fresh snapshot file.
+    :raises OSError: If the snapshot needed to be written, but couldn't be.
+    """
+    if path is None:
+        path = snapshot_path(neo_csv_path, cad_json_path)
+    if rebuild or not is_fresh(path, neo_csv_path, cad_json_path):
+        _warn_of_discarded_deltas(path)
+        sources = {'neos': source_key(neo_csv_path), 'approaches': source_key(cad_json_path)}
+        neos, approaches = _parse(neo_csv_path, cad_json_path, jobs)
+        with profiling.stage('write_snapshot'):
+            write_snapshot(path, neos, approaches, sources)
+    return path
+
+
+def _warn_of_discarded_deltas(path):
+    """Warn, on stderr, if a snapshot that is about to be rebuilt from the data files has deltas.
+
+    :param path: A path to the snapshot file, which may not exist.
+    """
+    try:
+        deltas = read_file_header(path)['sources'].get('deltas', [])
+    except (OSError, SnapshotError, KeyError, AttributeError):
+        return
+    if deltas:
+        print(f"Rebuilding the snapshot {path} from the data files discards the "
+              f"{len(deltas)} delta files appended to it, such as {deltas[0].get('path')}.",
+              file=sys.stderr)
+
+
+def _new_deltas(deltas, recorded, path):
+    """Leave out, with a warning on stderr, the delta files that were already appended to a snapshot.
+
+    A delta file is a repeat if its resolved path and SHA-256 hash match those of
+    a delta file recorded in the snapshot, or of an earlier one in `deltas`.
+
+    :param deltas: Paths to delta files.
+    :param recorded: The list of the `source_key`s of the delta files in the snapshot,
+                     to which the keys of the new delta files are added.
+    :param path: A path to the snapshot file.
+    :return: A list of the paths to the new delta files.
+    """
+    seen = {(key.get('path'), key.get('sha256')) for key in recorded}
+    new = []
+    for delta in deltas:
+        key = source_key(delta)
+        if (key['path'], key['sha256']) in seen:
+            print(f"Skipping {delta}, which was already appended to the snapshot {path}.",
+                  file=sys.stderr)
+            continue
+        seen.add((key['path'], key['sha256']))
+        recorded.append(key)
+        new.append(delta)
+    return new
+
+
+def load_database(neo_csv_path, cad_json_path, path=None, rebuild=False, jobs=1, **kwargs):
+    """Build an `NEODatabase`, from a fresh snapshot if possible.
+
+    A fresh snapshot is read with `read_database`, reusing its grouped rows and
+    sorted indexes. If the snapshot is missing, stale or unreadable - or if
+    `rebuild` is set - the data files are parsed instead, and a new snapshot is
+    written. Failing to write the snapshot (for example, to a read-only
+    directory) isn't an error. Rebuilding a snapshot discards any delta files
+    appended to it, with a warning.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param path: A path to the snapshot file, defaulting to `snapshot_path`.
+    :param rebuild: Whether to ignore any existing snapshot.
+    :param jobs: The number of worker processes with which to parse the data files, if needed.
+    :param kwargs: Additional keyword arguments, such as `vectorized`, passed to the
+                   `NEODatabase` constructor or to `NEODatabase.from_grouped`.
+    :return: A linked `NEODatabase`.
+    """
+    if path is None:
+        path = snapshot_path(neo_csv_path, cad_json_path)
+
+    if not rebuild and is_fresh(path, neo_csv_path, cad_json_path):
+        try:
+            with profiling.stage('read_snapshot') as stage:
+                database = read_database(path, **kwargs)
+                stage.count(len(database))
+        except (OSError, SnapshotError, KeyError):
+            pass
+        else:
+            database.snapshot_path = path
+            return database
+
+    _warn_of_discarded_deltas(path)
+    sources = {'neos': source_key(neo_csv_path), 'approaches': source_key(cad_json_path)}
+    neos, approaches = _parse(neo_csv_path, cad_json_path, jobs)
+    database = NEODatabase(neos, approaches, **kwargs)
+    try:
+        with profiling.stage('write_snapshot'):
+            write_snapshot(path, neos, approaches, sources)
+    except OSError as err:
+        print(f"Unable to write the snapshot {path}: {err}", file=sys.stderr)
+    else:
+        database.snapshot_path = path
+    return database
+
+
+def append_to_snapshot(neo_csv_path, cad_json_path, neo_deltas=(), cad_deltas=(), path=None,
+                       jobs=1):
+    """Add the NEOs and close approaches of delta files to a database and its snapshot.
+
+    The database is loaded as by `load_database` - from the snapshot's grouped
+    rows and persisted sorted indexes, if it's fresh - and the delta files, in
+    the same formats as the data files, are parsed and appended to it with
+    `NEODatabase.append`. The snapshot is then rewritten from the updated
+    database, reusing its sorted indexes, and keeps recording the data files as
+    its sources, so that it stays fresh. The delta files are listed in its
+    header, under the `deltas` source, and a delta file that's already listed
+    there - with the same resolved path and SHA-256 hash - is skipped, with a
+    warning on stderr, so that appending it again doesn't duplicate its rows.
+
+    Nothing that's already in the snapshot is parsed, linked by designation or
+    sorted again, but reading the snapshot and rewriting it still take time
+    linear in its size, besides the time to parse and insert the deltas.
+
+    If the data files changed since the snapshot was written, it's rebuilt from
+    them first, and the deltas that were appended to it are discarded, with a
+    warning on stderr.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param neo_deltas: Paths to CSV files of new near-Earth objects.
+    :param cad_deltas: Paths to JSON files of new close approaches.
+    :param path: A path to the snapshot file, defaulting to `snapshot_path`.
+    :param jobs: The number of worker processes with which to parse the data files, if needed.
+    :return: A tuple of the updated `NEODatabase`, and the numbers of NEOs and of close
+             approaches that were added.
+    :raises OSError: If the snapshot couldn't be written.
+    """
+    if path is None:
+        path = snapshot_path(neo_csv_path, cad_json_path)
+    database = load_database(neo_csv_path, cad_json_path, path, jobs=jobs)
+    try:
+        sources = read_file_header(path)['sources']
+    except (OSError, SnapshotError, KeyError):
+        sources = {'neos': source_key(neo_csv_path), 'approaches': source_key(cad_json_path)}
+    sources['deltas'] = list(sources.get('deltas', []))
+    neo_deltas = _new_deltas(neo_deltas, sources['deltas'], path)
+    cad_deltas = _new_deltas(cad_deltas, sources['deltas'], path)
+
+    neos = [neo for delta in neo_deltas for neo in load_neos(delta)]
+    approaches = [approach for delta in cad_deltas for approach in load_approaches(delta)]
+    with profiling.stage('append'):
+        added = database.append(neos, approaches)
+
+    with profiling.stage('write_snapshot'):
+        write_snapshot(path, database._neos, database._approaches, sources,
+                       {column: index.rows for column, index in database._indexes.items()})
+    database.snapshot_path = path
+    return database, added
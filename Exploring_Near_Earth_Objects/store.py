@@ -0,0 +1,245 @@
+"""Open a snapshot as a memory-mapped columnar store shared between processes.
+
+A `ColumnStore` maps a snapshot file (see the `snapshot` module) into memory
+and exposes each of its columns as a typed `memoryview`, without copying or
+parsing them. Because the mapping is read-only and backed by the file, every
+process that opens the same snapshot shares the same pages of the operating
+system's page cache, and only the pages that are actually touched are read.
+
+`NearEarthObject`s and `CloseApproach`es are built lazily, when they are
+accessed through the store's `neos` and `approaches` sequences. A row maps to
+the same object for as long as that object is alive, but the store itself only
+keeps the `RECENT_ROWS` most recently built ones alive, so a scan over more
+rows than that frees the objects behind it, rather than keeping every row in
+memory.
+
+The `open_database` function builds an `NEODatabase` over a `ColumnStore`,
+writing the snapshot first if it's missing or stale.
+"""
+import array
+import collections
+import collections.abc
+import mmap
+import sys
+import weakref
+
+from database import NEODatabase
+from models import NearEarthObject, CloseApproach, RowView
+from snapshot import SnapshotError, ensure_snapshot, read_header
+
+
+# The number of most recently built objects that a `_LazyRows` keeps alive.
+RECENT_ROWS = 1 << 16
+
+
+class _LazyRows(collections.abc.Sequence):
+    """A sequence of objects that are built from the rows of a store on demand.
+
+    Built objects are cached weakly: a row maps to the same object for as long
+    as anything else holds on to it, and is built again once it's been freed.
+    Only the most recently built objects are kept alive by the sequence itself,
+    so that a scan over every row doesn't keep every object in memory.
+    """
+
+    def __init__(self, length, build, recent=RECENT_ROWS):
+        """Create a new `_LazyRows`.
+
+        :param length: The number of rows.
+        :param build: A 1-argument callable that builds the object of a row.
+        :param recent: The number of most recently built objects to keep alive.
+        """
+        self._length = length
+        self._build = build
+        self._built = weakref.WeakValueDictionary()
+        self._recent = collections.deque(maxlen=recent)
+
+    def __len__(self):
+        """Return `len(self)`."""
+        return self._length
+
+    def __getitem__(self, row):
+        """Return `self[row]`, building it if it isn't already alive."""
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(self._length))]
+        if row < 0:
+            row += self._length
+        if not 0 <= row < self._length:
+            raise IndexError(row)
+        built = self._built.get(row)
+        if built is None:
+            built = self._built[row] = self._build(row)
+            self._recent.append(built)
+        return built
+
+
+class _SortedKeys(collections.abc.Sequence):
+    """The values of a column in the order of a persisted index, for bisection."""
+
+    def __init__(self, column, rows):
+        """Create a new `_SortedKeys` from a column and a permutation of its rows."""
+        self._column = column
+        self._rows = rows
+
+    def __len__(self):
+        """Return `len(self)`."""
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        """Return `self[index]`, the value of the index'th smallest row."""
+        return self._column[self._rows[index]]
+
+
+class _Lookup(collections.abc.Mapping):
+    """A mapping from strings, such as designations, to lazily built objects."""
+
+    def __init__(self, rows, sequence):
+        """Create a new `_Lookup` from a dictionary of keys to rows, and a sequence of objects."""
+        self._rows = rows
+        self._sequence = sequence
+
+    def __getitem__(self, key):
+        """Return `self[key]`."""
+        return self._sequence[self._rows[key]]
+
+    def __iter__(self):
+        """Return `iter(self)`."""
+        return iter(self._rows)
+
+    def __len__(self):
+        """Return `len(self)`."""
+        return len(self._rows)
+
+    def rows(self):
+        """Return the dictionary of keys to the rows of their objects."""
+        return self._rows
+
+
+class ColumnStore:
+    """A snapshot, memory-mapped and exposed as typed columns.
+
+    The `columns` attribute maps the name of each column to a `memoryview` of
+    the mapped file, cast to the column's type. The `neos` and `approaches`
+    attributes are sequences of lazily built, linked objects.
+    """
+
+    def __init__(self, path):
+        """Memory-map a snapshot file.
+
+        :param path: A path to the snapshot file.
+        :raises SnapshotError: If the file isn't a valid snapshot.
+        """
+        if sys.byteorder != 'little':
+            raise SnapshotError("Memory-mapped snapshots require a little-endian host.")
+        self.path = path
+        with open(path, 'rb') as infile:
+            self._mmap = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header = read_header(self._mmap)
+        view = memoryview(self._mmap)
+        self.columns = {}
+        for name, layout in self.header['columns'].items():
+            end = layout['offset'] + layout['length'] * array.array(layout['typecode']).itemsize
+            if end > len(view):
+                raise SnapshotError(f"Truncated NEO snapshot: column {name!r} is incomplete.")
+            self.columns[name] = view[layout['offset']:end].cast(layout['typecode'])
+        self._views = [view, *self.columns.values()]
+
+        self.neos = _LazyRows(self.header['neos'], self._build_neo)
+        self.approaches = _LazyRows(self.header['approaches'], self._build_approach)
+
+    def _build_neo(self, row):
+        """Build the `NearEarthObject` of a row, with a view of its close approaches."""
+        neo = NearEarthObject(self.string('neo_designation', row),
+                              self.string('neo_name', row) or None,
+                              self.columns['neo_diameter'][row],
+                              bool(self.columns['neo_hazardous'][row]))
+        offsets = self.columns['neo_approach_offsets']
+        neo.approaches = RowView(self.approaches, self.columns['neo_approach_rows'],
+                                 offsets[row], offsets[row + 1])
+        return neo
+
+    def _build_approach(self, row):
+        """Build the `CloseApproach` of a row, linked to its NEO."""
+        columns = self.columns
+        approach = CloseApproach.from_minutes(None, columns['approach_time'][row],
+                                              columns['approach_distance'][row],
+                                              columns['approach_velocity'][row])
+        approach.link(self.neos[columns['approach_neo'][row]])
+        return approach
+
+    def string(self, name, row):
+        """Read one string of a string column.
+
+        :param name: The name of the string column, such as `'neo_name'`.
+        :param row: The row of the string.
+        :return: The string.
+        """
+        offsets = self.columns[f'{name}_offsets']
+        return str(self.columns[f'{name}_heap'][offsets[row]:offsets[row + 1]], 'utf-8')
+
+    def lookup(self, name):
+        """Build a mapping from the nonempty strings of an NEO string column to their NEOs.
+
+        :param name: The name of the string column, such as `'neo_designation'`.
+        :return: A mapping from strings to `NearEarthObject`s.
+        """
+        heap = bytes(self.columns[f'{name}_heap'])
+        offsets = self.columns[f'{name}_offsets']
+        rows = {}
+        for row in range(len(offsets) - 1):
+            if offsets[row] != offsets[row + 1]:
+                rows[heap[offsets[row]:offsets[row + 1]].decode('utf-8')] = row
+        return _Lookup(rows, self.neos)
+
+    def sorted_keys(self, column):
+        """Return the values of an indexed column in sorted order, and their rows.
+
+        :param column: The name of an indexed column - `'time'`, `'distance'` or `'velocity'`.
+        :return: A tuple of a sequence of sorted keys and a sequence of rows.
+        """
+        rows = self.columns[f'index_{column}']
+        return _SortedKeys(self.columns[f'approach_{column}'], rows), rows
+
+    def neo_column_sample(self, name, size=10000):
+        """Sample the values of an NEO column for evenly spaced close approaches.
+
+        :param name: The name of the NEO column, such as `'diameter'`.
+        :param size: The approximate number of close approaches to sample.
+        :return: A list of the sampled values.
+        """
+        column = self.columns[f'neo_{name}']
+        neos = self.columns['approach_neo']
+        step = max(1, len(neos) // size)
+        return [column[neo] for neo in neos[::step]]
+
+    def close(self):
+        """Release the columns of this store, and unmap the snapshot if nothing else uses it.
+
+        Views that are still held elsewhere, such as the `approaches` of an
+        `NearEarthObject` that was already built, keep the mapping alive until
+        they're garbage collected.
+        """
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+
+def open_database(neo_csv_path, cad_json_path, path=None, rebuild=False, vectorized=False,
+                  jobs=1):
+    """Build an `NEODatabase` over a memory-mapped snapshot of a pair of data files.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param path: A path to the snapshot file, defaulting to `snapshot.snapshot_path`.
+    :param rebuild: Whether to rewrite the snapshot even if it's fresh.
+    :param vectorized: Whether to evaluate queries with a `VectorizedEngine`, which requires NumPy.
+    :param jobs: The number of worker processes with which to parse the data files, if needed.
+    :return: An `NEODatabase`.
+    :raises OSError: If the snapshot needed to be written, but couldn't be.
+    """
+    path = ensure_snapshot(neo_csv_path, cad_json_path, path=path, rebuild=rebuild,
+                           jobs=jobs)
+    return NEODatabase.from_store(ColumnStore(path), vectorized=vectorized)
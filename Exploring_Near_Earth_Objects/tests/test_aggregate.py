@@ -0,0 +1,116 @@
+"""Check that `summarize` aggregates the close approaches that match a collection of filters.
+
+The summaries are compared with aggregates computed directly from the matches
+of `NEODatabase.query`. If NumPy is installed, the vectorized summary is also
+compared with the streaming summary that's used without NumPy.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_aggregate
+"""
+import collections
+import datetime
+import math
+import pathlib
+import unittest
+
+from aggregate import summarize, format_summary, _summarize_stream
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from vectorized import numpy_available
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestSummarize(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.filters = create_filters(start_date=datetime.date(2020, 3, 1), distance_max=0.3)
+        cls.matches = list(cls.db.query(cls.filters))
+
+    def test_summarize_counts_the_matches(self):
+        summary = summarize(self.db, self.filters)
+        self.assertEqual([group.key for group in summary.groups], [None])
+        self.assertEqual(summary.count, len(self.matches))
+
+    def test_summarize_by_month(self):
+        summary = summarize(self.db, self.filters, group_by='month', columns=['velocity'])
+        expected = collections.defaultdict(list)
+        for approach in self.matches:
+            expected[approach.time.strftime('%Y-%m')].append(approach.velocity)
+        self.assertEqual([group.key for group in summary.groups], sorted(expected))
+        for group in summary.groups:
+            velocities = expected[group.key]
+            self.assertEqual(group.count, len(velocities))
+            self.assertEqual(group.columns['velocity'].minimum, min(velocities))
+            self.assertEqual(group.columns['velocity'].maximum, max(velocities))
+            self.assertAlmostEqual(group.columns['velocity'].mean,
+                                   sum(velocities) / len(velocities))
+
+    def test_summarize_by_neo_skips_unknown_diameters(self):
+        summary = summarize(self.db, self.filters, group_by='neo', columns=['diameter'])
+        counts = collections.Counter(approach.neo.designation for approach in self.matches)
+        self.assertEqual({group.key: group.count for group in summary.groups}, counts)
+        for group in summary.groups:
+            diameter = self.db.get_neo_by_designation(group.key).diameter
+            if math.isnan(diameter):
+                self.assertEqual(group.columns['diameter'].count, 0)
+                self.assertTrue(math.isnan(group.columns['diameter'].mean))
+            else:
+                self.assertEqual(group.columns['diameter'].count, group.count)
+                self.assertAlmostEqual(group.columns['diameter'].mean, diameter)
+        top = summary.top(3)
+        self.assertEqual([group.count for group in top],
+                         sorted(counts.values(), reverse=True)[:3])
+        self.assertIn(f"{top[0].key}: {top[0].count} close approaches", format_summary(summary, 3))
+
+    def test_summarize_histogram(self):
+        summary = summarize(self.db, self.filters, group_by='year', histogram='distance', bins=4)
+        distances = [approach.distance for approach in self.matches]
+        self.assertEqual(summary.edges[0], min(distances))
+        self.assertEqual(summary.edges[-1], max(distances))
+        self.assertEqual(len(summary.edges), 5)
+        self.assertEqual(sum(summary.groups[0].histogram), len(distances))
+        for number, count in enumerate(summary.groups[0].histogram[:-1]):
+            lo, hi = summary.edges[number], summary.edges[number + 1]
+            self.assertEqual(count, sum(1 for distance in distances if lo <= distance < hi))
+
+    def test_summarize_without_matches(self):
+        summary = summarize(self.db, create_filters(distance_min=5), group_by='month',
+                            columns=['distance'], histogram='velocity')
+        self.assertEqual(summary.groups, [])
+        self.assertEqual(format_summary(summary), "No matching close approaches.")
+
+    def test_summarize_rejects_unknown_groupings_and_columns(self):
+        with self.assertRaises(ValueError):
+            summarize(self.db, group_by='day')
+        with self.assertRaises(ValueError):
+            summarize(self.db, columns=['name'])
+
+    @unittest.skipUnless(numpy_available(), "NumPy is not installed.")
+    def test_vectorized_summary_agrees_with_streaming_summary(self):
+        for group_by in (None, 'year', 'month', 'neo'):
+            arguments = (self.filters, group_by, ['distance', 'diameter'], 'diameter', 7)
+            vectorized = summarize(self.db, *arguments)
+            streamed = _summarize_stream(self.db, *arguments)
+            streamed.groups.sort(key=lambda group: (group.key is None, group.key))
+            self.assertEqual(vectorized.edges, streamed.edges)
+            self.assertEqual(len(vectorized.groups), len(streamed.groups))
+            for received, expected in zip(vectorized.groups, streamed.groups):
+                self.assertEqual((received.key, received.count, received.histogram),
+                                 (expected.key, expected.count, expected.histogram))
+                for column in ('distance', 'diameter'):
+                    a, b = received.columns[column], expected.columns[column]
+                    self.assertEqual(a.count, b.count)
+                    self.assertAlmostEqual(a.total, b.total)
+                    if a.count:
+                        self.assertEqual((a.minimum, a.maximum), (b.minimum, b.maximum))
+
+
+if __name__ == '__main__':
+    unittest.main()
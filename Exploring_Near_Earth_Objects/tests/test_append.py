@@ -0,0 +1,229 @@
+"""Check that appending NEOs and close approaches matches building the database from scratch.
+
+The test data files are split into a base and a delta. A database built from
+the base, with the delta appended, must answer queries, lookups and searches
+exactly like a database built from the base followed by the delta.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_append
+"""
+import contextlib
+import csv
+import datetime
+import io
+import json
+import pathlib
+import tempfile
+import unittest
+import unittest.mock
+
+from database import NEODatabase, SortedIndex
+from extract import load_neos, load_approaches
+from filters import create_filters
+import main
+from models import CloseApproach, NearEarthObject
+from snapshot import append_to_snapshot, is_fresh, load_database, snapshot_path
+from vectorized import numpy_available
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+# The number of close approaches in the base.
+BASE = 3000
+
+FILTERS = [
+    create_filters(),
+    create_filters(start_date=datetime.date(2020, 6, 1), end_date=datetime.date(2020, 9, 30)),
+    create_filters(distance_max=0.05, velocity_min=10),
+    create_filters(diameter_min=0.1, hazardous=False),
+]
+
+
+def split():
+    """Load the test data, split into base and delta NEOs and close approaches."""
+    neos, approaches = load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE)
+    in_base = {approach._designation for approach in approaches[:BASE]}
+    in_delta = {approach._designation for approach in approaches[BASE:]} - in_base
+    return ([neo for neo in neos if neo.designation not in in_delta],
+            [neo for neo in neos if neo.designation in in_delta],
+            approaches[:BASE], approaches[BASE:])
+
+
+def describe(approach):
+    return approach.neo.designation, approach.epoch_minutes, approach.distance, approach.velocity
+
+
+class TestSortedIndexInsert(unittest.TestCase):
+    def test_insert_keeps_keys_sorted_and_ties_in_internal_order(self):
+        index = SortedIndex([5, 1, 3, 3, 9])
+        index.insert([3, 0, 10, 3], [5, 6, 7, 8])
+        self.assertEqual(index.keys, [0, 1, 3, 3, 3, 3, 5, 9, 10])
+        self.assertEqual(index.rows, [6, 1, 2, 3, 5, 8, 0, 4, 7])
+        self.assertFalse(index.in_internal_order())
+
+    def test_insert_at_the_end_stays_in_internal_order(self):
+        index = SortedIndex([1, 2, 3])
+        self.assertTrue(index.in_internal_order())
+        index.insert([4, 4, 5], [3, 4, 5])
+        self.assertTrue(index.in_internal_order())
+        self.assertEqual(list(index.rows), list(range(6)))
+
+
+class TestAppend(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        base_neos, delta_neos, base_approaches, delta_approaches = split()
+        cls.delta_neos = delta_neos
+        cls.db = NEODatabase(base_neos, base_approaches)
+        duplicate = NearEarthObject(base_neos[0].designation, 'Duplicate', 1.0, True)
+        unknown = CloseApproach.from_minutes('not-real-designation', 0, 0.1, 1.0)
+        cls.added = cls.db.append(delta_neos + [duplicate], delta_approaches + [unknown])
+
+        base_neos, delta_neos, base_approaches, delta_approaches = split()
+        cls.expected = NEODatabase(base_neos + delta_neos, base_approaches + delta_approaches)
+
+    def test_append_counts_what_was_added(self):
+        self.assertEqual(self.added, (len(self.delta_neos), len(self.expected._approaches) - BASE))
+        self.assertEqual(self.db.unlinked['not-real-designation'], 1)
+        self.assertEqual(len(self.db._neos), len(self.expected._neos))
+
+    def test_append_links_approaches_to_old_and_new_neos(self):
+        for received, expected in zip(self.db._neos, self.expected._neos):
+            self.assertEqual(received.designation, expected.designation)
+            self.assertEqual([describe(a) for a in received.approaches],
+                             [describe(a) for a in expected.approaches])
+
+    def test_append_updates_the_indexes(self):
+        for column, index in self.db._indexes.items():
+            self.assertEqual(index.keys, self.expected._indexes[column].keys)
+            self.assertEqual(list(index.rows), list(self.expected._indexes[column].rows))
+
+    def test_append_answers_queries_like_a_fresh_database(self):
+        for filters in FILTERS:
+            for sort_by in (None, 'time', 'distance', 'diameter'):
+                received = [describe(a) for a in self.db.query(filters, 20, sort_by)]
+                expected = [describe(a) for a in self.expected.query(filters, 20, sort_by)]
+                self.assertEqual(received, expected)
+
+    def test_append_updates_lookups_and_searches(self):
+        neo = self.delta_neos[0]
+        self.assertIs(self.db.get_neo_by_designation(neo.designation), neo)
+        self.assertEqual(self.db.get_neo_by_designation(self.db._neos[0].designation).name,
+                         self.expected._neos[0].name)
+        found, candidate = self.db.search_neos(neo.designation.lower())[0]
+        self.assertIs(found, neo)
+        self.assertEqual(candidate.kind, 'exact')
+
+    @unittest.skipUnless(numpy_available(), "NumPy is not installed.")
+    def test_append_to_a_vectorized_database(self):
+        base_neos, delta_neos, base_approaches, delta_approaches = split()
+        db = NEODatabase(base_neos, base_approaches, vectorized=True)
+        db.append(delta_neos, delta_approaches)
+        for filters in FILTERS:
+            self.assertEqual([describe(a) for a in db.query(filters)],
+                             [describe(a) for a in self.expected.query(filters)])
+
+
+class TestAppendToSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tempdir.name)
+        self.neo_file, self.cad_file = root / 'neos.csv', root / 'cad.json'
+        self.neo_delta, self.cad_delta = root / 'new-neos.csv', root / 'new-cad.json'
+        base_neos, delta_neos, _, _ = split()
+        delta = {neo.designation for neo in delta_neos}
+
+        with open(TEST_NEO_FILE) as infile:
+            rows = list(csv.reader(infile))
+        pdes = rows[0].index('pdes')
+        for path, selected in ((self.neo_file, False), (self.neo_delta, True)):
+            with open(path, 'w', newline='') as outfile:
+                csv.writer(outfile).writerows(
+                    [rows[0]] + [row for row in rows[1:] if (row[pdes] in delta) == selected])
+        with open(TEST_CAD_FILE) as infile:
+            cad = json.load(infile)
+        for path, data in ((self.cad_file, cad['data'][:BASE]),
+                           (self.cad_delta, cad['data'][BASE:])):
+            with open(path, 'w') as outfile:
+                json.dump({**cad, 'count': len(data), 'data': data}, outfile)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_append_to_snapshot(self):
+        database, added = append_to_snapshot(self.neo_file, self.cad_file,
+                                             [self.neo_delta], [self.cad_delta])
+        self.assertEqual(added[1], len(load_approaches(TEST_CAD_FILE)) - BASE)
+        path = snapshot_path(self.neo_file, self.cad_file)
+        self.assertTrue(is_fresh(path, self.neo_file, self.cad_file))
+
+        # Later loads read the appended snapshot, with the same results.
+        reloaded = load_database(self.neo_file, self.cad_file)
+        self.assertEqual(len(reloaded._approaches), len(database._approaches))
+        for filters in FILTERS:
+            self.assertEqual([describe(a) for a in reloaded.query(filters)],
+                             [describe(a) for a in database.query(filters)])
+        for column, index in reloaded._indexes.items():
+            self.assertEqual(list(index.rows), list(database._indexes[column].rows))
+
+    def test_append_to_a_fresh_snapshot_doesnt_sort_it_again(self):
+        load_database(self.neo_file, self.cad_file)
+        with unittest.mock.patch.object(SortedIndex, '__init__',
+                                        side_effect=AssertionError("Sorted again.")):
+            database, _ = append_to_snapshot(self.neo_file, self.cad_file,
+                                             [self.neo_delta], [self.cad_delta])
+        expected = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        for filters in FILTERS:
+            self.assertEqual(sorted(describe(a) for a in database.query(filters)),
+                             sorted(describe(a) for a in expected.query(filters)))
+        self.assertEqual([neo.designation for neo, _ in database.search_neos('2020 A')],
+                         [neo.designation for neo, _ in expected.search_neos('2020 A')])
+
+    def test_rebuilding_the_snapshot_warns_that_deltas_are_discarded(self):
+        append_to_snapshot(self.neo_file, self.cad_file, [self.neo_delta], [self.cad_delta])
+        with open(self.neo_file, 'a') as outfile:
+            outfile.write('\n')
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            database = load_database(self.neo_file, self.cad_file)
+        self.assertIn("discards the 2 delta files", stderr.getvalue())
+        self.assertEqual(len(database), BASE)
+
+    def test_appending_a_delta_again_skips_it(self):
+        database, _ = append_to_snapshot(self.neo_file, self.cad_file,
+                                         [self.neo_delta], [self.cad_delta])
+        count = len(database)
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            database, added = append_to_snapshot(self.neo_file, self.cad_file,
+                                                 [self.neo_delta], [self.cad_delta, self.cad_delta])
+        self.assertEqual(added, (0, 0))
+        self.assertEqual(len(database), count)
+        self.assertEqual(len(load_database(self.neo_file, self.cad_file)), count)
+        self.assertIn(f"Skipping {self.cad_delta}, which was already appended", stderr.getvalue())
+
+    def test_append_reports_approaches_of_unknown_neos(self):
+        with open(self.cad_delta) as infile:
+            cad = json.load(infile)
+        des = cad['fields'].index('des')
+        for row in cad['data'][:2]:
+            row[des] = 'NOT A NEO'
+        with open(self.cad_delta, 'w') as outfile:
+            json.dump(cad, outfile)
+
+        args = main.make_parser()[0].parse_args([
+            '--neofile', str(self.neo_file), '--cadfile', str(self.cad_file),
+            'append', '--neos', str(self.neo_delta), '--approaches', str(self.cad_delta)])
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr), contextlib.redirect_stdout(io.StringIO()):
+            database = main.append(args)
+        self.assertEqual(database.unlinked, {'NOT A NEO': 2})
+        self.assertIn("Skipped 2 close approaches of 1 unknown NEOs, such as 'NOT A NEO'.",
+                      stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Check that a `QueryCache` remembers matching rows, and evicts them within its budget.
+
+Filters are cache keys, so they must be hashable, and equal when they have the
+same class, comparator and reference value.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_cache
+"""
+import array
+import datetime
+import operator
+import sys
+import unittest
+
+from cache import QueryCache
+from filters import create_filters, filter_key, DateFilter, DistanceFilter
+
+
+class TestFilterKey(unittest.TestCase):
+    def test_filters_are_equal_by_class_comparator_and_value(self):
+        self.assertEqual(DistanceFilter(operator.le, 0.1), DistanceFilter(operator.le, 0.1))
+        self.assertEqual(hash(DistanceFilter(operator.le, 0.1)),
+                         hash(DistanceFilter(operator.le, 0.1)))
+        self.assertNotEqual(DistanceFilter(operator.le, 0.1), DistanceFilter(operator.ge, 0.1))
+        self.assertNotEqual(DistanceFilter(operator.le, 0.1), DistanceFilter(operator.le, 0.2))
+        self.assertNotEqual(DateFilter(operator.eq, datetime.date(2020, 1, 1)),
+                            DistanceFilter(operator.eq, datetime.date(2020, 1, 1)))
+
+    def test_filter_key_ignores_order(self):
+        filters = create_filters(start_date=datetime.date(2020, 1, 1), distance_max=0.1)
+        self.assertEqual(filter_key(filters), filter_key(reversed(filters)))
+        self.assertNotEqual(filter_key(filters), filter_key(filters[:1]))
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.rows = array.array('i', range(100))
+        self.cache = QueryCache(budget=sys.getsizeof(self.rows) * 2)
+
+    def test_cache_counts_hits_and_misses(self):
+        filters = create_filters(distance_max=0.1)
+        self.assertIsNone(self.cache.get(filters))
+        self.assertEqual(self.cache.misses_of(filters), 1)
+        self.assertTrue(self.cache.put(filters, self.rows))
+        self.assertIs(self.cache.get(create_filters(distance_max=0.1)), self.rows)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(self.cache.misses_of(filters), 0)
+
+    def test_cache_evicts_least_recently_used(self):
+        first, second, third = (create_filters(distance_max=d) for d in (0.1, 0.2, 0.3))
+        self.cache.put(first, self.rows)
+        self.cache.put(second, self.rows)
+        self.cache.get(first)
+        self.cache.put(third, self.rows)
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertIsNone(self.cache.get(second))
+        self.assertIsNotNone(self.cache.get(first))
+        self.assertLessEqual(self.cache.size, self.cache.budget)
+
+    def test_cache_skips_rows_larger_than_its_budget(self):
+        filters = create_filters()
+        self.assertFalse(self.cache.put(filters, array.array('i', range(1000))))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_cache_clear(self):
+        self.cache.put(create_filters(), self.rows)
+        self.cache.clear()
+        self.assertEqual((len(self.cache), self.cache.size, self.cache.evictions), (0, 0, 0))
+        self.assertIn('0 evictions', self.cache.stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,7 +16,8 @@ import unittest
 
 
 from extract import load_neos, load_approaches
-from database import NEODatabase
+from database import NEODatabase, SortedIndex
+from models import NearEarthObject, CloseApproach
 
 
 # Paths to the test data files.
@@ -115,5 +116,48 @@ class TestDatabase(unittest.TestCase):
         self.assertIsNone(nonexistent)
 
 
+class TestLinking(unittest.TestCase):
+    def setUp(self):
+        self.neos = [NearEarthObject('A', None, 1.0, False), NearEarthObject('B', None, 2.0, True),
+                     NearEarthObject('C', None, 3.0, False)]
+        self.approaches = [CloseApproach.from_minutes(designation, minutes, 0.1, 10.0)
+                           for minutes, designation in enumerate('BAXBAX')]
+
+    def test_approaches_are_views_in_original_order(self):
+        db = NEODatabase(self.neos, self.approaches)
+        a, b, c = self.neos
+        self.assertEqual([approach.epoch_minutes for approach in a.approaches], [1, 4])
+        self.assertEqual([approach.epoch_minutes for approach in b.approaches], [0, 3])
+        self.assertEqual(len(c.approaches), 0)
+        self.assertEqual([approach.epoch_minutes for approach in a.approaches[::-1]], [4, 1])
+        self.assertIs(db.get_neo_by_designation('A').approaches[-1].neo, a)
+
+    def test_unknown_designations_are_counted_and_left_out(self):
+        db = NEODatabase(self.neos, self.approaches)
+        self.assertEqual(db.unlinked, {'X': 2})
+        self.assertEqual(len(list(db.query())), 4)
+        self.assertEqual(len(db), 4)
+        self.assertTrue(all(approach.neo is not None for approach in db.query()))
+
+
+class TestSortedIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SortedIndex([0.5, 0.1, 0.3, 0.3, 0.9])
+
+    def test_sorted_index_orders_rows_by_value(self):
+        self.assertEqual(self.index.keys, [0.1, 0.3, 0.3, 0.5, 0.9])
+        self.assertEqual(self.index.rows, [1, 2, 3, 0, 4])
+
+    def test_sorted_index_rows_between_inclusive_bounds(self):
+        self.assertEqual(self.index.rows_between(0.3, 0.5), [2, 3, 0])
+        self.assertEqual(self.index.rows_between(None, 0.3), [1, 2, 3])
+        self.assertEqual(self.index.rows_between(0.6, None), [4])
+        self.assertEqual(self.index.rows_between(), [1, 2, 3, 0, 4])
+
+    def test_sorted_index_rows_between_empty_or_inverted_bounds(self):
+        self.assertEqual(self.index.rows_between(0.6, 0.8), [])
+        self.assertEqual(self.index.rows_between(0.9, 0.1), [])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -12,11 +12,13 @@ These tests should pass when Task 2 is complete.
 """
 import collections.abc
 import datetime
+import json
 import pathlib
 import math
+import tempfile
 import unittest
 
-from extract import load_neos, load_approaches
+from extract import load_neos, load_approaches, iter_cad_rows
 from models import NearEarthObject, CloseApproach
 
 
@@ -118,5 +120,70 @@ class TestLoadApproaches(unittest.TestCase):
         self.assertIsInstance(approach.velocity, float)
 
 
+class TestIterCADRows(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(TEST_CAD_FILE) as infile:
+            cls.document = json.load(infile)
+        cls.expected = [(row[0], row[3], row[4]) for row in cls.document['data']]
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def write_document(self, document, **kwargs):
+        path = pathlib.Path(self.tempdir.name) / 'cad.json'
+        path.write_text(json.dumps(document, **kwargs))
+        return path
+
+    def test_iter_cad_rows_with_trailing_fields(self):
+        rows = list(iter_cad_rows(TEST_CAD_FILE, ('des', 'cd', 'dist')))
+        self.assertEqual(rows, self.expected)
+
+    def test_iter_cad_rows_with_leading_fields(self):
+        document = {'signature': self.document['signature'], 'count': self.document['count'],
+                    'fields': self.document['fields'], 'data': self.document['data']}
+        path = self.write_document(document)
+        rows = list(iter_cad_rows(path, ('des', 'cd', 'dist')))
+        self.assertEqual(rows, self.expected)
+
+    def test_iter_cad_rows_across_small_chunks(self):
+        document = {'count': 12345678, 'fields': ['des', 'h', 'cd'],
+                    'data': [['2020 AB', 21.5, '2020-Jan-01 00:00'], ['2020 BC', None, '2020-Feb-02 02:02']]}
+        for kwargs in ({}, {'indent': 2}, {'separators': (',', ':')}):
+            path = self.write_document(document, **kwargs)
+            for chunk_size in (1, 2, 3, 7, 64):
+                rows = list(iter_cad_rows(path, ('h', 'des'), chunk_size=chunk_size))
+                self.assertEqual(rows, [(21.5, '2020 AB'), (None, '2020 BC')])
+
+    def test_iter_cad_rows_with_single_column(self):
+        rows = list(iter_cad_rows(TEST_CAD_FILE, ('des',)))
+        self.assertEqual(rows, [(row[0],) for row in self.expected])
+
+    def test_iter_cad_rows_with_empty_data(self):
+        path = self.write_document({'count': 0, 'data': [], 'fields': ['des']})
+        self.assertEqual(list(iter_cad_rows(path, ('des',))), [])
+
+    def test_iter_cad_rows_with_fields_strings_after_the_header(self):
+        document = {'data': [['2020 AB', 'fields'], ['2020 BC', '"fields": 1']],
+                    'fields': ['des', 'note'],
+                    'signature': {'note': 'fields', 'nested': {'fields': 3}, 'end': 'fields'}}
+        for kwargs in ({}, {'indent': 2}):
+            path = self.write_document(document, **kwargs)
+            for chunk_size in (1, 5, 64, 1 << 16):
+                rows = list(iter_cad_rows(path, ('note', 'des'), chunk_size=chunk_size))
+                self.assertEqual(rows, [('fields', '2020 AB'), ('"fields": 1', '2020 BC')])
+
+    def test_iter_cad_rows_without_fields(self):
+        path = self.write_document({'data': [['2020 AB']]})
+        with self.assertRaises(ValueError):
+            list(iter_cad_rows(path, ('des',)))
+
+    def test_iter_cad_rows_with_missing_field(self):
+        path = self.write_document({'fields': ['des'], 'data': [['2020 AB']]})
+        with self.assertRaises(ValueError):
+            list(iter_cad_rows(path, ('des', 'cd')))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,78 @@
+"""Check that datetimes are converted to and from NASA's formats.
+
+The `cd_to_datetime` function has a fast path for NASA's canonical calendar
+dates, which must agree with `datetime.strptime` on results and errors alike.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_helpers
+"""
+import datetime
+import unittest
+
+from helpers import (cd_to_datetime, datetime_to_str, datetime_to_minutes, minutes_to_datetime,
+                     minutes_to_str)
+
+
+def strptime(calendar_date):
+    return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+
+
+class TestCalendarDates(unittest.TestCase):
+    def test_cd_to_datetime(self):
+        self.assertEqual(cd_to_datetime('2020-Dec-31 12:00'), datetime.datetime(2020, 12, 31, 12, 0))
+        self.assertEqual(cd_to_datetime('1900-Jan-01 00:00'), datetime.datetime(1900, 1, 1, 0, 0))
+        self.assertEqual(cd_to_datetime('2100-Feb-28 23:59'), datetime.datetime(2100, 2, 28, 23, 59))
+
+    def test_cd_to_datetime_agrees_with_strptime_on_every_month(self):
+        for month in range(1, 13):
+            calendar_date = datetime.datetime(2024, month, 29, 7, 5).strftime("%Y-%b-%d %H:%M")
+            self.assertEqual(cd_to_datetime(calendar_date), strptime(calendar_date))
+
+    def test_cd_to_datetime_agrees_with_strptime_on_unusual_formats(self):
+        for calendar_date in ('2020-dec-31 12:00', '2020-DEC-31 12:00', '2020-Dec-1 2:03',
+                              '2020-December-31 12:00', '20-Dec-31 12:00'):
+            with self.subTest(calendar_date=calendar_date):
+                try:
+                    expected = strptime(calendar_date)
+                except ValueError as err:
+                    with self.assertRaises(ValueError) as context:
+                        cd_to_datetime(calendar_date)
+                    self.assertEqual(str(context.exception), str(err))
+                else:
+                    self.assertEqual(cd_to_datetime(calendar_date), expected)
+
+    def test_cd_to_datetime_raises_strptime_errors(self):
+        for calendar_date in ('2020-Feb-30 12:00', '2020-Dec-31 24:00', '2020-Dec-31 12:60',
+                              '2020-Dex-31 12:00', '2020-Dec-00 12:00', '2020-Dec-+1 12:00',
+                              '2020-Dec-3_1 2:00', '2020-Dec-31T12:00', ''):
+            with self.subTest(calendar_date=calendar_date):
+                with self.assertRaises(ValueError) as expected:
+                    strptime(calendar_date)
+                with self.assertRaises(ValueError) as received:
+                    cd_to_datetime(calendar_date)
+                self.assertEqual(str(received.exception), str(expected.exception))
+
+    def test_datetime_to_str(self):
+        self.assertEqual(datetime_to_str(datetime.datetime(2020, 12, 31, 12, 0)), '2020-12-31 12:00')
+
+
+class TestEpochMinutes(unittest.TestCase):
+    def test_datetime_to_minutes_round_trips(self):
+        for dt in (datetime.datetime(1970, 1, 1), datetime.datetime(1900, 1, 1, 0, 1),
+                   datetime.datetime(2100, 12, 31, 23, 59)):
+            self.assertEqual(minutes_to_datetime(datetime_to_minutes(dt)), dt)
+
+    def test_datetime_to_minutes_truncates_seconds(self):
+        self.assertEqual(datetime_to_minutes(datetime.datetime(1970, 1, 1, 0, 1, 59)), 1)
+        self.assertEqual(datetime_to_minutes(datetime.datetime(1969, 12, 31, 23, 59, 30)), -1)
+
+    def test_minutes_to_str_agrees_with_datetime_to_str(self):
+        for minutes in (0, -1, 59, 1439, 1440, 26_000_000, -600_000_000, 600_000_000):
+            with self.subTest(minutes=minutes):
+                self.assertEqual(minutes_to_str(minutes),
+                                 datetime_to_str(minutes_to_datetime(minutes)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -49,6 +49,11 @@ class TestLimit(unittest.TestCase):
         self.assertIsInstance(limit(self.iterable, 0), collections.abc.Iterable)
         self.assertIsInstance(limit(self.iterable, None), collections.abc.Iterable)
 
+    def test_limit_stops_consuming_the_iterator(self):
+        iterator = iter(range(100))
+        self.assertEqual(tuple(limit(iterator, 3)), (0, 1, 2))
+        self.assertEqual(next(iterator), 3)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,100 @@
+"""Check that a `NameIndex` finds names and designations by prefix and by edit distance.
+
+The index is checked on its own with a few names, and through
+`NEODatabase.search_neos` with the test data files.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_names
+"""
+import pathlib
+import random
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from names import NameIndex, edit_distance
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+NAMES = ['Eros', 'Eris', 'Erebus', 'Halley', 'Apophis', 'Adonis', '433', '2020 AB']
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char != other)))
+        previous = current
+    return previous[-1]
+
+
+class TestEditDistance(unittest.TestCase):
+    def test_edit_distance_agrees_with_dynamic_programming(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            a = ''.join(rng.choice('ab c') for _ in range(rng.randint(0, 8)))
+            b = ''.join(rng.choice('ab c') for _ in range(rng.randint(0, 8)))
+            self.assertEqual(edit_distance(a, b, 10), levenshtein(a, b))
+            self.assertEqual(edit_distance(a, b, 1), min(levenshtein(a, b), 2))
+
+
+class TestNameIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = NameIndex((name, row) for row, name in enumerate(NAMES))
+
+    def keys(self, candidates):
+        return [candidate.key for candidate in candidates]
+
+    def test_prefix_search_ignores_case(self):
+        self.assertEqual(self.keys(self.index.prefixed('er')), ['Erebus', 'Eris', 'Eros'])
+        self.assertEqual(self.keys(self.index.prefixed('ER', limit=2)), ['Erebus', 'Eris'])
+        self.assertEqual(self.index.prefixed('nothing'), [])
+
+    def test_exact_matches_rank_first(self):
+        candidates = self.index.search('halley')
+        self.assertEqual(candidates[0].key, 'Halley')
+        self.assertEqual(candidates[0].kind, 'exact')
+        self.assertEqual(candidates[0].row, NAMES.index('Halley'))
+
+    def test_fuzzy_matches_are_ranked_by_distance(self):
+        candidates = self.index.search('Eross')
+        self.assertEqual(candidates[0].key, 'Eros')
+        self.assertEqual((candidates[0].kind, candidates[0].distance), ('fuzzy', 1))
+        self.assertEqual(self.keys(self.index.search('halle')), ['Halley'])
+        self.assertEqual(self.keys(self.index.search('apofis')), ['Adonis', 'Apophis'])
+        distances = [candidate.distance for candidate in self.index.search('Eras')]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_search_without_matches(self):
+        self.assertEqual(self.index.search('zzzz'), [])
+        self.assertEqual(self.index.search(''), [])
+
+
+class TestSearchNEOs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_search_neos_by_name_and_designation(self):
+        neo, candidate = self.db.search_neos('apophis')[0]
+        self.assertIs(neo, self.db.get_neo_by_name('Apophis'))
+        self.assertEqual(candidate.kind, 'exact')
+        neo, candidate = self.db.search_neos('2020 bs')[0]
+        self.assertIs(neo, self.db.get_neo_by_designation('2020 BS'))
+
+    def test_search_neos_lists_each_neo_once(self):
+        found = self.db.search_neos('2020 a', limit=50)
+        self.assertEqual(len(found), 50)
+        self.assertEqual(len({neo.designation for neo, _ in found}), 50)
+        for neo, candidate in found:
+            self.assertTrue(candidate.key.lower().startswith('2020 a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Check that loading the data files with a pool of worker processes is equivalent to loading them serially.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_parallel
+"""
+import io
+import json
+import math
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import _JSONStream, iter_cad_batches, load_neos, load_approaches
+from parallel import load_columns, load_objects
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestIterCADBatches(unittest.TestCase):
+    def test_batches_hold_every_row_in_order(self):
+        with open(TEST_CAD_FILE) as infile:
+            document = json.load(infile)
+        fields, batches = iter_cad_batches(TEST_CAD_FILE, batch_size=1000, chunk_size=100)
+        batches = list(batches)
+        self.assertEqual(fields, document['fields'])
+        self.assertEqual(len(batches), math.ceil(len(document['data']) / 1000))
+        self.assertEqual([row for batch in batches for row in json.loads(batch)],
+                         document['data'])
+
+    def test_rows_that_are_not_flat_arrays(self):
+        data = [['2020 AB', {'h': 21.5}], [['nested'], '"]'], 7, '2020 "BC"', ['2020 CD', None]]
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / 'cad.json'
+            path.write_text(json.dumps({'data': data, 'fields': ['des', 'h']}))
+            for chunk_size in (1, 3, 64):
+                fields, batches = iter_cad_batches(path, batch_size=2, chunk_size=chunk_size)
+                self.assertEqual(fields, ['des', 'h'])
+                self.assertEqual([row for batch in batches for row in json.loads(batch)], data)
+
+    def test_a_row_that_is_not_flat_is_decoded_without_buffering_the_rest(self):
+        rows = [['2020 AB', {'h': 21.5}]] + [['2020 BC', 1.0]] * 10000
+        infile = io.BytesIO(json.dumps(rows).encode())
+        stream = _JSONStream(infile, 64)
+        self.assertEqual(json.loads(next(stream.raw_items())), rows[0])
+        self.assertLess(infile.tell(), 256)
+
+
+class TestParallelLoad(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.parallel_neos, cls.parallel_approaches = load_objects(
+            TEST_NEO_FILE, TEST_CAD_FILE, jobs=2, batch_size=500)
+
+    def test_neos_are_identical(self):
+        self.assertEqual(len(self.parallel_neos), len(self.neos))
+        for neo, expected in zip(self.parallel_neos, self.neos):
+            self.assertEqual(neo.designation, expected.designation)
+            self.assertEqual(neo.name, expected.name)
+            self.assertEqual(neo.hazardous, expected.hazardous)
+            if math.isnan(expected.diameter):
+                self.assertTrue(math.isnan(neo.diameter))
+            else:
+                self.assertEqual(neo.diameter, expected.diameter)
+
+    def test_approaches_are_identical(self):
+        self.assertEqual(len(self.parallel_approaches), len(self.approaches))
+        for approach, expected in zip(self.parallel_approaches, self.approaches):
+            self.assertEqual(approach._designation, expected._designation)
+            self.assertEqual(approach.time, expected.time)
+            self.assertEqual(approach.distance, expected.distance)
+            self.assertEqual(approach.velocity, expected.velocity)
+
+    def test_columns_are_compact(self):
+        neo_columns, approach_columns = load_columns(TEST_NEO_FILE, TEST_CAD_FILE, jobs=2)
+        self.assertEqual(approach_columns['time'].typecode, 'q')
+        self.assertEqual(approach_columns['distance'].typecode, 'd')
+        self.assertEqual(neo_columns['hazardous'].typecode, 'b')
+        self.assertEqual(len(approach_columns['designation']), len(self.approaches))
+
+    def test_database_from_columns_is_linked(self):
+        database = NEODatabase.from_columns(*load_columns(TEST_NEO_FILE, TEST_CAD_FILE, jobs=2))
+        neo = database.get_neo_by_designation('2020 AY1')
+        expected = sum(approach._designation == '2020 AY1' for approach in self.approaches)
+        self.assertEqual(len(neo.approaches), expected)
+        self.assertTrue(all(approach.neo is neo for approach in neo.approaches))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+"""Check that filters are merged, ordered and explained by the query planner.
+
+The `plan` function merges the filters from `create_filters` into one range
+predicate per column, chooses the most selective index as the access path, and
+orders the remaining predicates by estimated selectivity and cost.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_planner
+"""
+import datetime
+import operator
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, DistanceFilter
+from helpers import datetime_to_minutes
+from planner import ColumnStats, RangePredicate, compile_predicate
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestColumnStats(unittest.TestCase):
+    def setUp(self):
+        self.stats = ColumnStats([float(i) for i in range(1000)] + [float('nan')] * 1000)
+
+    def test_column_stats_counts_missing_values(self):
+        self.assertEqual(self.stats.count, 2000)
+        self.assertEqual(self.stats.nulls, 1000)
+
+    def test_column_stats_estimates_selectivity(self):
+        self.assertAlmostEqual(self.stats.selectivity(), 0.5)
+        self.assertAlmostEqual(self.stats.selectivity(None, 499), 0.25, delta=0.01)
+        self.assertAlmostEqual(self.stats.selectivity(250, 749), 0.25, delta=0.01)
+
+    def test_column_stats_estimates_empty_ranges(self):
+        self.assertEqual(self.stats.selectivity(2000, None), 0.0)
+        self.assertEqual(self.stats.selectivity(None, -1), 0.0)
+        self.assertEqual(self.stats.selectivity(600, 400), 0.0)
+
+
+class TestPlan(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(cls.neos, cls.approaches)
+
+    def test_plan_without_filters_is_a_full_scan(self):
+        plan = self.db.plan(create_filters())
+        self.assertIsNone(plan.index)
+        self.assertEqual(plan.candidates, len(self.approaches))
+        self.assertEqual(plan.predicates, [])
+
+    def test_plan_merges_date_bounds_into_one_range(self):
+        plan = self.db.plan(create_filters(
+            start_date=datetime.date(2020, 3, 1), end_date=datetime.date(2020, 3, 31),
+            hazardous=True
+        ))
+        self.assertEqual(plan.index, 'time')
+        self.assertEqual(plan.span, (datetime_to_minutes(datetime.datetime(2020, 3, 1, 0, 0)),
+                                     datetime_to_minutes(datetime.datetime(2020, 3, 31, 23, 59))))
+        self.assertEqual(len(plan.predicates), 1)
+        self.assertEqual(plan.predicates[0].predicate.column, 'hazardous')
+
+    def test_plan_turns_a_date_into_a_one_day_range(self):
+        date = datetime.date(2020, 3, 2)
+        plan = self.db.plan(create_filters(date=date))
+        expected = [approach for approach in self.approaches if approach.time.date() == date]
+        self.assertEqual(plan.index, 'time')
+        self.assertEqual(plan.candidates, len(expected))
+
+    def test_plan_uses_the_most_selective_index(self):
+        plan = self.db.plan(create_filters(
+            start_date=datetime.date(2020, 1, 1), distance_max=0.001
+        ))
+        self.assertEqual(plan.index, 'distance')
+        self.assertEqual([p.predicate.column for p in plan.predicates], ['time'])
+
+    def test_plan_orders_predicates_by_selectivity(self):
+        plan = self.db.plan(create_filters(
+            date=datetime.date(2020, 3, 2), velocity_min=1, distance_min=0.01, hazardous=True
+        ))
+        ranks = [p.rank for p in plan.predicates]
+        self.assertEqual(ranks, sorted(ranks))
+
+    def test_explain_describes_the_plan(self):
+        text = self.db.explain(create_filters(distance_max=0.01, diameter_min=1))
+        self.assertIn('Index scan on distance', text)
+        self.assertIn('RangePredicate(diameter', text)
+        self.assertIn('Full scan', self.db.explain(create_filters()))
+
+    def test_capped_plan_prefers_a_full_scan_for_a_wide_range(self):
+        filters = create_filters(distance_max=0.4)
+        self.assertEqual(self.db.plan(filters).index, 'distance')
+        plan = self.db.plan(filters, limit=10)
+        self.assertIsNone(plan.index)
+        self.assertEqual([p.predicate.column for p in plan.predicates], ['distance'])
+        self.assertIn('Stops after 10 matches', plan.explain())
+
+    def test_capped_plan_keeps_an_index_correlated_with_internal_order(self):
+        filters = create_filters(start_date=datetime.date(2020, 6, 1))
+        self.assertGreater(self.db._indexes['time'].correlation(), 0.9)
+        self.assertEqual(self.db.plan(filters, limit=10).index, 'time')
+
+    def test_sorted_plan_walks_the_sort_index(self):
+        plan = self.db.plan(create_filters(hazardous=False), limit=10, sort_by='distance')
+        self.assertEqual(plan.order, 'index')
+        self.assertEqual(plan.index, 'distance')
+        self.assertIn('Index walk on distance in ascending order', plan.explain())
+
+        plan = self.db.plan(create_filters(distance_max=0.01), sort_by='distance',
+                            descending=True)
+        self.assertEqual(plan.order, 'index')
+        self.assertEqual(plan.predicates, [])
+
+    def test_sorted_plan_heaps_the_candidates_of_a_narrower_index(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2))
+        plan = self.db.plan(filters, limit=10, sort_by='velocity')
+        self.assertEqual((plan.order, plan.index), ('heap', 'time'))
+        self.assertIn('bounded heap', plan.explain())
+        plan = self.db.plan(filters, sort_by='velocity')
+        self.assertEqual((plan.order, plan.index), ('sort', 'time'))
+        self.assertEqual(self.db.plan(filters, limit=10, sort_by='diameter').order, 'heap')
+
+    def test_compiled_predicates_agree_with_calling_each_predicate(self):
+        for filters in (create_filters(distance_max=0.1, hazardous=True),
+                        create_filters(date=datetime.date(2020, 3, 2), velocity_min=10),
+                        create_filters(start_date=datetime.date(2020, 6, 1), diameter_min=0.5,
+                                       diameter_max=1, velocity_max=20, hazardous=False),
+                        [DistanceFilter(operator.gt, 0.2), *create_filters(velocity_min=15)]):
+            for predicates in (filters, [p.predicate for p in self.db.plan(filters).predicates]):
+                compiled = compile_predicate(predicates)
+                self.assertEqual([approach for approach in self.approaches if compiled(approach)],
+                                 [approach for approach in self.approaches
+                                  if all(p(approach) for p in predicates)])
+        compiled = compile_predicate(create_filters(distance_max=0.1, hazardous=True))
+        self.assertEqual(compiled.expression, 'a.distance <= hi0 and a.neo.hazardous == lo1')
+        self.assertIn('p0(a)', compile_predicate([DistanceFilter(operator.gt, 0.2)]).expression)
+
+    def test_query_results_do_not_depend_on_compiled_predicates(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), velocity_min=5,
+                                 diameter_max=1, hazardous=False)
+        expected = list(self.db.query(filters))
+        self.db.compile_predicates = False
+        try:
+            self.assertEqual(list(self.db.query(filters)), expected)
+            self.assertEqual(list(self.db.query(filters, 3, 'velocity')),
+                             sorted(expected, key=lambda approach: approach.velocity)[:3])
+        finally:
+            del self.db.compile_predicates
+
+
+class TestRangePredicate(unittest.TestCase):
+    def test_range_predicate_narrows_to_intersection(self):
+        predicate = RangePredicate(DistanceFilter, 0.1, 0.5)
+        predicate.narrow(0.2, None)
+        predicate.narrow(None, 0.4)
+        self.assertEqual((predicate.lo, predicate.hi), (0.2, 0.4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Check that the profiling hooks time stages and count filters only while a profiler is active.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_profiling
+"""
+import datetime
+import pathlib
+import pstats
+import tempfile
+import threading
+import unittest
+
+import profiling
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from write import write_to_csv
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestInactiveHooks(unittest.TestCase):
+    def test_hooks_return_their_arguments_without_a_profiler(self):
+        self.assertIsNone(profiling.active())
+        items = [1, 2, 3]
+        self.assertIs(profiling.iterate('stage', items), items)
+        self.assertIs(profiling.timed('stage', len), len)
+        with profiling.stage('stage') as stage:
+            stage.count(3)
+        self.assertIs(profiling.stage('other'), profiling.stage('stage'))
+
+    def test_profilers_nest_and_restore_the_active_profiler(self):
+        with profiling.Profiler() as outer:
+            self.assertIs(profiling.active(), outer)
+            with profiling.Profiler() as inner:
+                self.assertIs(profiling.active(), inner)
+            self.assertIs(profiling.active(), outer)
+        self.assertIsNone(profiling.active())
+
+    def test_profilers_only_follow_the_thread_that_activated_them(self):
+        seen = []
+
+        def worker():
+            seen.append(profiling.active())
+            with profiling.stage('worker') as stage:
+                stage.count(1)
+
+        with profiling.Profiler() as profiler:
+            with profiling.stage('main'):
+                thread = threading.Thread(target=worker)
+                thread.start()
+                thread.join()
+        self.assertEqual(seen, [None])
+        self.assertEqual(list(profiler.stages), ['main'])
+
+
+class TestProfiler(unittest.TestCase):
+    def test_nested_stages_are_excluded_from_self_time(self):
+        with profiling.Profiler() as profiler:
+            with profiling.stage('outer'):
+                for _ in range(2):
+                    with profiling.stage('inner') as stage:
+                        stage.count(5)
+        outer, inner = profiler.stages['outer'], profiler.stages['inner']
+        self.assertEqual((outer.depth, inner.depth), (0, 1))
+        self.assertEqual((outer.calls, inner.calls), (1, 2))
+        self.assertEqual(inner.rows, 10)
+        self.assertAlmostEqual(outer.own_seconds, outer.seconds - inner.seconds)
+        self.assertGreaterEqual(outer.seconds, inner.seconds)
+
+    def test_iterate_counts_items_and_times_their_production(self):
+        with profiling.Profiler() as profiler:
+            with profiling.stage('consume'):
+                items = list(profiling.iterate('produce', iter(range(7))))
+        self.assertEqual(items, list(range(7)))
+        produce = profiler.stages['produce']
+        self.assertEqual((produce.calls, produce.rows, produce.depth), (1, 7, 1))
+        self.assertAlmostEqual(profiler.stages['consume'].nested, produce.seconds)
+
+    def test_timed_counts_calls(self):
+        with profiling.Profiler() as profiler:
+            parse = profiling.timed('parse', int)
+            self.assertEqual([parse(text) for text in '123'], [1, 2, 3])
+        self.assertEqual(profiler.stages['parse'].calls, 3)
+
+    def test_profile_is_dumped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / 'neo.prof'
+            with profiling.Profiler(path) as profiler:
+                sum(range(1000))
+            self.assertGreater(pstats.Stats(str(path)).total_calls, 0)
+            self.assertIn(str(path), profiler.report())
+
+
+class TestPipelineHooks(unittest.TestCase):
+    def test_pipeline_stages_and_filter_counts(self):
+        filters = create_filters(start_date=datetime.date(2020, 6, 1), distance_max=0.1,
+                                 velocity_min=10)
+        with tempfile.TemporaryDirectory() as directory:
+            with profiling.Profiler() as profiler:
+                database = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+                results = list(profiling.iterate('database.query', database.query(filters)))
+                write_to_csv(results, pathlib.Path(directory) / 'results.csv')
+
+        for name in ('load_neos', 'load_approaches', 'cd_to_datetime', 'link', 'index',
+                     'database.query', 'write_to_csv'):
+            self.assertIn(name, profiler.stages)
+        approaches = profiler.stages['load_approaches']
+        self.assertEqual(approaches.rows, profiler.stages['cd_to_datetime'].calls)
+        self.assertEqual(profiler.stages['database.query'].rows, len(results))
+
+        counts, = profiler.queries
+        self.assertEqual(counts.matched, len(results))
+        self.assertEqual(counts.scanned, counts.evaluated[0])
+        self.assertEqual(counts.passed[:-1], counts.evaluated[1:])
+        self.assertEqual(counts.passed[-1], len(results))
+        self.assertIn(f"Scanned {counts.scanned} rows, of which {len(results)} matched.",
+                      profiler.report())
+
+    def test_counted_queries_match_compiled_queries(self):
+        database = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        filters = create_filters(diameter_min=0.1, hazardous=False)
+        expected, expected_rows = list(database.query(filters, 20)), database.query_rows(filters)
+        with profiling.Profiler() as profiler:
+            self.assertEqual(list(database.query(filters, 20)), expected)
+            self.assertEqual(database.query_rows(filters), expected_rows)
+        self.assertEqual(len(profiler.queries), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
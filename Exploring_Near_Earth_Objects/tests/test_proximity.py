@@ -0,0 +1,150 @@
+"""Check that proximity queries match brute-force answers over every close approach.
+
+The nearest close approaches in time to a moment, the close approaches within a
+window of days, and the closest approach ever of each NEO must agree with
+sorting or scanning every close approach - for a loaded database, an appended
+one, and one over a memory-mapped snapshot.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_proximity
+"""
+import datetime
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+import database as database_module
+from database import NEODatabase, SortedIndex
+from extract import load_neos, load_approaches
+from filters import create_filters
+from helpers import datetime_to_minutes
+from store import open_database
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+MOMENTS = [
+    datetime.datetime(2020, 3, 14, 12, 0),
+    datetime.date(2020, 7, 1),
+    datetime.datetime(1900, 1, 1),
+    datetime.datetime(2200, 1, 1),
+]
+
+
+def describe(approach):
+    return approach.neo.designation, approach.time, approach.distance, approach.velocity
+
+
+def brute_nearest(approaches, when, count, filters=()):
+    """Sort every matching close approach by its distance in time from a moment."""
+    if not isinstance(when, datetime.datetime):
+        when = datetime.datetime.combine(when, datetime.time())
+    minutes = datetime_to_minutes(when)
+    rows = [row for row, approach in enumerate(approaches)
+            if all(f(approach) for f in filters)]
+    rows.sort(key=lambda row: (abs(approaches[row].epoch_minutes - minutes),
+                               approaches[row].epoch_minutes, row))
+    return [approaches[row] for row in rows[:count]]
+
+
+def brute_closest(neo):
+    """Find the first close approach of an NEO with the smallest distance."""
+    return min(neo.approaches, key=lambda approach: approach.distance, default=None)
+
+
+class TestSortedIndexNearest(unittest.TestCase):
+    def test_nearest_walks_outwards_with_ties_to_smaller_values(self):
+        index = SortedIndex([10, 4, 7, 7, 13, 1])
+        # 4 and 10 are both 3 away from 7, and 1 and 13 both 6; the smaller values come first.
+        self.assertEqual(list(index.nearest(7)), [2, 3, 1, 0, 5, 4])
+        self.assertEqual(list(index.nearest(8.5)), [2, 3, 0, 1, 4, 5])
+        self.assertEqual(list(index.nearest(0)), [5, 1, 2, 3, 0, 4])
+        self.assertEqual(list(index.nearest(100)), [4, 0, 2, 3, 1, 5])
+        self.assertEqual(list(SortedIndex([]).nearest(3)), [])
+
+
+class TestProximity(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_nearest_approaches(self):
+        for when in MOMENTS:
+            for count in (1, 5, 50):
+                with self.subTest(when=when, count=count):
+                    expected = brute_nearest(self.db._approaches, when, count)
+                    self.assertEqual(self.db.nearest_approaches(when, count), expected)
+
+    def test_nearest_approaches_with_filters(self):
+        filters = create_filters(distance_max=0.05, hazardous=False)
+        for when in MOMENTS:
+            with self.subTest(when=when):
+                expected = brute_nearest(self.db._approaches, when, 7, filters)
+                self.assertEqual(self.db.nearest_approaches(when, 7, filters), expected)
+
+    def test_approaches_around(self):
+        filters = create_filters(velocity_min=10)
+        for when in MOMENTS:
+            for days in (0.5, 3, 30):
+                with self.subTest(when=when, days=days):
+                    start = when if isinstance(when, datetime.datetime) else \
+                        datetime.datetime.combine(when, datetime.time())
+                    reach = datetime.timedelta(days=days)
+                    window = [a for a in self.db._approaches
+                              if start - reach <= a.time <= start + reach]
+                    window.sort(key=lambda approach: approach.epoch_minutes)
+                    self.assertEqual(list(self.db.approaches_around(when, days)), window)
+                    self.assertEqual(list(self.db.approaches_around(when, days, filters)),
+                                     [a for a in window if a.velocity >= 10])
+
+    def test_closest_approach(self):
+        for neo in self.db._neos:
+            self.assertIs(self.db.closest_approach(neo), brute_closest(neo))
+
+    def test_closest_approach_without_numpy(self):
+        numpy, database_module.np = database_module.np, None
+        try:
+            db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        finally:
+            database_module.np = numpy
+        self.assertEqual(db._closest, self.db._closest)
+
+    def test_approaches_around_closest_of_hazardous_neos(self):
+        windows = list(self.db.approaches_around_closest(10, hazardous=True))
+        hazardous = [neo for neo in self.db._neos if neo.hazardous and neo.approaches]
+        self.assertEqual([neo for neo, _, _ in windows], hazardous)
+        for neo, closest, approaches in windows:
+            self.assertIs(closest, brute_closest(neo))
+            self.assertIn(closest, approaches)
+            self.assertEqual(approaches, list(self.db.approaches_around(closest.time, 10)))
+
+    def test_closest_approach_after_append(self):
+        neos, approaches = load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE)
+        db = NEODatabase(neos[:-50], approaches[:2000])
+        db.append(neos[-50:], approaches[2000:])
+        for neo in db._neos:
+            self.assertIs(db.closest_approach(neo), brute_closest(neo))
+        self.assertEqual(db.nearest_approaches(MOMENTS[0], 20),
+                         brute_nearest(db._approaches, MOMENTS[0], 20))
+
+    def test_store_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = pathlib.Path(directory)
+            shutil.copy(TEST_NEO_FILE, root / 'neos.csv')
+            shutil.copy(TEST_CAD_FILE, root / 'cad.json')
+            mapped = open_database(root / 'neos.csv', root / 'cad.json')
+            for neo in self.db._neos[:200]:
+                closest = mapped.closest_approach(mapped.get_neo_by_designation(neo.designation))
+                expected = self.db.closest_approach(neo)
+                self.assertEqual(None if closest is None else describe(closest),
+                                 None if expected is None else describe(expected))
+            self.assertEqual([describe(a) for a in mapped.nearest_approaches(MOMENTS[0], 20)],
+                             [describe(a) for a in self.db.nearest_approaches(MOMENTS[0], 20)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,6 +13,7 @@ To run these tests from the project root, run::
 These tests should pass when Tasks 3a and 3b are complete.
 """
 import datetime
+import math
 import pathlib
 import unittest
 
@@ -36,6 +37,70 @@ class TestQuery(unittest.TestCase):
         cls.approaches = load_approaches(TEST_CAD_FILE)
         cls.db = NEODatabase(cls.neos, cls.approaches)
 
+    def test_query_preserves_internal_order(self):
+        distance_max = 0.1
+        start_date = datetime.date(2020, 6, 1)
+
+        expected = [
+            approach for approach in self.approaches
+            if approach.distance <= distance_max and start_date <= approach.time.date()
+        ]
+        self.assertGreater(len(expected), 0)
+
+        filters = create_filters(start_date=start_date, distance_max=distance_max)
+        received = list(self.db.query(filters))
+        self.assertEqual(expected, received, msg="Computed results are not in internal order.")
+
+    def test_query_with_limit_produces_the_first_matches(self):
+        for filters in (create_filters(),
+                        create_filters(start_date=datetime.date(2020, 6, 1), distance_max=0.1),
+                        create_filters(distance_max=0.4),
+                        create_filters(distance_max=0.01),
+                        create_filters(velocity_min=5, hazardous=False)):
+            expected = list(self.db.query(filters))
+            for limit in (1, 10, len(expected) + 1):
+                received = list(self.db.query(filters, limit=limit))
+                self.assertEqual(expected[:limit], received)
+
+    def test_query_sorted_by_each_column(self):
+        # Python's sorts are stable, so ties stay in internal order.
+        def key(column, descending):
+            if column == 'diameter':
+                missing = -math.inf if descending else math.inf
+                return lambda a: missing if math.isnan(a.neo.diameter) else a.neo.diameter
+            return lambda a: a.epoch_minutes if column == 'time' else getattr(a, column)
+
+        for filters in (create_filters(),
+                        create_filters(start_date=datetime.date(2020, 6, 1), distance_max=0.1),
+                        create_filters(distance_max=0.01),
+                        create_filters(velocity_min=5, hazardous=False),
+                        create_filters(date=datetime.date(2020, 3, 2))):
+            matches = list(self.db.query(filters))
+            for column in ('time', 'distance', 'velocity', 'diameter'):
+                for descending in (False, True):
+                    expected = sorted(matches, key=key(column, descending), reverse=descending)
+                    for limit in (None, 1, 10, len(expected) + 1):
+                        received = list(self.db.query(filters, limit, column, descending))
+                        self.assertEqual(expected[:limit], received,
+                                         msg=f"Not sorted by {column} ({descending}, {limit}).")
+
+    def test_query_rows_and_fetch_agree_with_query(self):
+        for filters in (create_filters(),
+                        create_filters(start_date=datetime.date(2020, 6, 1), distance_max=0.1),
+                        create_filters(distance_max=0.4),
+                        create_filters(velocity_min=5, hazardous=False)):
+            expected = list(self.db.query(filters))
+            rows = self.db.query_rows(filters)
+            self.assertEqual([self.approaches[row] for row in rows], expected)
+            self.assertEqual(list(self.db.query_rows(filters, 5)), list(rows[:5]))
+            self.assertEqual(list(self.db.fetch(rows, 5)), expected[:5])
+            self.assertEqual(list(self.db.fetch(rows, 5, 'distance', True)),
+                             list(self.db.query(filters, 5, 'distance', True)))
+
+    def test_query_sorted_by_unknown_column(self):
+        with self.assertRaises(ValueError):
+            list(self.db.query(sort_by='name'))
+
     def test_query_all(self):
         expected = set(self.approaches)
         self.assertGreater(len(expected), 0)
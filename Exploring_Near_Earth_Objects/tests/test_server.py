@@ -0,0 +1,120 @@
+"""Check that an `NEOServer` answers inspect and query requests like the main module.
+
+A server is started on a free local port, in a background thread. Streamed
+query results must be the same as the output files written by the `write`
+module for the same query.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_server
+"""
+import concurrent.futures
+import datetime
+import json
+import pathlib
+import socket
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from server import NEOServer
+from write import write_to_csv, write_to_json, write_to_jsonl
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.server = NEOServer(cls.db, port=0, quiet=True)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = 'http://{}:{}'.format(*cls.server.server_address[:2])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path) as response:
+            return response.read().decode('utf-8')
+
+    def get_error(self, path):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self.get(path)
+        return context.exception.code, json.loads(context.exception.read())
+
+    def expected(self, writer, results):
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / 'results'
+            writer(results, path)
+            return path.read_bytes().decode('utf-8')
+
+    def test_query_streams_every_format(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), distance_max=0.2)
+        path = '/query?start_date=2020-03-01&distance_max=0.2&format='
+        for fmt, writer in (('csv', write_to_csv), ('json', write_to_json),
+                            ('jsonl', write_to_jsonl)):
+            with self.subTest(format=fmt):
+                self.assertEqual(self.get(path + fmt),
+                                 self.expected(writer, self.db.query(filters)))
+
+    def test_query_with_limit_and_sort(self):
+        filters = create_filters(hazardous=True)
+        results = list(self.db.query(filters, sort_by='velocity', descending=True))[:5]
+        self.assertEqual(self.get('/query?hazardous=true&sort_by=velocity&desc=1&limit=5'),
+                         self.expected(write_to_json, results))
+
+    def test_query_rejects_invalid_parameters(self):
+        for path in ('/query?date=2020-13-01', '/query?distance_min=far',
+                     '/query?hazardous=maybe', '/query?format=xml', '/query?sort_by=name',
+                     '/query?limit=five'):
+            with self.subTest(path=path):
+                status, body = self.get_error(path)
+                self.assertEqual(status, 400)
+                self.assertIn('error', body)
+        self.assertEqual(self.get_error('/nothing')[0], 404)
+
+    def test_inspect(self):
+        body = json.loads(self.get('/inspect?name=Apophis&verbose=true'))
+        neo = self.db.get_neo_by_name('Apophis')
+        self.assertEqual(body['neo']['designation'], neo.designation)
+        self.assertEqual(len(body['approaches']), len(neo.approaches))
+        body = json.loads(self.get('/inspect?pdes=2020%20BS'))
+        self.assertEqual(body['neo']['designation'], '2020 BS')
+        self.assertNotIn('approaches', body)
+        body = json.loads(self.get('/inspect?search=apofis'))
+        self.assertIn('99942', [candidate['designation'] for candidate in body['candidates']])
+        self.assertEqual(self.get_error('/inspect?pdes=not-real-designation')[0], 404)
+        self.assertEqual(self.get_error('/inspect')[0], 400)
+
+    def test_concurrent_requests(self):
+        expected = self.get('/query?start_date=2020-06-01&format=csv')
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            bodies = list(executor.map(self.get, ['/query?start_date=2020-06-01&format=csv'] * 16))
+        self.assertEqual(bodies, [expected] * 16)
+
+    def test_query_without_chunks_for_http_1_0(self):
+        filters = create_filters(start_date=datetime.date(2020, 6, 1))
+        with socket.create_connection(self.server.server_address[:2]) as connection:
+            connection.sendall(b'GET /query?start_date=2020-06-01&format=csv HTTP/1.0\r\n'
+                               b'Connection: keep-alive\r\n\r\n')
+            response = b''.join(iter(lambda: connection.recv(1 << 16), b''))
+        head, body = response.split(b'\r\n\r\n', 1)
+        self.assertNotIn(b'transfer-encoding', head.lower())
+        self.assertIn(b'connection: close', head.lower())
+        self.assertEqual(body.decode('utf-8'), self.expected(write_to_csv, self.db.query(filters)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""Check that a `ShardedScan` finds the same rows as a query evaluated in this process.
+
+The scans are evaluated by worker processes over a snapshot of the test data
+files, in small shards so that every query spans several of them.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_sharding
+"""
+import datetime
+import operator
+import pathlib
+import tempfile
+import unittest
+
+from filters import create_filters, DateFilter
+from sharding import ShardedScan, _scan_columns
+from snapshot import load_database
+from store import ColumnStore
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+FILTERS = (
+    create_filters(hazardous=True),
+    create_filters(diameter_min=0.5, diameter_max=1.5, hazardous=False),
+    create_filters(start_date=datetime.date(2020, 6, 1), velocity_min=10, diameter_max=0.3),
+    [DateFilter(operator.gt, datetime.date(2020, 10, 1)), *create_filters(hazardous=False)],
+    create_filters(distance_min=5),
+)
+
+
+class TestShardedScan(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tempdir = tempfile.TemporaryDirectory()
+        cls.path = pathlib.Path(cls.tempdir.name) / 'test.neosnap'
+        cls.db = load_database(TEST_NEO_FILE, TEST_CAD_FILE, path=cls.path)
+        cls.scan = ShardedScan(cls.path, len(cls.db._approaches), jobs=2, shard_size=500)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.scan.close()
+        cls.tempdir.cleanup()
+
+    def test_sharded_scan_finds_rows_in_internal_order(self):
+        for filters in FILTERS:
+            self.assertEqual(list(self.scan.rows(filters)), list(self.db.query_rows(filters)))
+
+    def test_sharded_scan_stops_at_limit(self):
+        for filters in FILTERS:
+            expected = list(self.db.query_rows(filters))
+            for limit in (1, 7, 1200):
+                self.assertEqual(list(self.scan.rows(filters, limit)), expected[:limit])
+
+    def test_scan_columns_without_numpy(self):
+        store = ColumnStore(self.path)
+        try:
+            for filters in FILTERS:
+                self.assertEqual(list(_scan_columns(store, filters, 100, 3000)),
+                                 [row for row in self.db.query_rows(filters) if 100 <= row < 3000])
+        finally:
+            store.close()
+
+    def test_sharded_database_queries(self):
+        filters = FILTERS[1]
+        expected = list(self.db.query(filters))
+        sorted_expected = list(self.db.query(filters, 5, 'velocity', True))
+        self.db.use_shards(self.scan)
+        try:
+            self.assertEqual(list(self.db.query(filters)), expected)
+            self.assertEqual(list(self.db.query(filters, 5)), expected[:5])
+            self.assertEqual(list(self.db.query(filters, 5, 'velocity', True)), sorted_expected)
+        finally:
+            self.db.use_shards(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""Check that a linked `NEODatabase` round-trips through a binary snapshot.
+
+The `load_database` function should reuse a fresh snapshot of the data files,
+and rebuild it when the data files change or when asked to.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_snapshot
+"""
+import math
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import snapshot
+from extract import load_neos, load_approaches
+from database import NEODatabase
+from snapshot import (SnapshotError, is_fresh, load_database, read_database, read_snapshot,
+                      snapshot_path)
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def same_neo(left, right):
+    return (left.designation == right.designation and left.name == right.name
+            and left.hazardous == right.hazardous
+            and (left.diameter == right.diameter
+                 or math.isnan(left.diameter) and math.isnan(right.diameter)))
+
+
+class TestSnapshot(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(cls.neos, cls.approaches)
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.root = pathlib.Path(tempdir.name)
+        self.neo_file = self.root / 'neos.csv'
+        self.cad_file = self.root / 'cad.json'
+        shutil.copy(TEST_NEO_FILE, self.neo_file)
+        shutil.copy(TEST_CAD_FILE, self.cad_file)
+        self.path = snapshot_path(self.neo_file, self.cad_file)
+
+    def test_snapshot_is_written_next_to_the_data(self):
+        self.assertEqual(self.path, self.root / 'cad.neosnap')
+        self.assertFalse(is_fresh(self.path, self.neo_file, self.cad_file))
+        load_database(self.neo_file, self.cad_file)
+        self.assertTrue(self.path.exists())
+        self.assertTrue(is_fresh(self.path, self.neo_file, self.cad_file))
+
+    def test_snapshot_round_trips_neos_and_approaches(self):
+        load_database(self.neo_file, self.cad_file)
+        neos, approaches = read_snapshot(self.path)
+        self.assertEqual(len(neos), len(self.neos))
+        for left, right in zip(neos, self.neos):
+            self.assertTrue(same_neo(left, right), msg=f"{left!r} != {right!r}")
+        self.assertEqual(len(approaches), len(self.approaches))
+        for left, right in zip(approaches, self.approaches):
+            self.assertEqual((left._designation, left.time, left.distance, left.velocity),
+                             (right.neo.designation, right.time, right.distance, right.velocity))
+
+    def test_read_database_reuses_the_grouped_rows_and_indexes(self):
+        load_database(self.neo_file, self.cad_file)
+        expected = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        with unittest.mock.patch.object(snapshot.NEODatabase, '__init__') as constructor:
+            database = read_database(self.path)
+        constructor.assert_not_called()
+        for column, index in expected._indexes.items():
+            self.assertEqual(list(database._indexes[column].rows), list(index.rows))
+            self.assertEqual(list(database._indexes[column].keys), list(index.keys))
+        self.assertEqual(list(database._closest), list(expected._closest))
+        self.assertEqual([(approach.neo.designation, approach.time)
+                          for approach in database.get_neo_by_name('Adonis').approaches],
+                         [(approach.neo.designation, approach.time)
+                          for approach in expected.get_neo_by_name('Adonis').approaches])
+        self.assertEqual([neo.designation for neo, _ in database.search_neos('adonis')],
+                         [neo.designation for neo, _ in expected.search_neos('adonis')])
+
+    def test_fresh_snapshot_is_used_instead_of_the_data(self):
+        load_database(self.neo_file, self.cad_file)
+        with unittest.mock.patch.object(snapshot, 'load_approaches') as mock_load:
+            database = load_database(self.neo_file, self.cad_file)
+        mock_load.assert_not_called()
+        self.assertEqual(database.get_neo_by_name('Adonis').designation, '2101')
+        self.assertEqual(len(database.get_neo_by_designation('2020 AY1').approaches),
+                         sum(approach.neo.designation == '2020 AY1' for approach in self.approaches))
+
+    def test_rebuild_ignores_a_fresh_snapshot(self):
+        load_database(self.neo_file, self.cad_file)
+        with unittest.mock.patch.object(snapshot, 'load_approaches',
+                                        wraps=snapshot.load_approaches) as mock_load:
+            load_database(self.neo_file, self.cad_file, rebuild=True)
+        mock_load.assert_called_once()
+
+    def test_snapshot_is_stale_when_the_data_changes(self):
+        load_database(self.neo_file, self.cad_file)
+        with open(self.neo_file, 'a') as outfile:
+            outfile.write('\n')
+        self.assertFalse(is_fresh(self.path, self.neo_file, self.cad_file))
+        load_database(self.neo_file, self.cad_file)
+        self.assertTrue(is_fresh(self.path, self.neo_file, self.cad_file))
+
+    def test_snapshot_is_fresh_when_the_data_is_only_touched(self):
+        load_database(self.neo_file, self.cad_file)
+        stat = self.cad_file.stat()
+        os.utime(self.cad_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertTrue(is_fresh(self.path, self.neo_file, self.cad_file))
+
+    def test_corrupt_snapshot_is_rebuilt(self):
+        self.path.write_bytes(b'not a snapshot')
+        self.assertFalse(is_fresh(self.path, self.neo_file, self.cad_file))
+        with self.assertRaises(SnapshotError):
+            read_snapshot(self.path)
+        database = load_database(self.neo_file, self.cad_file)
+        self.assertIsNotNone(database.get_neo_by_designation('2101'))
+        self.assertTrue(is_fresh(self.path, self.neo_file, self.cad_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""Check that an `NEODatabase` over a memory-mapped `ColumnStore` behaves like a loaded one.
+
+The NEOs and close approaches of a `ColumnStore` are built lazily, but queries
+and inspect lookups must produce the same results, in the same order, as an
+`NEODatabase` built from the data files.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_store
+"""
+import collections
+import datetime
+import math
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from store import ColumnStore, open_database
+from vectorized import numpy_available
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def describe(approach):
+    return approach.neo.designation, approach.time, approach.distance, approach.velocity
+
+
+class TestColumnStore(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tempdir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(cls.tempdir.name)
+        cls.neo_file = root / 'neos.csv'
+        cls.cad_file = root / 'cad.json'
+        shutil.copy(TEST_NEO_FILE, cls.neo_file)
+        shutil.copy(TEST_CAD_FILE, cls.cad_file)
+
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.mapped = open_database(cls.neo_file, cls.cad_file)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tempdir.cleanup()
+
+    def assertSameResults(self, filters):
+        expected = [describe(approach) for approach in self.db.query(filters)]
+        received = [describe(approach) for approach in self.mapped.query(filters)]
+        self.assertEqual(expected, received, msg="Mapped results do not match expected results.")
+
+    def test_store_builds_objects_lazily(self):
+        mapped = open_database(self.neo_file, self.cad_file)
+        self.assertEqual(len(mapped._approaches._built), 0)
+        self.assertEqual(len(mapped._neos._built), 0)
+        neo = mapped.get_neo_by_designation('2101')
+        self.assertEqual(len(mapped._neos._built), 1)
+        self.assertIs(mapped.get_neo_by_name('Adonis'), neo)
+
+    def test_store_keeps_only_recent_objects_alive(self):
+        mapped = open_database(self.neo_file, self.cad_file)
+        mapped._approaches._recent = collections.deque(maxlen=10)
+        held = mapped._approaches[0]
+        self.assertEqual(sum(1 for _ in mapped._approaches), len(self.db._approaches))
+        self.assertEqual(len(mapped._approaches._built), 11)
+        self.assertIs(mapped._approaches[0], held)
+        self.assertIs(mapped._approaches[-1], mapped._approaches[-1])
+
+    def test_store_links_neos_and_approaches(self):
+        adonis = self.mapped.get_neo_by_name('Adonis')
+        expected = [describe(approach) for approach in self.db.get_neo_by_name('Adonis').approaches]
+        self.assertEqual([describe(approach) for approach in adonis.approaches], expected)
+        for approach in adonis.approaches:
+            self.assertIs(approach.neo, adonis)
+
+    def test_store_get_neo_by_designation(self):
+        neo = self.mapped.get_neo_by_designation('2020 BS')
+        self.assertEqual(neo.designation, '2020 BS')
+        self.assertIsNone(neo.name)
+        self.assertTrue(math.isnan(neo.diameter))
+        self.assertIs(neo.hazardous, False)
+        self.assertIsNone(self.mapped.get_neo_by_designation('not-real-designation'))
+        self.assertIsNone(self.mapped.get_neo_by_name('not-real-name'))
+
+    def test_store_search_neos(self):
+        for text in ('apophis', '2020 b', '2019 xy1'):
+            expected = [(neo.designation, candidate) for neo, candidate
+                        in self.db.search_neos(text)]
+            received = [(neo.designation, candidate) for neo, candidate
+                        in self.mapped.search_neos(text)]
+            self.assertEqual(received, expected)
+
+    def test_store_query_all(self):
+        self.assertSameResults(create_filters())
+
+    def test_store_query_with_indexed_filters(self):
+        self.assertSameResults(create_filters(date=datetime.date(2020, 3, 2)))
+        self.assertSameResults(create_filters(start_date=datetime.date(2020, 3, 1),
+                                              end_date=datetime.date(2020, 3, 31),
+                                              distance_max=0.3))
+        self.assertSameResults(create_filters(velocity_min=10, velocity_max=20))
+
+    def test_store_query_with_neo_filters(self):
+        self.assertSameResults(create_filters(diameter_min=0.25, hazardous=True))
+        self.assertSameResults(create_filters(distance_max=0.1, hazardous=False))
+
+    @unittest.skipUnless(numpy_available(), "NumPy is not installed.")
+    def test_store_vectorized_query(self):
+        mapped = open_database(self.neo_file, self.cad_file, vectorized=True)
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), diameter_min=0.25,
+                                 hazardous=True)
+        expected = [describe(approach) for approach in self.db.query(filters)]
+        self.assertEqual([describe(approach) for approach in mapped.query(filters)], expected)
+
+    def test_store_can_be_closed(self):
+        store = ColumnStore(self.cad_file.with_suffix('.neosnap'))
+        neo = store.neos[0]
+        store.close()
+        self.assertIsNotNone(neo.designation)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Check that the vectorized query engine agrees with `NEODatabase.query`.
+
+The `VectorizedEngine` evaluates filters as boolean masks over NumPy columns. It
+must generate exactly the same close approaches, in the same order, as the
+pure-Python query path. These tests are skipped if NumPy isn't installed.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_vectorized
+"""
+import datetime
+import operator
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, DateFilter
+from vectorized import numpy_available
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+@unittest.skipUnless(numpy_available(), "NumPy is not installed.")
+class TestVectorizedQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        neos = load_neos(TEST_NEO_FILE)
+        approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(neos, approaches)
+        cls.vectorized_db = NEODatabase(neos, approaches, vectorized=True)
+
+    def assertSameResults(self, filters):
+        expected = list(self.db.query(filters))
+        received = list(self.vectorized_db.query(filters))
+        self.assertEqual(expected, received, msg="Vectorized results do not match expected results.")
+
+    def test_vectorized_query_all(self):
+        self.assertSameResults(create_filters())
+
+    def test_vectorized_query_dates(self):
+        self.assertSameResults(create_filters(date=datetime.date(2020, 3, 2)))
+        self.assertSameResults(create_filters(start_date=datetime.date(2020, 3, 1),
+                                              end_date=datetime.date(2020, 3, 31)))
+        self.assertSameResults(create_filters(start_date=datetime.date(2020, 10, 1),
+                                              end_date=datetime.date(2020, 4, 1)))
+
+    def test_vectorized_query_distance_and_velocity(self):
+        self.assertSameResults(create_filters(distance_min=0.1, distance_max=0.4))
+        self.assertSameResults(create_filters(velocity_min=10, velocity_max=20))
+
+    def test_vectorized_query_neo_attributes(self):
+        self.assertSameResults(create_filters(diameter_min=0.25, diameter_max=1.5))
+        self.assertSameResults(create_filters(hazardous=True))
+        self.assertSameResults(create_filters(hazardous=False))
+
+    def test_vectorized_query_combined(self):
+        self.assertSameResults(create_filters(
+            start_date=datetime.date(2020, 3, 1), end_date=datetime.date(2020, 8, 31),
+            distance_max=0.3, velocity_min=8, diameter_min=0.1, hazardous=False
+        ))
+
+    def test_vectorized_query_with_opaque_filter(self):
+        self.assertSameResults([DateFilter(operator.gt, datetime.date(2020, 6, 1)),
+                                *create_filters(distance_max=0.2)])
+
+    def test_vectorized_query_with_limit_evaluates_blocks(self):
+        filters = create_filters(distance_max=0.2)
+        expected = list(self.db.query(filters))[:7]
+        engine = self.vectorized_db._engine
+        engine.BLOCK_SIZE = 500
+        try:
+            self.assertEqual(list(self.vectorized_db.query(filters, limit=7)), expected)
+            self.assertEqual(len(list(self.vectorized_db.query(filters, limit=10 ** 6))),
+                             len(list(self.db.query(filters))))
+        finally:
+            del engine.BLOCK_SIZE
+
+    def test_vectorized_query_rows(self):
+        filters = create_filters(distance_min=0.1, velocity_max=20)
+        self.assertEqual(list(self.vectorized_db.query_rows(filters)),
+                         list(self.db.query_rows(filters)))
+
+    def test_vectorized_query_sorted(self):
+        filters = create_filters(start_date=datetime.date(2020, 6, 1), distance_max=0.2)
+        for column in ('time', 'distance', 'velocity', 'diameter'):
+            for descending in (False, True):
+                for limit in (None, 5):
+                    self.assertEqual(
+                        list(self.vectorized_db.query(filters, limit, column, descending)),
+                        list(self.db.query(filters, limit, column, descending)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,16 +18,21 @@ import collections.abc
 import contextlib
 import csv
 import datetime
+import gzip
 import io
 import json
+import math
 import pathlib
+import tempfile
 import unittest
 import unittest.mock
 
 
 from extract import load_neos, load_approaches
 from database import NEODatabase
-from write import write_to_csv, write_to_json
+from models import NearEarthObject, CloseApproach
+import write
+from write import write_to_csv, write_to_json, write_to_jsonl, write_to_npz, writer_for
 
 
 TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
@@ -226,5 +231,139 @@ class TestWriteToJSON(unittest.TestCase):
         self.assertIsInstance(approach['neo']['potentially_hazardous'], bool)
 
 
+def expected_json_elements(results):
+    """Build the elements of the JSON list as `write_to_json` originally did, all at once."""
+    return [{
+        'datetime_utc': result.time.strftime('%Y-%m-%d %H:%M'),
+        'distance_au': result.distance,
+        'velocity_km_s': result.velocity,
+        'neo': {
+            'designation': result.neo.designation,
+            'name': result.neo.name if result.neo.name is not None else '',
+            'diameter_km': result.neo.diameter,
+            'potentially_hazardous': result.neo.hazardous,
+        },
+    } for result in results]
+
+
+class TestFastCSV(unittest.TestCase):
+    def test_csv_matches_the_dict_writer_output(self):
+        results = build_results(60)
+        results += tuple(approach for approach in load_approaches_with_odd_neos())
+        with unittest.mock.patch('write.open') as mock_file, UncloseableStringIO() as buf:
+            mock_file.return_value = buf
+            with unittest.mock.patch.object(write, 'BATCH_SIZE', 7):
+                write_to_csv(iter(results), None)
+            value = buf.getvalue()
+
+        fieldnames = ('datetime_utc', 'distance_au', 'velocity_km_s', 'designation', 'name',
+                      'diameter_km', 'potentially_hazardous')
+        expected = io.StringIO(newline='')
+        writer = csv.DictWriter(expected, fieldnames=fieldnames)
+        writer.writeheader()
+        for result in results:
+            row = {**result.serialize(), **result.neo.serialize()}
+            row['name'] = row['name'] if row['name'] is not None else ''
+            row['potentially_hazardous'] = 'True' if row['potentially_hazardous'] else 'False'
+            writer.writerow(row)
+        self.assertEqual(value, expected.getvalue())
+
+
+def load_approaches_with_odd_neos():
+    """Link a few close approaches to NEOs without names or diameters, and in distant years."""
+    neos = (NearEarthObject('X1', None, float('nan'), True),
+            NearEarthObject('X2', 'Far, "Quoted"', 0.5, False))
+    approaches = (CloseApproach.from_minutes('X1', -600000000, 0.1, 5.0),
+                  CloseApproach.from_minutes('X2', 600000000, 0.2, 6.0),
+                  CloseApproach.from_minutes('X1', 0, 0.3, 7.0))
+    NEODatabase(neos, approaches)
+    return approaches
+
+
+class TestStreamingJSON(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.results = build_results(25)
+
+    def written(self, writer, results):
+        with unittest.mock.patch('write.open') as mock_file, UncloseableStringIO() as buf:
+            mock_file.return_value = buf
+            writer(results, None)
+            return buf.getvalue()
+
+    def test_json_matches_dumping_the_whole_list(self):
+        with unittest.mock.patch.object(write, 'BATCH_SIZE', 4):
+            for n in (0, 1, 4, 25):
+                self.assertEqual(self.written(write_to_json, iter(self.results[:n])),
+                                 json.dumps(expected_json_elements(self.results[:n])))
+
+    def test_jsonl_has_one_element_per_line(self):
+        with unittest.mock.patch.object(write, 'BATCH_SIZE', 4):
+            value = self.written(write_to_jsonl, iter(self.results))
+        self.assertTrue(value.endswith('\n'))
+        self.assertEqual([json.loads(line) for line in value.splitlines()],
+                         json.loads(json.dumps(expected_json_elements(self.results))))
+        self.assertEqual(self.written(write_to_jsonl, iter(())), '')
+
+
+class TestCompressedAndColumnarFormats(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.results = build_results(40) + load_approaches_with_odd_neos()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = pathlib.Path(directory.name)
+
+    def test_writer_for_dispatches_on_suffixes(self):
+        self.assertIs(writer_for(pathlib.Path('results.csv')), write_to_csv)
+        self.assertIs(writer_for(pathlib.Path('results.2020.csv.gz')), write_to_csv)
+        self.assertIs(writer_for(pathlib.Path('results.json.zst')), write_to_json)
+        self.assertIs(writer_for(pathlib.Path('results.jsonl.gz')), write_to_jsonl)
+        self.assertIs(writer_for(pathlib.Path('results.npz')), write_to_npz)
+        self.assertIsNone(writer_for(pathlib.Path('results.npz.gz')))
+        self.assertIsNone(writer_for(pathlib.Path('results.txt')))
+        self.assertIsNone(writer_for(pathlib.Path('results')))
+
+    def test_gzip_output_decompresses_to_the_plain_output(self):
+        for writer, suffix in ((write_to_csv, '.csv'), (write_to_json, '.json'),
+                               (write_to_jsonl, '.jsonl')):
+            with self.subTest(suffix=suffix):
+                plain, compressed = self.root / f'out{suffix}', self.root / f'out{suffix}.gz'
+                writer(iter(self.results), plain)
+                writer(iter(self.results), compressed)
+                self.assertEqual(gzip.decompress(compressed.read_bytes()), plain.read_bytes())
+
+    @unittest.skipUnless(write.zstandard is not None, "zstandard is not installed.")
+    def test_zstd_output_decompresses_to_the_plain_output(self):
+        plain, compressed = self.root / 'out.csv', self.root / 'out.csv.zst'
+        write_to_csv(iter(self.results), plain)
+        write_to_csv(iter(self.results), compressed)
+        decompressed = write.zstandard.ZstdDecompressor().stream_reader(compressed.open('rb'))
+        self.assertEqual(decompressed.read(), plain.read_bytes())
+
+    @unittest.skipUnless(write.np is not None, "NumPy is not installed.")
+    def test_npz_columns_round_trip(self):
+        path = self.root / 'out.npz'
+        write_to_npz(iter(self.results), path)
+        with write.np.load(path) as data:
+            self.assertEqual(len(data['datetime_utc']), len(self.results))
+            for row, result in enumerate(self.results):
+                self.assertEqual(data['datetime_utc'][row].astype('int64'), result.epoch_minutes)
+                self.assertEqual(data['distance_au'][row], result.distance)
+                self.assertEqual(data['velocity_km_s'][row], result.velocity)
+                neo = data['neo'][row]
+                self.assertEqual(data['neo_designation'][neo], result.neo.designation)
+                self.assertEqual(data['neo_name'][neo], result.neo.name or '')
+                self.assertEqual(data['neo_potentially_hazardous'][neo], result.neo.hazardous)
+                if math.isnan(result.neo.diameter):
+                    self.assertTrue(math.isnan(data['neo_diameter_km'][neo]))
+                else:
+                    self.assertEqual(data['neo_diameter_km'][neo], result.neo.diameter)
+            self.assertEqual(len(data['neo_designation']),
+                             len({result.neo for result in self.results}))
+
+
 if __name__ == '__main__':
     unittest.main()
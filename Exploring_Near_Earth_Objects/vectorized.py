@@ -0,0 +1,214 @@
+"""Evaluate filters on close approaches as vectorized NumPy operations.
+
+The `VectorizedEngine` keeps the columns that filters compare against in
+contiguous NumPy arrays:
+
+- for each close approach, the approach time (as whole minutes since the Unix
+  epoch), the nominal approach distance, the relative approach velocity, and
+  the position of its NEO in the database's collection of NEOs;
+- for each NEO, its diameter and whether it's potentially hazardous.
+
+A collection of filters from `create_filters` is then evaluated as a handful of
+boolean-mask operations over whole columns, and only the matching rows are
+fetched from the database's collection of close approaches.
+
+NumPy is an optional dependency. If it isn't installed, `numpy_available`
+returns False and constructing a `VectorizedEngine` raises an `ImportError`.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def numpy_available():
+    """Return whether NumPy is installed, and so whether a `VectorizedEngine` can be built."""
+    return np is not None
+
+
+class VectorizedEngine:
+    """A query engine over contiguous NumPy columns of an `NEODatabase`.
+
+    The engine holds references to the database's collections of NEOs and close
+    approaches, which must already be linked. Its `query` method produces the
+    same close approaches, in the same order, as `NEODatabase.query`.
+    """
+
+    def __init__(self, neos, approaches):
+        """Create a new `VectorizedEngine` from linked NEOs and close approaches.
+
+        :param neos: A sequence of `NearEarthObject`s.
+        :param approaches: A sequence of linked `CloseApproach`es.
+        """
+        if np is None:
+            raise ImportError("The vectorized query engine requires NumPy.")
+        self._approaches = approaches
+
+        position = {id(neo): row for row, neo in enumerate(neos)}
+        count = len(approaches)
+        self.time = np.fromiter((a.epoch_minutes for a in approaches),
+                                dtype=np.int64, count=count)
+        self.distance = np.fromiter((a.distance for a in approaches),
+                                    dtype=np.float64, count=count)
+        self.velocity = np.fromiter((a.velocity for a in approaches),
+                                    dtype=np.float64, count=count)
+        self.neo_index = np.fromiter((position[id(a.neo)] for a in approaches),
+                                     dtype=np.int32, count=count)
+        self.diameter = np.fromiter((neo.diameter for neo in neos),
+                                    dtype=np.float64, count=len(neos))
+        self.hazardous = np.fromiter((neo.hazardous for neo in neos),
+                                     dtype=np.bool_, count=len(neos))
+
+    @classmethod
+    def from_store(cls, store):
+        """Create a `VectorizedEngine` over the columns of a memory-mapped `store.ColumnStore`.
+
+        The NumPy arrays are read-only views of the mapped columns, so no data
+        is copied.
+
+        :param store: A `ColumnStore`.
+        :return: A new `VectorizedEngine`.
+        """
+        if np is None:
+            raise ImportError("The vectorized query engine requires NumPy.")
+        engine = cls.__new__(cls)
+        engine._approaches = store.approaches
+        columns = store.columns
+        engine.time = np.frombuffer(columns['approach_time'], dtype=np.int64)
+        engine.distance = np.frombuffer(columns['approach_distance'], dtype=np.float64)
+        engine.velocity = np.frombuffer(columns['approach_velocity'], dtype=np.float64)
+        engine.neo_index = np.frombuffer(columns['approach_neo'], dtype=np.int32)
+        engine.diameter = np.frombuffer(columns['neo_diameter'], dtype=np.float64)
+        engine.hazardous = np.frombuffer(columns['neo_hazardous'], dtype=np.bool_)
+        return engine
+
+    # The number of rows evaluated at a time when the number of matches is capped.
+    BLOCK_SIZE = 1 << 16
+
+    def append(self, neos, approaches, neo_rows):
+        """Append the columns of new NEOs and of newly linked close approaches.
+
+        The new close approaches must already have been appended to the
+        database's collection of close approaches, which this engine shares.
+
+        :param neos: A sequence of new `NearEarthObject`s, which follow the current ones.
+        :param approaches: A sequence of new, linked `CloseApproach`es.
+        :param neo_rows: The position of the NEO of each new close approach.
+        """
+        count = len(approaches)
+        self.time = np.concatenate([self.time, np.fromiter(
+            (a.epoch_minutes for a in approaches), dtype=np.int64, count=count)])
+        self.distance = np.concatenate([self.distance, np.fromiter(
+            (a.distance for a in approaches), dtype=np.float64, count=count)])
+        self.velocity = np.concatenate([self.velocity, np.fromiter(
+            (a.velocity for a in approaches), dtype=np.float64, count=count)])
+        self.neo_index = np.concatenate([self.neo_index, np.fromiter(
+            neo_rows, dtype=np.int32, count=count)])
+        self.diameter = np.concatenate([self.diameter, np.fromiter(
+            (neo.diameter for neo in neos), dtype=np.float64, count=len(neos))])
+        self.hazardous = np.concatenate([self.hazardous, np.fromiter(
+            (neo.hazardous for neo in neos), dtype=np.bool_, count=len(neos))])
+
+    def _column(self, name):
+        """Return a column as an array, and whether it's indexed by NEO rather than approach."""
+        if name in ('diameter', 'hazardous'):
+            return getattr(self, name), True
+        return getattr(self, name), False
+
+    def mask(self, filters, start=0, stop=None):
+        """Evaluate a collection of filters into a boolean mask over the close approaches.
+
+        Filters that can be expressed as an interval over a known column are
+        evaluated on whole columns. Filters on NEO columns are evaluated once
+        per NEO and then gathered per close approach. Any other filter is
+        called on each close approach that still matches.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param start: The first row to evaluate.
+        :param stop: The row after the last one to evaluate, defaulting to the last row.
+        :return: A boolean NumPy array with one entry per evaluated close approach.
+        """
+        if stop is None:
+            stop = len(self._approaches)
+        neo_index = self.neo_index[start:stop]
+        mask = np.ones(len(neo_index), dtype=np.bool_)
+        opaque = []
+        for f in filters:
+            interval = f.interval() if f.column in ('time', 'distance', 'velocity',
+                                                    'diameter', 'hazardous') else None
+            if interval is None:
+                opaque.append(f)
+                continue
+            lo, hi = interval
+            column, by_neo = self._column(f.column)
+            if not by_neo:
+                column = column[start:stop]
+            selected = np.ones(len(column), dtype=np.bool_)
+            if lo is not None:
+                selected &= column >= lo
+            if hi is not None:
+                selected &= column <= hi
+            mask &= selected[neo_index] if by_neo else selected
+
+        for f in opaque:
+            rows = np.flatnonzero(mask)
+            mask[rows] = [f(self._approaches[start + row]) for row in rows.tolist()]
+        return mask
+
+    def rows(self, filters, limit=None):
+        """Return the rows of the close approaches that match a collection of filters.
+
+        If a `limit` is given, the columns are evaluated a block at a time, and
+        no more blocks are evaluated once there are enough matches.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param limit: The maximum number of rows to return, or `None` for all of them.
+        :return: An integer NumPy array of matching rows, in internal order.
+        """
+        if limit is None:
+            return np.flatnonzero(self.mask(filters))
+        found = []
+        count = 0
+        for start in range(0, len(self._approaches), self.BLOCK_SIZE):
+            rows = np.flatnonzero(self.mask(filters, start, start + self.BLOCK_SIZE)) + start
+            found.append(rows[:limit - count])
+            count += len(found[-1])
+            if count == limit:
+                break
+        return np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+
+    def sorted_rows(self, rows, sort_by, descending=False):
+        """Sort rows of close approaches by a column, with a stable sort.
+
+        Ties stay in the order of `rows`, and NEOs of unknown diameter are
+        ordered last, whichever the direction of the sort.
+
+        :param rows: An integer NumPy array of rows.
+        :param sort_by: One of 'time', 'distance', 'velocity' or 'diameter'.
+        :param descending: Whether to sort in descending order.
+        :return: An integer NumPy array of the same rows, sorted.
+        """
+        column, by_neo = self._column(sort_by)
+        values = column[self.neo_index[rows]] if by_neo else column[rows]
+        if descending:
+            values = -values
+        if values.dtype.kind == 'f':
+            values = np.where(np.isnan(values), np.inf, values)
+        return rows[np.argsort(values, kind='stable')]
+
+    def query(self, filters=(), limit=None, sort_by=None, descending=False):
+        """Generate the close approaches that match a collection of filters.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param limit: The maximum number of matches to generate, or `None` for all of them.
+        :param sort_by: The column by which to sort the matches, or `None` for internal order.
+        :param descending: Whether to sort the matches in descending order.
+        :return: A stream of matching `CloseApproach` objects, in internal order unless sorted.
+        """
+        approaches = self._approaches
+        if sort_by is None:
+            rows = self.rows(filters, limit)
+        else:
+            rows = self.sorted_rows(self.rows(filters), sort_by, descending)[:limit]
+        for row in rows.tolist():
+            yield approaches[row]
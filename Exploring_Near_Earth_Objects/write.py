@@ -1,4 +1,4 @@
-"""Write a stream of close approaches to CSV or to JSON.
+"""Write a stream of close approaches to CSV, to JSON or to a columnar NumPy file.
 
 This module exports two functions: `write_to_csv` and `write_to_json`, each of
 which accept an `results` stream of close approaches and a path to which to
@@ -8,10 +8,70 @@ These functions are invoked by the main module with the output of the `limit`
 function and the filename supplied by the user at the command line. The file's
 extension determines which of these functions is used.
 
+CSV rows are built as tuples, in batches, with the columns of each NEO cached.
+The JSON array is written element by element, in batches, so memory doesn't
+grow with the number of results and the output reaches the file as the query
+runs. The `write_to_jsonl` function writes the same elements as newline-delimited
+JSON (NDJSON) instead, one per line, for `.jsonl` output files.
+
+Any of these text formats is compressed while it's streamed if the file name
+has a further `.gz` suffix (gzip) or `.zst` suffix (Zstandard, which requires
+the optional `zstandard` package). For analytics, `write_to_npz` writes the
+results as a compact columnar `.npz` archive, which requires NumPy.
+
+While a `profiling.Profiler` is active, each writer is timed as a stage.
+
+The `writer_for` function picks the writer for an output file from its suffixes.
+The text formats can also be written to an already open stream, such as the body
+of an HTTP response, with `stream_csv`, `stream_json` and `stream_jsonl`.
+
 You'll edit this file in Part 4.
 """
+import array
 import csv
+import gzip
+import io
+import itertools
 import json
+import pathlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from helpers import minutes_to_str
+import profiling
+
+
+# The number of results encoded before each write to the output file.
+BATCH_SIZE = 1000
+# The gzip compression level, the same default as the `gzip` command-line tool.
+GZIP_LEVEL = 6
+
+
+def _open_output(filename, newline=None):
+    """Open an output file for writing text, compressing it if its name ends in `.gz` or `.zst`.
+
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param newline: How to translate newlines, as for `open`.
+    :return: A writable text file object.
+    :raises ImportError: If Zstandard compression was requested, but `zstandard` isn't installed.
+    """
+    suffix = pathlib.PurePath(filename).suffix if filename is not None else ''
+    if suffix == '.gz':
+        return gzip.open(filename, 'wt', compresslevel=GZIP_LEVEL, newline=newline)
+    if suffix == '.zst':
+        if zstandard is None:
+            raise ImportError("Writing `.zst` files requires the zstandard package.")
+        compressed = zstandard.ZstdCompressor().stream_writer(open(filename, 'wb'))
+        return io.TextIOWrapper(compressed, newline=newline)
+    return open(filename, "w", newline=newline)
 
 
 def write_to_csv(results, filename):
@@ -24,23 +84,74 @@ def write_to_csv(results, filename):
     :param results: An iterable of `CloseApproach` objects.
     :param filename: A Path-like object pointing to where the data should be saved.
     """
+    with profiling.stage('write_to_csv'), _open_output(filename, newline="") as csvFile:
+        stream_csv(results, csvFile)
+
+
+def stream_csv(results, stream):
+    """Write an iterable of `CloseApproach` objects as CSV to an open text stream.
+
+    Rows are built as tuples straight from the attributes of each close
+    approach, and written a batch at a time. The columns of each NEO are only
+    formatted once, however many of its close approaches are written.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param stream: A writable text file object, opened with `newline=""`.
+    """
     fieldnames = ('datetime_utc', 'distance_au', 'velocity_km_s', 'designation', 'name', 'diameter_km', 'potentially_hazardous')
-    with open(filename, "w", newline="") as csvFile:
-        writer = csv.DictWriter(csvFile, fieldnames=fieldnames)
-        writer.writeheader()
-        for result in results:
-            # Merge the dictionaries using the dictionary unpacking operator
-            row = {**result.serialize(), **result.neo.serialize()}
-            if row["name"] is not None:
-                row["name"] = row["name"]
-            else:
-                row["name"] = ""
-            if row["potentially_hazardous"]:
-                row["potentially_hazardous"] = "True"
-            else:
-                row["potentially_hazardous"] = "False"
-
-            writer.writerow(row)
+    neo_columns = {}
+    writer = csv.writer(stream)
+    writer.writerow(fieldnames)
+    for batch in _batches(results):
+        rows = []
+        for result in batch:
+            neo = result.neo
+            try:
+                columns = neo_columns[neo]
+            except KeyError:
+                columns = neo_columns[neo] = _csv_neo_columns(neo)
+            rows.append((minutes_to_str(result.epoch_minutes), result.distance,
+                         result.velocity) + columns)
+        writer.writerows(rows)
+
+
+def _csv_neo_columns(neo):
+    """Build the CSV columns of an NEO: its designation, name, diameter and hazard flag.
+
+    :param neo: A `NearEarthObject`.
+    :return: A tuple of column values, as `csv.writer` should write them.
+    """
+    return (neo.designation, neo.name if neo.name is not None else "", neo.diameter,
+            "True" if neo.hazardous else "False")
+
+
+def _batches(results):
+    """Split an iterable of results into lists of at most `BATCH_SIZE` results."""
+    results = iter(results)
+    batch = list(itertools.islice(results, BATCH_SIZE))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(results, BATCH_SIZE))
+
+
+def json_record(result):
+    """Build the JSON-serializable dictionary of a `CloseApproach` and its NEO.
+
+    :param result: A linked `CloseApproach`.
+    :return: A dictionary, following the specification in the instructions.
+    """
+    row = {**result.serialize(), **result.neo.serialize()}
+    return {
+        "datetime_utc": row["datetime_utc"],
+        "distance_au": row["distance_au"],
+        "velocity_km_s": row["velocity_km_s"],
+        "neo": {
+            "designation": row["designation"],
+            "name": row["name"] if row["name"] is not None else "",
+            "diameter_km": row["diameter_km"],
+            "potentially_hazardous": bool(row["potentially_hazardous"]),
+        },
+    }
 
 
 def write_to_json(results, filename):
@@ -55,33 +166,135 @@ def write_to_json(results, filename):
     :param filename: A Path-like object pointing to where the data should be saved.
     """
     # : Write the results to a JSON file, following the specification in the instructions.
-    data = list()
+    with profiling.stage('write_to_json'), _open_output(filename) as jsonFile:
+        stream_json(results, jsonFile)
+
+
+def stream_json(results, stream):
+    """Write an iterable of `CloseApproach` objects as a JSON list to an open text stream.
+
+    The list is streamed a batch of elements at a time, with the same
+    formatting as `json.dump` would give the whole list.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param stream: A writable text file object.
+    """
+    encode = json.JSONEncoder().encode
+    stream.write("[")
+    separator = ""
+    for batch in _batches(results):
+        stream.write(separator + ", ".join(map(encode, map(json_record, batch))))
+        separator = ", "
+    stream.write("]")
+
+
+def write_to_jsonl(results, filename):
+    """Write an iterable of `CloseApproach` objects to a newline-delimited JSON file.
+
+    Each line of the output is one element of the list written by `write_to_json`.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    """
+    with profiling.stage('write_to_jsonl'), _open_output(filename) as jsonFile:
+        stream_jsonl(results, jsonFile)
+
+
+def stream_jsonl(results, stream):
+    """Write an iterable of `CloseApproach` objects as newline-delimited JSON to an open text stream.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param stream: A writable text file object.
+    """
+    encode = json.JSONEncoder().encode
+    for batch in _batches(results):
+        stream.write("".join(encode(json_record(result)) + "\n" for result in batch))
+
+
+def write_to_npz(results, filename):
+    """Write an iterable of `CloseApproach` objects to a columnar, compressed NumPy `.npz` file.
+
+    The archive holds one array per column. The close approach columns have
+    one entry per result, in order:
+
+    - `datetime_utc`: `datetime64[m]`, the approach time in UTC;
+    - `distance_au`: `float64`, the nominal approach distance in astronomical units;
+    - `velocity_km_s`: `float64`, the relative approach velocity in kilometers per second;
+    - `neo`: `int32`, the position of the result's NEO in the NEO columns.
+
+    The NEO columns have one entry per distinct NEO among the results, in order
+    of first appearance:
+
+    - `neo_designation`: `str`, the primary designation;
+    - `neo_name`: `str`, the IAU name, or the empty string if there isn't one;
+    - `neo_diameter_km`: `float64`, the diameter in kilometers, or NaN if unknown;
+    - `neo_potentially_hazardous`: `bool`.
+
+    No column needs pickling, so the file can be read with
+    `numpy.load(filename)` (which leaves `allow_pickle` off).
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :raises ImportError: If NumPy isn't installed.
+    """
+    if np is None:
+        raise ImportError("Writing `.npz` files requires NumPy.")
+    with profiling.stage('write_to_npz'):
+        _write_npz(results, filename)
+
+
+def _write_npz(results, filename):
+    """Write an iterable of `CloseApproach` objects to an `.npz` file, as `write_to_npz` does."""
+    times, distances, velocities = array.array('q'), array.array('d'), array.array('d')
+    codes = array.array('i')
+    neo_codes = {}
     for result in results:
-        row = {**result.serialize(), **result.neo.serialize()}
-        row["name"] = row["name"] if row["name"] is not None else ""
-        if row["name"] is not None:
-            row["name"] = row["name"]
-        else:
-            row["name"] = ""
-
-        if row["potentially_hazardous"]:
-            row["potentially_hazardous"] = True
-        else:
-            row["potentially_hazardous"] = False
-
-        data.append(
-            {
-                "datetime_utc": row["datetime_utc"],
-                "distance_au": row["distance_au"],
-                "velocity_km_s": row["velocity_km_s"],
-                "neo": {
-                    "designation": row["designation"],
-                    "name": row["name"],
-                    "diameter_km": row["diameter_km"],
-                    "potentially_hazardous": row["potentially_hazardous"],
-                },
-            }
+        times.append(result.epoch_minutes)
+        distances.append(result.distance)
+        velocities.append(result.velocity)
+        code = neo_codes.get(result.neo)
+        if code is None:
+            code = neo_codes[result.neo] = len(neo_codes)
+        codes.append(code)
+
+    neos = list(neo_codes)
+    with open(filename, "wb") as npzFile:
+        np.savez_compressed(
+            npzFile,
+            datetime_utc=np.frombuffer(times, dtype=np.int64).astype('datetime64[m]'),
+            distance_au=np.frombuffer(distances, dtype=np.float64),
+            velocity_km_s=np.frombuffer(velocities, dtype=np.float64),
+            neo=np.frombuffer(codes, dtype=np.int32),
+            neo_designation=np.array([neo.designation for neo in neos], dtype=str),
+            neo_name=np.array([neo.name or "" for neo in neos], dtype=str),
+            neo_diameter_km=np.array([neo.diameter for neo in neos], dtype=np.float64),
+            neo_potentially_hazardous=np.array([neo.hazardous for neo in neos], dtype=np.bool_),
         )
 
-    with open(filename, "w") as jsonFile:
-        json.dump(data, jsonFile)
+
+# The writer for each output format, by file suffix.
+WRITERS = {
+    '.csv': write_to_csv,
+    '.json': write_to_json,
+    '.jsonl': write_to_jsonl,
+    '.npz': write_to_npz,
+}
+# The suffixes of compressed text formats, which may follow the suffix of the format.
+COMPRESSION_SUFFIXES = ('.gz', '.zst')
+
+
+def writer_for(filename):
+    """Choose the writer for an output file from its suffixes.
+
+    For example, `results.csv` and `results.csv.gz` are written with
+    `write_to_csv`, and `results.npz` with `write_to_npz`.
+
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :return: A writer function, or `None` if the suffixes aren't supported.
+    """
+    suffixes = pathlib.PurePath(filename).suffixes
+    if suffixes and suffixes[-1] in COMPRESSION_SUFFIXES:
+        suffixes = suffixes[:-1]
+        if suffixes and suffixes[-1] == '.npz':
+            return None
+    return WRITERS.get(suffixes[-1]) if suffixes else None